@@ -0,0 +1,184 @@
+"""
+End-to-end throughput benchmarks on synthetic FFV1 videos, with a stub pose model and an embedded SQLite DB.
+
+Usage:
+    python -m benchmarks.run_benchmarks --frames 300 --width 640 --height 480 --output bench.json
+    python -m benchmarks.run_benchmarks --output new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable
+
+from dagster import ResourceDefinition
+
+from benchmarks.synthetic import StubPoseProcessor, generate_synthetic_frames, generate_synthetic_timestamps
+from src.db_manager import SQLiteDBManager
+from src.pipeline import prefilter, profiler, result_buffer, scheduler, video_processing_job
+from src.storage_manager import LocalStorageManager, RecordingMetaData, VideoEncoding, VIDEO_EXTENSIONS
+
+
+def peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024  # bytes on macOS, KiB on Linux
+
+
+def time_stage(func: Callable, repeats: int) -> tuple[list[float], object]:
+    runs = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def stage_report(runs: list[float], frames: int) -> dict:
+    median = statistics.median(runs)
+    return {
+        "seconds": median,
+        "runs": runs,
+        "frames": frames,
+        "frames_per_sec": frames / median if median > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def count_rows(db_location: str, table_name: str, column: str = "*") -> int:
+    with sqlite3.connect(db_location) as conn:
+        return conn.execute(f"SELECT COUNT({column}) FROM {table_name}").fetchone()[0]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(num_frames: int, width: int, height: int, fps: int, videos: int, repeats: int,
+                   workdir: str, encoding: VideoEncoding | None = None) -> dict:
+    encoding = encoding or VideoEncoding()
+    storage = LocalStorageManager(location=workdir, encoding=encoding)
+    processor = StubPoseProcessor()
+    frames = generate_synthetic_frames(num_frames=num_frames, width=width, height=height)
+    timestamps_ns = generate_synthetic_timestamps(num_frames=num_frames, fps=fps)
+    stages = {}
+
+    runs, video_location = time_stage(lambda: storage.write_video_to_storage(frames=frames, fps=fps, file_name="bench_video"),
+                                      repeats)
+    stages["storage_write_video"] = stage_report(runs, num_frames)
+    storage.write_timestamps_to_storage(timestamps_ns=timestamps_ns, video_location=video_location)
+
+    runs, decoded = time_stage(lambda: storage.read_video_from_storage(video_location), repeats)
+    stages["storage_read_video"] = stage_report(runs, num_frames)
+    if decoded.shape[0] != num_frames:
+        raise Exception(f"Decoded {decoded.shape[0]} frames, expected {num_frames}")
+
+    runs, results = time_stage(lambda: processor.process(decoded), repeats)
+    stages["stub_inference"] = stage_report(runs, num_frames)
+
+    runs, df = time_stage(lambda: processor.frames_results_to_video_df(results, timestamps_ns=timestamps_ns), repeats)
+    stages["frames_results_to_video_df"] = stage_report(runs, num_frames)
+
+    runs, _ = time_stage(lambda: storage.write_dataframe_to_storage(data=df, file_name="bench_results"), repeats)
+    stages["parquet_write"] = stage_report(runs, num_frames)
+
+    db = SQLiteDBManager(location=os.path.join(workdir, "benchmark.db"))
+    metadata = []
+    for i in range(videos):
+        location = storage.write_video_to_storage(frames=frames, fps=fps, file_name=f"bench_job_video_{i}")
+        storage.write_timestamps_to_storage(timestamps_ns=timestamps_ns, video_location=location)
+        metadata.append(RecordingMetaData(duration_in_sec=num_frames // fps, activity="Benchmark",
+                                          session_start="2025-01-01T00:00:00", participant="Synthetic",
+                                          fps=fps, amount_of_frames=num_frames,
+                                          start_time="2025-01-01T00:00:00", end_time="2025-01-01T00:01:00",
+                                          if_corrupted=False, file_location=location,
+                                          width=frames.shape[2], height=frames.shape[1]))
+    db.save_metadata_batch(metadata)
+    job = video_processing_job.graph.to_job(
+        name="video_processing_benchmark_job",
+        resource_defs={
+            "db": ResourceDefinition.hardcoded_resource(db),
+            "storage": ResourceDefinition.hardcoded_resource(storage),
+            "processors": ResourceDefinition.hardcoded_resource([processor]),
+            "profiler": profiler,
+            "prefilter": prefilter,
+            "scheduler": scheduler,
+            "result_buffer": result_buffer,
+        })
+    run_config = {"ops": {"get_video_locations": {"config": {"range_start": "2025-01-01T00:00:00",
+                                                             "range_end": "2025-01-02T00:00:00"}}}}
+    runs, _ = time_stage(lambda: job.execute_in_process(run_config=run_config), repeats)
+    stages["video_processing_job"] = stage_report(runs, num_frames * videos)
+    registered = count_rows(db.get_location(), "results", column="DISTINCT recording_id")
+    if registered != videos:
+        raise Exception(f"Job registered results for {registered} videos, expected {videos}")
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"frames": num_frames, "width": width, "height": height, "fps": fps,
+                   "videos": videos, "repeats": repeats, "codec": encoding.codec,
+                   "segment_frames": encoding.segment_frames, "encoder_threads": encoding.get_threads()},
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare_reports(current: dict, baseline: dict) -> list[str]:
+    lines = [f"{'stage':<28} {'baseline s':>12} {'current s':>12} {'speedup':>8}"]
+    for stage, report in current["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            lines.append(f"{stage:<28} {'-':>12} {report['seconds']:>12.4f} {'-':>8}")
+            continue
+        speedup = previous["seconds"] / report["seconds"] if report["seconds"] > 0 else float("inf")
+        lines.append(f"{stage:<28} {previous['seconds']:>12.4f} {report['seconds']:>12.4f} {speedup:>7.2f}x")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose estimation pipeline benchmarks")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--videos", type=int, default=2, help="Videos processed by the full job run")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--codec", choices=list(VIDEO_EXTENSIONS), default="ffv1")
+    parser.add_argument("--segment-frames", type=int, default=None, help="Write videos as segments of this many frames")
+    parser.add_argument("--encoder-threads", type=int, default=0, help="Parallel segment encoders, all cores by default")
+    parser.add_argument("--workdir", default=None, help="Where synthetic videos and results are written (temp dir by default)")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", default=None, help="A previous JSON report to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = run_benchmarks(num_frames=args.frames, width=args.width, height=args.height, fps=args.fps,
+                                videos=args.videos, repeats=args.repeats, workdir=args.workdir or tmp_dir,
+                                encoding=VideoEncoding(codec=args.codec, segment_frames=args.segment_frames,
+                                                       threads=args.encoder_threads))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for stage, stage_result in report["stages"].items():
+        print(f"{stage:<28} {stage_result['seconds']:.4f} s  {stage_result['frames_per_sec'] or 0:10.1f} frames/s")
+    print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB, report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare_reports(report, json.load(f))))
+
+
+if __name__ == "__main__":
+    main()
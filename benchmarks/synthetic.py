@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from src.postprocessor import YoloProcessor
+
+KEYPOINT_COUNT = 17
+
+
+def generate_synthetic_frames(num_frames: int, width: int, height: int, seed: int = 0) -> np.ndarray:
+    """
+    Generates deterministic BGR frames: a static noisy background with a bright square moving across it.
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+    frames = np.broadcast_to(background, (num_frames, height, width, 3)).copy()
+    side = max(4, min(width, height) // 6)
+    for i in range(num_frames):
+        x = (i * 7) % max(1, width - side)
+        y = (i * 3) % max(1, height - side)
+        frames[i, y:y + side, x:x + side] = 255
+    return frames
+
+
+def generate_synthetic_timestamps(num_frames: int, fps: int, start_ns: int = 1_700_000_000_000_000_000) -> np.ndarray:
+    return start_ns + np.arange(num_frames, dtype=np.int64) * (10**9 // fps)
+
+
+class StubResult:
+    """Mimics the part of `ultralytics.engine.results.Results` the pipeline uses: one person per frame."""
+    def __init__(self, frame: np.ndarray):
+        self.__frame_mean = float(frame.mean())
+        self.__height, self.__width = frame.shape[:2]
+
+    def to_df(self) -> pd.DataFrame:
+        offsets = np.linspace(0.0, 1.0, KEYPOINT_COUNT)
+        return pd.DataFrame({
+            "name": ["person"],
+            "class": [0],
+            "confidence": [round(self.__frame_mean / 255, 4)],
+            "box": [{"x1": 0.0, "y1": 0.0, "x2": float(self.__width), "y2": float(self.__height)}],
+            "keypoints": [{"x": (offsets * self.__width).tolist(),
+                           "y": (offsets * self.__height).tolist(),
+                           "visible": [1.0] * KEYPOINT_COUNT}],
+        })
+
+
+class StubPoseProcessor(YoloProcessor):
+    """
+    Deterministic stand-in for `YoloProcessor`: no model is loaded and inference returns `StubResult`s,
+    while the real result-to-DataFrame conversion is kept so it can be measured.
+    """
+    def process(self, data: np.ndarray) -> list[StubResult]:
+        return [StubResult(frame) for frame in data]
+
+    def load_model(self):
+        return None
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import TYPE_CHECKING
+from src.storage_manager import StorageManager
+
+if TYPE_CHECKING:
+    import pandas
+
+
+class ChunkCheckpoint:
+    """
+    Progress record of a result processed chunk by chunk. Each finished chunk is written as its own parquet part,
+    then appended to the dataset's manifest, so a retry or rerun resumes after the last completed chunk instead of
+    starting over. Finalising marks the manifest complete: the parts already are the result.
+
+    A manifest written for another video or chunk size can't be resumed and is discarded with its parts.
+    """
+    def __init__(self, storage: StorageManager, dataset_name: str, video_location: str | os.PathLike, chunk_size: int):
+        self.__storage = storage
+        self.__dataset_name = dataset_name
+        self.__video_location = str(video_location)
+        self.__chunk_size = chunk_size
+        self.__manifest = self.__load()
+
+    def get_location(self) -> str:
+        return self.__storage.get_dataset_location(self.__dataset_name)
+
+    def get_chunk_size(self) -> int:
+        return self.__chunk_size
+
+    def is_complete(self) -> bool:
+        return self.__manifest["complete"]
+
+    def get_completed_chunks(self) -> list[dict]:
+        return list(self.__manifest["chunks"])
+
+    def get_next_frame(self) -> int:
+        """
+        First frame not covered by a completed chunk.
+        """
+        return sum(chunk["frames"] for chunk in self.__manifest["chunks"])
+
+    def commit_chunk(self, first_frame: int, frames: int, data: pandas.DataFrame) -> str | None:
+        """
+        Durably stores the results of `frames` frames starting at `first_frame`. Chunks with no detections
+        are recorded without a part. Returns the part's location.
+        """
+        if first_frame != self.get_next_frame():
+            raise ValueError(f"Chunk starting at frame {first_frame} doesn't follow the last completed frame "
+                             f"{self.get_next_frame() - 1} of {self.__dataset_name}")
+        part_index = len(self.__manifest["chunks"])
+        location = None
+        if not data.empty:
+            location = self.__storage.write_dataframe_part_to_storage(data=data, dataset_name=self.__dataset_name,
+                                                                      part_index=part_index)
+        self.__manifest["chunks"].append({"index": part_index, "first_frame": first_frame, "frames": frames,
+                                          "part": os.path.basename(location) if location else None})
+        self.__storage.write_manifest_to_storage(manifest=self.__manifest, dataset_name=self.__dataset_name)
+        return location
+
+    def finalize(self, empty_result: pandas.DataFrame) -> str:
+        """
+        Marks the result complete. When no chunk had detections, `empty_result`, the result's columns without rows,
+        is stored as its only part, as the in-memory path stores a video without detections.
+        """
+        if not any(chunk["part"] for chunk in self.__manifest["chunks"]):
+            location = self.__storage.write_dataframe_part_to_storage(data=empty_result, dataset_name=self.__dataset_name,
+                                                                      part_index=len(self.__manifest["chunks"]))
+            self.__manifest["empty_part"] = os.path.basename(location)
+        self.__manifest["complete"] = True
+        self.__storage.write_manifest_to_storage(manifest=self.__manifest, dataset_name=self.__dataset_name)
+        return self.get_location()
+
+    def __load(self) -> dict:
+        manifest = self.__storage.read_manifest_from_storage(self.__dataset_name)
+        if manifest is not None and (manifest.get("video_location") == self.__video_location
+                                     and manifest.get("chunk_size") == self.__chunk_size):
+            return manifest
+        if manifest is not None:
+            logging.info(f"Discarding checkpoint of {self.__dataset_name}, it was written for other input")
+        self.__storage.remove_dataset_from_storage(self.__dataset_name)
+        return {"video_location": self.__video_location, "chunk_size": self.__chunk_size,
+                "complete": False, "chunks": []}
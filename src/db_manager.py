@@ -1,8 +1,19 @@
+from __future__ import annotations
+
 import logging
 import os
-import psycopg2
+import sqlite3
+import threading
 from abc import ABC, abstractmethod
-from src.storage_manager import RecordingMetaData
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from src.frame_timing import FrameTimingStats
+from src.instrumentation import StageMetrics
+from src.storage_manager import RecordingMetaData, RecordingView
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import psycopg2
 
 class DBManager(ABC):
 
@@ -11,21 +22,266 @@ class DBManager(ABC):
         pass
 
     @abstractmethod
-    def get_all_recordings_in_time_range(self, start_time: str, end_time: str) -> dict[str, str]:
+    def get_all_recordings(self) -> dict[str, RecordingMetaData]:
+        pass
+
+    @abstractmethod
+    def remove_recording_by_id(self, recording_id: str) -> list[str]:
+        """
+        Removes the recording with its views. Returns the video paths of the recording and of every view.
+        """
+        pass
+
+    @abstractmethod
+    def get_recordings_column_names(self) -> list[str]:
+        pass
+
+    @abstractmethod
+    def get_recordings_page(self, filters: RecordingFilter | None = None, page_size: int = 50,
+                            cursor: tuple | None = None) -> RecordingPage:
         pass
 
+    @abstractmethod
+    def save_metadata_for_multi_view_video(self, metadata: RecordingMetaData, views: list[RecordingView]):
+        pass
+
+    @abstractmethod
+    def get_recordings_to_process(self, start_time: str, end_time: str) -> dict[str, RecordingToProcess]:
+        """
+        Recordings in the time range with what the pipeline needs to plan their processing, keyed by id.
+        """
+        pass
+
+    def get_all_recordings_in_time_range(self, start_time: str, end_time: str) -> dict[str, str]:
+        return {recording_id: recording.location
+                for recording_id, recording in self.get_recordings_to_process(start_time, end_time).items()}
+
     @abstractmethod
     def update_results_for_video(self, processor_name: str, results_location: str, video_id: str):
         pass
 
+    @abstractmethod
+    def log_processing_metrics(self, run_id: str, video_id: str, metrics: list[StageMetrics]):
+        pass
+
+    @abstractmethod
+    def save_metadata_batch(self, metadata: list[RecordingMetaData]) -> list[int]:
+        """
+        Saves many recordings in a single transaction and returns their ids, in the given order.
+        """
+        pass
+
+    @abstractmethod
+    def register_results_batch(self, results: list[ResultRecord]) -> int:
+        """
+        Registers many processing results in a single transaction and returns how many were new.
+        Results that are already registered are skipped, so a batch can safely be delivered more than once.
+        """
+        pass
+
+
+def create_db_manager(backend: str | None = None, sqlite_location: str | None = None) -> DBManager:
+    """
+    Creates the configured DBManager. Unset arguments fall back to the `DB_BACKEND` ("postgres" or "sqlite")
+    and `SQLITE_DB_PATH` environment variables.
+    """
+    backend = (backend or os.environ.get('DB_BACKEND') or "postgres").lower()
+    if backend == "postgres":
+        return PostgresDBManager()
+    if backend == "sqlite":
+        return SQLiteDBManager(location=sqlite_location or os.environ.get('SQLITE_DB_PATH') or SQLiteDBManager.DEFAULT_LOCATION)
+    raise ValueError(f"Unknown DB backend: {backend}")
+
+
+RECORDINGS_SELECT_COLUMNS = """r.id, r.duration_in_sec, a.activity_name, s.session_start, p.participant_name,
+                   r.fps, r.amount_of_frames, r.frames_lost_on_save, r.start_time, r.end_time, r.is_corrupted, r.video_path,
+                   r.frames_dropped, r.longest_gap_ms, r.jitter_p50_ms, r.jitter_p95_ms, r.jitter_p99_ms, r.effective_fps,
+                   r.width, r.height"""
+
+RECORDINGS_INSERT_COLUMNS = """session_id, activity_id, participant_id, is_corrupted, video_path,
+                fps, amount_of_frames, frames_lost_on_save, start_time, end_time, duration_in_sec,
+                frames_dropped, longest_gap_ms, jitter_p50_ms, jitter_p95_ms, jitter_p99_ms, effective_fps,
+                width, height"""
+
+RECORDINGS_INDEXES = '''
+    CREATE INDEX IF NOT EXISTS idx_recordings_start_end ON recordings (start_time, end_time);
+    CREATE INDEX IF NOT EXISTS idx_recordings_session ON recordings (session_id);
+    CREATE INDEX IF NOT EXISTS idx_recordings_activity ON recordings (activity_id);
+    CREATE INDEX IF NOT EXISTS idx_recordings_participant ON recordings (participant_id);
+    CREATE INDEX IF NOT EXISTS idx_results_recording_processor ON results (recording_id, processor_id);
+    CREATE INDEX IF NOT EXISTS idx_results_processor ON results (processor_id);
+    CREATE INDEX IF NOT EXISTS idx_recording_views_recording ON recording_views (recording_id);
+    CREATE INDEX IF NOT EXISTS idx_processing_metrics_recording ON processing_metrics (recording_id);
+    CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (session_start);
+    CREATE INDEX IF NOT EXISTS idx_activities_name ON activities (activity_name);
+    CREATE INDEX IF NOT EXISTS idx_participants_name ON participants (participant_name);
+'''
+
+
+@dataclass(kw_only=True)
+class RecordingFilter:
+    participant: str | None = None
+    activity: str | None = None
+    recorded_from: str | None = None  # inclusive, compared with start_time
+    recorded_to: str | None = None  # exclusive, compared with start_time
+    is_corrupted: bool | None = None
+
+
+@dataclass(kw_only=True, frozen=True)
+class ResultRecord:
+    video_id: str
+    processor_name: str
+    results_location: str
+
+
+@dataclass(kw_only=True)
+class RecordingPage:
+    recordings: dict[str, RecordingMetaData] = field(default_factory=dict)
+    next_cursor: tuple | None = None  # pass back as `cursor` to fetch the following page, None on the last page
+
+
+@dataclass(kw_only=True, frozen=True)
+class RecordingToProcess:
+    location: str
+    amount_of_frames: int  # frames actually stored, without the ones lost on save
+    width: int = 0  # 0 when the recording was saved before the resolution was recorded
+    height: int = 0
+
+    def get_frame_shape(self) -> tuple[int, int, int] | None:
+        return (self.height, self.width, 3) if self.width and self.height else None
+
+
+def _row_to_recording_to_process(row: tuple) -> RecordingToProcess:
+    return RecordingToProcess(location=row[1], amount_of_frames=row[2] - row[3], width=row[4], height=row[5])
+
+
+def _video_paths_of_recording(video_path: str, view_paths: list[str]) -> list[str]:
+    """
+    The recording's video first, then its other views; a multi-view recording's video is also its first view.
+    """
+    return [video_path] + [path for path in view_paths if path != video_path]
+
+
+def _build_recordings_page_query(filters: RecordingFilter, page_size: int, cursor: tuple | None,
+                                 placeholder: str) -> tuple[str, tuple]:
+    """
+    Keyset pagination over recordings, newest first: the page after `cursor` = (start_time, id) of the last row seen
+    is read with an index range scan on start_time, instead of an OFFSET that rescans all earlier pages.
+    """
+    conditions, params = [], []
+    if filters.participant is not None:
+        conditions.append(f"p.participant_name = {placeholder}")
+        params.append(filters.participant)
+    if filters.activity is not None:
+        conditions.append(f"a.activity_name = {placeholder}")
+        params.append(filters.activity)
+    if filters.recorded_from is not None:
+        conditions.append(f"r.start_time >= {placeholder}")
+        params.append(filters.recorded_from)
+    if filters.recorded_to is not None:
+        conditions.append(f"r.start_time < {placeholder}")
+        params.append(filters.recorded_to)
+    if filters.is_corrupted is not None:
+        conditions.append(f"r.is_corrupted = {placeholder}")
+        params.append(filters.is_corrupted)
+    if cursor is not None:
+        conditions.append(f"(r.start_time, r.id) < ({placeholder}, {placeholder})")
+        params.extend(cursor)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql_query = f"""
+        SELECT {RECORDINGS_SELECT_COLUMNS}
+        FROM recordings r
+        LEFT JOIN activities a ON r.activity_id = a.id
+        LEFT JOIN sessions s ON r.session_id = s.id
+        LEFT JOIN participants p ON r.participant_id = p.id
+        {where}
+        ORDER BY r.start_time DESC, r.id DESC
+        LIMIT {placeholder}
+    """
+    params.append(page_size + 1)  # one extra row tells whether another page follows
+    return sql_query, tuple(params)
+
+
+def _rows_to_recording_page(rows: list[tuple], page_size: int) -> RecordingPage:
+    page_rows = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        last_row = page_rows[-1]
+        next_cursor = (last_row[8], last_row[0])  # (start_time, id)
+    return RecordingPage(recordings=dict(_row_to_recording_metadata(row) for row in page_rows), next_cursor=next_cursor)
+
+
+def _recording_values(metadata: RecordingMetaData, session_id: int, activity_id: int, participant_id: int) -> tuple:
+    """
+    Row for `RECORDINGS_INSERT_COLUMNS`.
+    """
+    timing = metadata.timing_stats
+    return (
+        session_id, activity_id, participant_id, metadata.if_corrupted,
+        str(metadata.file_location), metadata.fps, metadata.amount_of_frames,
+        metadata.frames_lost_on_save, metadata.start_time, metadata.end_time, metadata.duration_in_sec,
+        timing.frames_dropped, timing.longest_gap_ms, timing.jitter_p50_ms, timing.jitter_p95_ms,
+        timing.jitter_p99_ms, timing.effective_fps, metadata.width, metadata.height
+    )
+
+
+def _row_to_recording_metadata(row: tuple) -> tuple[str, RecordingMetaData]:
+    (
+        rec_id,
+        duration_in_sec,
+        activity,
+        session_start,
+        participant,
+        fps,
+        amount_of_frames,
+        frames_lost_on_save,
+        start_time,
+        end_time,
+        if_corrupted,
+        file_location,
+        frames_dropped,
+        longest_gap_ms,
+        jitter_p50_ms,
+        jitter_p95_ms,
+        jitter_p99_ms,
+        effective_fps,
+        width,
+        height,
+    ) = row
+
+    metadata = RecordingMetaData(
+        duration_in_sec=duration_in_sec,
+        activity=activity,
+        session_start=str(session_start),
+        participant=participant,
+        fps=fps,
+        amount_of_frames=amount_of_frames,
+        frames_lost_on_save=frames_lost_on_save,
+        start_time=str(start_time),
+        end_time=str(end_time),
+        if_corrupted=bool(if_corrupted),
+        file_location=file_location,
+        width=width,
+        height=height,
+        timing_stats=FrameTimingStats(frames_dropped=frames_dropped,
+                                      longest_gap_ms=longest_gap_ms,
+                                      jitter_p50_ms=jitter_p50_ms,
+                                      jitter_p95_ms=jitter_p95_ms,
+                                      jitter_p99_ms=jitter_p99_ms,
+                                      effective_fps=effective_fps),
+    )
+    return str(rec_id), metadata
+
+
 class PostgresDBManager(DBManager):
     def __init__(self):
         self.__conn = None
         self.__cursor = None
         self.__init_db()
 
-    def __connect(self) -> psycopg2.connect:
+    def __connect(self) -> psycopg2.extensions.connection:
         if self.__conn is None:
+            import psycopg2
             self.__conn = psycopg2.connect(
                 dbname=os.environ.get('PG_DBNAME'),
                 user=os.environ.get('PG_USER'),
@@ -86,8 +342,45 @@ class PostgresDBManager(DBManager):
                 processor_id INT REFERENCES processors(id) ON DELETE SET NULL,
                 file_location TEXT NOT NULL
             );
+            
+            CREATE TABLE IF NOT EXISTS recording_views (
+                id SERIAL PRIMARY KEY,
+                recording_id INT REFERENCES recordings(id) ON DELETE CASCADE,
+                device_id INT NOT NULL,
+                video_path TEXT NOT NULL,
+                amount_of_frames INT NOT NULL,
+                frames_dropped INT NOT NULL,
+                longest_gap_ms REAL NOT NULL,
+                jitter_p95_ms REAL NOT NULL,
+                effective_fps REAL NOT NULL
+            );
+            
+            CREATE TABLE IF NOT EXISTS processing_metrics (
+                id SERIAL PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                recording_id INT REFERENCES recordings(id) ON DELETE CASCADE,
+                stage TEXT NOT NULL,
+                wall_time_sec REAL NOT NULL,
+                cpu_time_sec REAL NOT NULL,
+                frames INT NOT NULL,
+                frames_skipped INT NOT NULL DEFAULT 0,
+                bytes_read BIGINT NOT NULL,
+                bytes_written BIGINT NOT NULL,
+                peak_rss_mb REAL NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+            
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS frames_dropped INT NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS longest_gap_ms REAL NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS jitter_p50_ms REAL NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS jitter_p95_ms REAL NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS jitter_p99_ms REAL NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS effective_fps REAL NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS width INT NOT NULL DEFAULT 0;
+            ALTER TABLE recordings ADD COLUMN IF NOT EXISTS height INT NOT NULL DEFAULT 0;
+            ALTER TABLE processing_metrics ADD COLUMN IF NOT EXISTS frames_skipped INT NOT NULL DEFAULT 0;
             '''
-        self.__cursor.execute(sql)
+        self.__cursor.execute(sql + RECORDINGS_INDEXES)
 
     def __set_id(self, table_name: str, column_name: str, data: str) -> str:
         sql_query = f"""
@@ -113,10 +406,21 @@ class PostgresDBManager(DBManager):
     def __run_query(self, sql_query: str, data: tuple):
         self.__cursor.execute(sql_query, data)
 
+    @contextmanager
+    def __transaction(self):
+        self.__conn.autocommit = False
+        try:
+            yield
+            self.__conn.commit()
+        except Exception:
+            self.__conn.rollback()
+            raise
+        finally:
+            self.__conn.autocommit = True
+
     def get_all_recordings(self) -> dict[str, RecordingMetaData]:
-        sql_query = """
-            SELECT r.id, r.duration_in_sec, a.activity_name, s.session_start, p.participant_name,
-                   r.fps, r.amount_of_frames, r.frames_lost_on_save, r.start_time, r.end_time, r.is_corrupted, r.video_path
+        sql_query = f"""
+            SELECT {RECORDINGS_SELECT_COLUMNS}
             FROM recordings r
             LEFT JOIN activities a ON r.activity_id = a.id
             LEFT JOIN sessions s ON r.session_id = s.id
@@ -127,100 +431,103 @@ class PostgresDBManager(DBManager):
             rows = self.__cursor.fetchall()
             if not rows:
                 raise Exception("No recordings found in the database.")
-            recordings = {}
-            for row in rows:
-                (
-                    rec_id,
-                    duration_in_sec,
-                    activity,
-                    session_start,
-                    participant,
-                    fps,
-                    amount_of_frames,
-                    frames_lost_on_save,
-                    start_time,
-                    end_time,
-                    if_corrupted,
-                    file_location,
-                ) = row
-
-                metadata = RecordingMetaData(
-                    duration_in_sec=duration_in_sec,
-                    activity=activity,
-                    session_start=str(session_start),
-                    participant=participant,
-                    fps=fps,
-                    amount_of_frames=amount_of_frames,
-                    frames_lost_on_save=frames_lost_on_save,
-                    start_time=str(start_time),
-                    end_time=str(end_time),
-                    if_corrupted=if_corrupted,
-                    file_location=file_location,
-                )
-                recordings[str(rec_id)] = metadata
-
+            recordings = dict(_row_to_recording_metadata(row) for row in rows)
             logging.info(f"Successfully fetched {len(recordings)} recordings from the database.")
             return recordings
 
         except Exception as e:
             raise Exception(f"Failed to fetch recordings: {e}")
 
-    def remove_recording_by_id(self, recording_id: str) -> str:
-        sql_delete = "DELETE FROM recordings WHERE id = %s RETURNING video_path"
+    def remove_recording_by_id(self, recording_id: str) -> list[str]:
+        sql_delete = """
+            WITH views AS (SELECT video_path FROM recording_views WHERE recording_id = %s)
+            DELETE FROM recordings WHERE id = %s
+            RETURNING video_path, ARRAY(SELECT video_path FROM views ORDER BY video_path)
+        """
         try:
-            self.__run_query(sql_query=sql_delete, data=(recording_id,))
+            self.__run_query(sql_query=sql_delete, data=(recording_id, recording_id))
             result = self.__cursor.fetchone()
             if not result:
                 raise Exception(f"No recording deleted; id {recording_id} may not exist.")
-            video_path = result[0]
             logging.info(f"Successfully removed recording with id: {recording_id}")
-            return video_path
+            return _video_paths_of_recording(result[0], result[1])
         except Exception as e:
             raise Exception(f"Failed to remove recording with id {recording_id}: {e}")
 
     def get_recordings_column_names(self) -> list[str]:
         try:
             columns = self.__get_column_order_from_schema()
-            sql_query = f"SELECT {', '.join(columns)} FROM recordings"
-            self.__run_query(sql_query=sql_query, data=())
-            column_names = [desc[0].replace("_id","_name") for desc in self.__cursor.description]
-            return column_names
+            if not columns:
+                raise Exception("Table 'recordings' has no columns in the schema")
+            return [column.replace("_id", "_name") for column in columns]
         except Exception as e:
             raise Exception(f"Failed to fetch column names from 'recordings' table: {e}")
 
+    def get_recordings_page(self, filters: RecordingFilter | None = None, page_size: int = 50,
+                            cursor: tuple | None = None) -> RecordingPage:
+        sql_query, data = _build_recordings_page_query(filters=filters or RecordingFilter(), page_size=page_size,
+                                                       cursor=cursor, placeholder="%s")
+        try:
+            # Server-side cursor: Postgres streams the rows instead of materialising the whole result client-side
+            with self.__conn.cursor(name="recordings_page", withhold=True) as page_cursor:
+                page_cursor.itersize = page_size + 1
+                page_cursor.execute(sql_query, data)
+                rows = page_cursor.fetchmany(page_size + 1)
+        except Exception as e:
+            raise Exception(f"Failed to fetch recordings page: {e}")
+        return _rows_to_recording_page(rows=rows, page_size=page_size)
+
     def save_metadata_for_video(self, metadata: RecordingMetaData):
         try:
-            session_id = self.__get_id(data=metadata.session_start,
-                                       table_name="sessions",
-                                       column_name="session_start")
-            activity_id = self.__get_id(data=metadata.activity,
-                                        table_name="activities",
-                                        column_name="activity_name")
-            participant_id = self.__get_id(data=metadata.participant,
-                                        table_name="participants",
-                                        column_name="participant_name")
-            sql_query = """
-                INSERT INTO recordings (
-                    session_id, activity_id, participant_id, is_corrupted, video_path,
-                    fps, amount_of_frames, frames_lost_on_save, start_time, end_time, duration_in_sec
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
-            """
-            data = (
-                session_id, activity_id, participant_id, metadata.if_corrupted,
-                str(metadata.file_location), metadata.fps, metadata.amount_of_frames,
-                metadata.frames_lost_on_save, metadata.start_time, metadata.end_time, metadata.duration_in_sec
-            )
-            self.__run_query(sql_query=sql_query, data=data)
-            query_result = self.__cursor.fetchone()
-            if not query_result:
-                raise Exception(f"Failed to insert recording's metadata for: {metadata.file_location}")
+            self.__insert_recording(metadata=metadata)
             logging.info(f"Successfully saved recording's metadata for: {metadata.file_location}")
         except Exception as e:
             raise e
 
-    def get_all_recordings_in_time_range(self, start_time: str, end_time: str) -> dict[str, str]:
+    def save_metadata_for_multi_view_video(self, metadata: RecordingMetaData, views: list[RecordingView]):
+        sql_query = """
+            INSERT INTO recording_views (
+                recording_id, device_id, video_path, amount_of_frames, frames_dropped,
+                longest_gap_ms, jitter_p95_ms, effective_fps
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        try:
+            with self.__transaction():
+                recording_id = self.__insert_recording(metadata=metadata)
+                for view in views:
+                    data = (
+                        recording_id, view.device_id, str(view.file_location), view.amount_of_frames,
+                        view.frames_dropped, view.longest_gap_ms, view.jitter_p95_ms, view.effective_fps
+                    )
+                    self.__run_query(sql_query=sql_query, data=data)
+        except Exception as e:
+            raise Exception(f"Failed to save multi-view recording's metadata for: {metadata.file_location}: {e}")
+        logging.info(f"Successfully saved recording's metadata for {len(views)} views: {metadata.file_location}")
+
+    def __insert_recording(self, metadata: RecordingMetaData) -> int:
+        session_id = self.__get_id(data=metadata.session_start,
+                                   table_name="sessions",
+                                   column_name="session_start")
+        activity_id = self.__get_id(data=metadata.activity,
+                                    table_name="activities",
+                                    column_name="activity_name")
+        participant_id = self.__get_id(data=metadata.participant,
+                                    table_name="participants",
+                                    column_name="participant_name")
+        sql_query = f"""
+            INSERT INTO recordings ({RECORDINGS_INSERT_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+        """
+        data = _recording_values(metadata=metadata, session_id=session_id, activity_id=activity_id,
+                                 participant_id=participant_id)
+        self.__run_query(sql_query=sql_query, data=data)
+        query_result = self.__cursor.fetchone()
+        if not query_result:
+            raise Exception(f"Failed to insert recording's metadata for: {metadata.file_location}")
+        return query_result[0]
+
+    def get_recordings_to_process(self, start_time: str, end_time: str) -> dict[str, RecordingToProcess]:
             sql_query = """
-                SELECT id::text, video_path 
+                SELECT id::text, video_path, amount_of_frames, frames_lost_on_save, width, height
                 FROM recordings 
                 WHERE start_time >= %s AND end_time <= %s
             """
@@ -232,7 +539,7 @@ class PostgresDBManager(DBManager):
             query_results = self.__cursor.fetchall()
             if not query_results:
                 raise Exception(f"No matching recordings found in time range: {start_time}-{end_time}")
-            results = {row[0]: row[1] for row in query_results}
+            results = {row[0]: _row_to_recording_to_process(row) for row in query_results}
             logging.info(f"Successfully retrieved {len(results)} recordings in time range: {start_time}-{end_time}")
             return results
 
@@ -256,6 +563,84 @@ class PostgresDBManager(DBManager):
         logging.info(f"Successfully updated {processor_name} results for: {results_location}")
 
 
+    def log_processing_metrics(self, run_id: str, video_id: str, metrics: list[StageMetrics]):
+        sql_query = """
+            INSERT INTO processing_metrics (
+                run_id, recording_id, stage, wall_time_sec, cpu_time_sec, frames, frames_skipped, bytes_read, bytes_written,
+                peak_rss_mb
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        try:
+            with self.__transaction():
+                for stage_metrics in metrics:
+                    data = (
+                        run_id, video_id, stage_metrics.stage, stage_metrics.wall_time_sec, stage_metrics.cpu_time_sec,
+                        stage_metrics.frames, stage_metrics.frames_skipped, stage_metrics.bytes_read,
+                        stage_metrics.bytes_written, stage_metrics.peak_rss_mb
+                    )
+                    self.__run_query(sql_query=sql_query, data=data)
+        except Exception as e:
+            raise Exception(f"Failed to log processing metrics of run {run_id} for video {video_id}: {e}")
+
+    def save_metadata_batch(self, metadata: list[RecordingMetaData]) -> list[int]:
+        if not metadata:
+            return []
+        from psycopg2.extras import execute_values
+        sql_query = f"INSERT INTO recordings ({RECORDINGS_INSERT_COLUMNS}) VALUES %s RETURNING id"
+        try:
+            with self.__transaction():
+                session_ids = self.__get_ids(table_name="sessions", column_name="session_start",
+                                             values=[m.session_start for m in metadata])
+                activity_ids = self.__get_ids(table_name="activities", column_name="activity_name",
+                                              values=[m.activity for m in metadata])
+                participant_ids = self.__get_ids(table_name="participants", column_name="participant_name",
+                                                 values=[m.participant for m in metadata])
+                rows = [_recording_values(metadata=m, session_id=session_ids[m.session_start],
+                                          activity_id=activity_ids[m.activity],
+                                          participant_id=participant_ids[m.participant])
+                        for m in metadata]
+                # One multi-row INSERT for the whole batch instead of a round trip per recording
+                recording_ids = [row[0] for row in execute_values(self.__cursor, sql_query, rows,
+                                                                  page_size=len(rows), fetch=True)]
+        except Exception as e:
+            raise Exception(f"Failed to save metadata batch of {len(metadata)} recordings: {e}")
+        logging.info(f"Successfully saved metadata for {len(recording_ids)} recordings")
+        return recording_ids
+
+    def register_results_batch(self, results: list[ResultRecord]) -> int:
+        results = list(dict.fromkeys(results))
+        if not results:
+            return 0
+        from psycopg2.extras import execute_values
+        sql_query = """
+            INSERT INTO results (recording_id, processor_id, file_location)
+            SELECT v.recording_id, v.processor_id, v.file_location
+            FROM (VALUES %s) AS v (recording_id, processor_id, file_location)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM results r
+                WHERE r.recording_id = v.recording_id
+                  AND r.processor_id = v.processor_id
+                  AND r.file_location = v.file_location
+            )
+        """
+        try:
+            with self.__transaction():
+                processor_ids = self.__get_ids(table_name="processors", column_name="processor_name",
+                                               values=[record.processor_name for record in results])
+                rows = [(int(record.video_id), processor_ids[record.processor_name], str(record.results_location))
+                        for record in results]
+                execute_values(self.__cursor, sql_query, rows, template="(%s::int, %s::int, %s::text)",
+                               page_size=len(rows))
+                inserted = self.__cursor.rowcount
+        except Exception as e:
+            raise Exception(f"Failed to register batch of {len(results)} results: {e}")
+        logging.info(f"Successfully registered {inserted} new results out of {len(results)}")
+        return inserted
+
+    def __get_ids(self, table_name: str, column_name: str, values: list[str]) -> dict[str, int]:
+        return {value: self.__get_id(table_name=table_name, column_name=column_name, data=value)
+                for value in dict.fromkeys(values)}
+
     def __del__(self):
         self.__disconnect()
 
@@ -274,3 +659,339 @@ class PostgresDBManager(DBManager):
         except Exception as e:
             raise Exception(f"Failed to get column order from schema: {e}")
 
+
+
+class SQLiteDBManager(DBManager):
+    """
+    Embedded DBManager for single-node deployments and tests: same schema as PostgresDBManager in a local
+    SQLite file, opened in WAL mode so readers don't block the writer. Every public write runs as one
+    transaction, so multi-row writes cost a single commit.
+    """
+    DEFAULT_LOCATION = "./output/pose_estimator.db"
+
+    def __init__(self, location: str | os.PathLike = DEFAULT_LOCATION):
+        self.__location = str(location)
+        self.__conn = None
+        self.__lock = threading.RLock()
+        self.__transaction_depth = 0
+        self.__init_db()
+
+    def get_location(self) -> str:
+        return self.__location
+
+    def __connect(self) -> sqlite3.Connection:
+        if self.__conn is None:
+            if self.__location != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.__location)), exist_ok=True)
+            self.__conn = sqlite3.connect(self.__location, isolation_level=None, check_same_thread=False, timeout=30)
+            self.__conn.execute("PRAGMA journal_mode=WAL")
+            self.__conn.execute("PRAGMA synchronous=NORMAL")
+            self.__conn.execute("PRAGMA foreign_keys=ON")
+        return self.__conn
+
+    def __disconnect(self):
+        if self.__conn:
+            self.__conn.close()
+            self.__conn = None
+
+    def __init_db(self):
+        self.__connect()
+        sql = '''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_start TIMESTAMP NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS activities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                activity_name TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS participants (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                participant_name TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS recordings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id INT REFERENCES sessions(id) ON DELETE SET NULL,
+                activity_id INT REFERENCES activities(id) ON DELETE SET NULL,
+                participant_id INT REFERENCES participants(id) ON DELETE SET NULL,
+                is_corrupted BOOLEAN NOT NULL,
+                video_path TEXT NOT NULL,
+                fps INT NOT NULL,
+                amount_of_frames INT NOT NULL,
+                frames_lost_on_save INT NOT NULL,
+                start_time TIMESTAMP NOT NULL,
+                end_time TIMESTAMP NOT NULL,
+                duration_in_sec INT NOT NULL,
+                frames_dropped INT NOT NULL DEFAULT 0,
+                longest_gap_ms REAL NOT NULL DEFAULT 0,
+                jitter_p50_ms REAL NOT NULL DEFAULT 0,
+                jitter_p95_ms REAL NOT NULL DEFAULT 0,
+                jitter_p99_ms REAL NOT NULL DEFAULT 0,
+                effective_fps REAL NOT NULL DEFAULT 0,
+                width INT NOT NULL DEFAULT 0,
+                height INT NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS processors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                processor_name TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recording_id INT REFERENCES recordings(id) ON DELETE CASCADE,
+                processor_id INT REFERENCES processors(id) ON DELETE SET NULL,
+                file_location TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS recording_views (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recording_id INT REFERENCES recordings(id) ON DELETE CASCADE,
+                device_id INT NOT NULL,
+                video_path TEXT NOT NULL,
+                amount_of_frames INT NOT NULL,
+                frames_dropped INT NOT NULL,
+                longest_gap_ms REAL NOT NULL,
+                jitter_p95_ms REAL NOT NULL,
+                effective_fps REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS processing_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                recording_id INT REFERENCES recordings(id) ON DELETE CASCADE,
+                stage TEXT NOT NULL,
+                wall_time_sec REAL NOT NULL,
+                cpu_time_sec REAL NOT NULL,
+                frames INT NOT NULL,
+                frames_skipped INT NOT NULL DEFAULT 0,
+                bytes_read BIGINT NOT NULL,
+                bytes_written BIGINT NOT NULL,
+                peak_rss_mb REAL NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            '''
+        with self.__lock:
+            self.__conn.executescript(sql + RECORDINGS_INDEXES)
+            metrics_columns = {row[1] for row in self.__conn.execute("PRAGMA table_info(processing_metrics)")}
+            if "frames_skipped" not in metrics_columns:  # databases created before frames could be skipped
+                self.__conn.execute("ALTER TABLE processing_metrics ADD COLUMN frames_skipped INT NOT NULL DEFAULT 0")
+            recordings_columns = {row[1] for row in self.__conn.execute("PRAGMA table_info(recordings)")}
+            for column in ("width", "height"):  # databases created before the resolution was recorded
+                if column not in recordings_columns:
+                    self.__conn.execute(f"ALTER TABLE recordings ADD COLUMN {column} INT NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def __transaction(self):
+        with self.__lock:
+            if self.__transaction_depth == 0:
+                self.__conn.execute("BEGIN IMMEDIATE")
+            self.__transaction_depth += 1
+            try:
+                yield self.__conn
+            except Exception:
+                self.__transaction_depth -= 1
+                if self.__transaction_depth == 0:
+                    self.__conn.execute("ROLLBACK")
+                raise
+            else:
+                self.__transaction_depth -= 1
+                if self.__transaction_depth == 0:
+                    self.__conn.execute("COMMIT")
+
+    def __run_query(self, sql_query: str, data: tuple) -> sqlite3.Cursor:
+        with self.__lock:
+            return self.__conn.execute(sql_query, data)
+
+    def __get_id(self, table_name: str, column_name: str, data: str) -> int:
+        with self.__transaction() as conn:
+            query_result = conn.execute(f"SELECT id FROM {table_name} WHERE {column_name} = ?", (data,)).fetchone()
+            if query_result:
+                return query_result[0]
+            cursor = conn.execute(f"INSERT INTO {table_name} ({column_name}) VALUES (?)", (data,))
+            if cursor.lastrowid is None:
+                raise Exception(f"Failed to insert {column_name}: {data} in table {table_name}")
+            return cursor.lastrowid
+
+    def get_all_recordings(self) -> dict[str, RecordingMetaData]:
+        sql_query = f"""
+            SELECT {RECORDINGS_SELECT_COLUMNS}
+            FROM recordings r
+            LEFT JOIN activities a ON r.activity_id = a.id
+            LEFT JOIN sessions s ON r.session_id = s.id
+            LEFT JOIN participants p ON r.participant_id = p.id
+        """
+        try:
+            rows = self.__run_query(sql_query=sql_query, data=()).fetchall()
+            if not rows:
+                raise Exception("No recordings found in the database.")
+            recordings = dict(_row_to_recording_metadata(row) for row in rows)
+            logging.info(f"Successfully fetched {len(recordings)} recordings from the database.")
+            return recordings
+        except Exception as e:
+            raise Exception(f"Failed to fetch recordings: {e}")
+
+    def remove_recording_by_id(self, recording_id: str) -> list[str]:
+        try:
+            with self.__transaction() as conn:
+                result = conn.execute("SELECT video_path FROM recordings WHERE id = ?", (recording_id,)).fetchone()
+                if not result:
+                    raise Exception(f"No recording deleted; id {recording_id} may not exist.")
+                views = conn.execute("SELECT video_path FROM recording_views WHERE recording_id = ? ORDER BY video_path",
+                                     (recording_id,)).fetchall()
+                conn.execute("DELETE FROM recordings WHERE id = ?", (recording_id,))
+            logging.info(f"Successfully removed recording with id: {recording_id}")
+            return _video_paths_of_recording(result[0], [view[0] for view in views])
+        except Exception as e:
+            raise Exception(f"Failed to remove recording with id {recording_id}: {e}")
+
+    def get_recordings_column_names(self) -> list[str]:
+        try:
+            rows = self.__run_query(sql_query="PRAGMA table_info(recordings)", data=()).fetchall()
+            return [row[1].replace("_id", "_name") for row in rows]
+        except Exception as e:
+            raise Exception(f"Failed to fetch column names from 'recordings' table: {e}")
+
+    def get_recordings_page(self, filters: RecordingFilter | None = None, page_size: int = 50,
+                            cursor: tuple | None = None) -> RecordingPage:
+        sql_query, data = _build_recordings_page_query(filters=filters or RecordingFilter(), page_size=page_size,
+                                                       cursor=cursor, placeholder="?")
+        try:
+            with self.__lock:
+                rows = self.__conn.execute(sql_query, data).fetchmany(page_size + 1)
+        except Exception as e:
+            raise Exception(f"Failed to fetch recordings page: {e}")
+        return _rows_to_recording_page(rows=rows, page_size=page_size)
+
+    def save_metadata_for_video(self, metadata: RecordingMetaData):
+        try:
+            with self.__transaction():
+                self.__insert_recording(metadata=metadata)
+            logging.info(f"Successfully saved recording's metadata for: {metadata.file_location}")
+        except Exception as e:
+            raise e
+
+    def save_metadata_for_multi_view_video(self, metadata: RecordingMetaData, views: list[RecordingView]):
+        sql_query = """
+            INSERT INTO recording_views (
+                recording_id, device_id, video_path, amount_of_frames, frames_dropped,
+                longest_gap_ms, jitter_p95_ms, effective_fps
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        try:
+            with self.__transaction() as conn:
+                recording_id = self.__insert_recording(metadata=metadata)
+                conn.executemany(sql_query, [
+                    (recording_id, view.device_id, str(view.file_location), view.amount_of_frames,
+                     view.frames_dropped, view.longest_gap_ms, view.jitter_p95_ms, view.effective_fps)
+                    for view in views
+                ])
+        except Exception as e:
+            raise Exception(f"Failed to save multi-view recording's metadata for: {metadata.file_location}: {e}")
+        logging.info(f"Successfully saved recording's metadata for {len(views)} views: {metadata.file_location}")
+
+    def __insert_recording(self, metadata: RecordingMetaData) -> int:
+        session_id = self.__get_id(data=metadata.session_start,
+                                   table_name="sessions",
+                                   column_name="session_start")
+        activity_id = self.__get_id(data=metadata.activity,
+                                    table_name="activities",
+                                    column_name="activity_name")
+        participant_id = self.__get_id(data=metadata.participant,
+                                       table_name="participants",
+                                       column_name="participant_name")
+        sql_query = f"""
+            INSERT INTO recordings ({RECORDINGS_INSERT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        data = _recording_values(metadata=metadata, session_id=session_id, activity_id=activity_id,
+                                 participant_id=participant_id)
+        cursor = self.__run_query(sql_query=sql_query, data=data)
+        if cursor.lastrowid is None:
+            raise Exception(f"Failed to insert recording's metadata for: {metadata.file_location}")
+        return cursor.lastrowid
+
+    def get_recordings_to_process(self, start_time: str, end_time: str) -> dict[str, RecordingToProcess]:
+        sql_query = """
+            SELECT CAST(id AS TEXT), video_path, amount_of_frames, frames_lost_on_save, width, height
+            FROM recordings
+            WHERE start_time >= ? AND end_time <= ?
+        """
+        try:
+            query_results = self.__run_query(sql_query=sql_query, data=(start_time, end_time)).fetchall()
+        except Exception as e:
+            raise Exception(f"Query failed in attempt to get recordings in time range: {start_time}-{end_time}: {e}")
+        if not query_results:
+            raise Exception(f"No matching recordings found in time range: {start_time}-{end_time}")
+        results = {row[0]: _row_to_recording_to_process(row) for row in query_results}
+        logging.info(f"Successfully retrieved {len(results)} recordings in time range: {start_time}-{end_time}")
+        return results
+
+    def update_results_for_video(self, processor_name: str, results_location: str, video_id: str):
+        sql_query = "INSERT INTO results (recording_id, processor_id, file_location) VALUES (?, ?, ?)"
+        try:
+            with self.__transaction():
+                processor_id = self.__get_id(data=processor_name,
+                                             table_name="processors",
+                                             column_name="processor_name")
+                cursor = self.__run_query(sql_query=sql_query, data=(video_id, processor_id, results_location))
+        except Exception as e:
+            raise Exception(f"Query failed in attempt to update {processor_name} results for: {results_location}: {e}")
+        if cursor.rowcount != 1:
+            raise Exception(f"Query executed successfully, but no row was inserted in attempt to update {processor_name} results for: {results_location}")
+        logging.info(f"Successfully updated {processor_name} results for: {results_location}")
+
+    def log_processing_metrics(self, run_id: str, video_id: str, metrics: list[StageMetrics]):
+        sql_query = """
+            INSERT INTO processing_metrics (
+                run_id, recording_id, stage, wall_time_sec, cpu_time_sec, frames, frames_skipped, bytes_read, bytes_written,
+                peak_rss_mb
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        try:
+            with self.__transaction() as conn:
+                conn.executemany(sql_query, [
+                    (run_id, video_id, stage_metrics.stage, stage_metrics.wall_time_sec, stage_metrics.cpu_time_sec,
+                     stage_metrics.frames, stage_metrics.frames_skipped, stage_metrics.bytes_read,
+                     stage_metrics.bytes_written, stage_metrics.peak_rss_mb)
+                    for stage_metrics in metrics
+                ])
+        except Exception as e:
+            raise Exception(f"Failed to log processing metrics of run {run_id} for video {video_id}: {e}")
+
+    def save_metadata_batch(self, metadata: list[RecordingMetaData]) -> list[int]:
+        try:
+            with self.__transaction():
+                recording_ids = [self.__insert_recording(metadata=m) for m in metadata]
+        except Exception as e:
+            raise Exception(f"Failed to save metadata batch of {len(metadata)} recordings: {e}")
+        logging.info(f"Successfully saved metadata for {len(recording_ids)} recordings")
+        return recording_ids
+
+    def register_results_batch(self, results: list[ResultRecord]) -> int:
+        results = list(dict.fromkeys(results))
+        if not results:
+            return 0
+        sql_query = """
+            INSERT INTO results (recording_id, processor_id, file_location)
+            SELECT ?, ?, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM results WHERE recording_id = ? AND processor_id = ? AND file_location = ?
+            )
+        """
+        try:
+            with self.__transaction() as conn:
+                processor_ids = {name: self.__get_id(table_name="processors", column_name="processor_name", data=name)
+                                 for name in dict.fromkeys(record.processor_name for record in results)}
+                rows = [(int(record.video_id), processor_ids[record.processor_name], str(record.results_location))
+                        for record in results]
+                inserted = conn.executemany(sql_query, [row + row for row in rows]).rowcount
+        except Exception as e:
+            raise Exception(f"Failed to register batch of {len(results)} results: {e}")
+        logging.info(f"Successfully registered {inserted} new results out of {len(results)}")
+        return inserted
+
+    def __del__(self):
+        self.__disconnect()
@@ -0,0 +1,40 @@
+import numpy as np
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True)
+class FrameTimingStats:
+    frames_dropped: int = 0
+    longest_gap_ms: float = 0.0
+    jitter_p50_ms: float = 0.0
+    jitter_p95_ms: float = 0.0
+    jitter_p99_ms: float = 0.0
+    effective_fps: float = 0.0
+
+
+def compute_frame_timing_stats(timestamps_ns: np.ndarray, fps: int) -> FrameTimingStats:
+    """
+    Computes frame-drop and jitter statistics from per-frame capture timestamps.
+
+    Args:
+        timestamps_ns (np.ndarray): int64 capture timestamps in nanoseconds, one per frame.
+        fps (int): The nominal frame rate the stream was captured at.
+    Returns:
+        FrameTimingStats: A gap of k nominal frame intervals counts as k - 1 dropped frames,
+        jitter is the absolute deviation of each inter-frame interval from the nominal one.
+    """
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    if timestamps_ns.size < 2 or fps <= 0:
+        return FrameTimingStats()
+    intervals_ns = np.diff(timestamps_ns)
+    nominal_interval_ns = 1e9 / fps
+    missed_intervals = np.rint(intervals_ns / nominal_interval_ns) - 1
+    jitter_ms = np.abs(intervals_ns - nominal_interval_ns) / 1e6
+    p50, p95, p99 = np.percentile(jitter_ms, [50, 95, 99])
+    span_ns = timestamps_ns[-1] - timestamps_ns[0]
+    return FrameTimingStats(frames_dropped=int(np.clip(missed_intervals, 0, None).sum()),
+                            longest_gap_ms=float(intervals_ns.max() / 1e6),
+                            jitter_p50_ms=float(p50),
+                            jitter_p95_ms=float(p95),
+                            jitter_p99_ms=float(p99),
+                            effective_fps=float((timestamps_ns.size - 1) / (span_ns / 1e9)) if span_ns > 0 else 0.0)
@@ -0,0 +1,163 @@
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Iterator
+
+_PROC_STATUS = "/proc/self/status"
+_PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+@dataclass(kw_only=True)
+class StageMetrics:
+    stage: str
+    wall_time_sec: float = 0.0
+    cpu_time_sec: float = 0.0
+    frames: int = 0
+    frames_skipped: int = 0  # frames whose result was carried forward instead of computed
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_rss_mb: float = 0.0
+
+    def frames_per_sec(self) -> float:
+        return self.frames / self.wall_time_sec if self.wall_time_sec > 0 else 0.0
+
+    def skip_ratio(self) -> float:
+        return self.frames_skipped / self.frames if self.frames > 0 else 0.0
+
+    def to_metadata(self) -> dict:
+        metadata = {key: value for key, value in asdict(self).items() if key != "stage"}
+        metadata["frames_per_sec"] = self.frames_per_sec()
+        metadata["skip_ratio"] = self.skip_ratio()
+        return metadata
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Resets the kernel's peak RSS counter (VmHWM) so the next reading covers only the current stage.
+    Only available on Linux; elsewhere the process-lifetime peak is reported.
+    """
+    try:
+        with open(_PROC_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _read_peak_rss_mb() -> float:
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024  # bytes on macOS, KiB on Linux
+
+
+@contextmanager
+def measure_stage(stage: str) -> Iterator[StageMetrics]:
+    """
+    Measures wall time, process CPU time and peak RSS of the enclosed block.
+    The caller fills in `frames`, `bytes_read` and `bytes_written` on the yielded metrics.
+    """
+    metrics = StageMetrics(stage=stage)
+    _reset_peak_rss()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_time_sec = time.perf_counter() - wall_start
+        metrics.cpu_time_sec = time.process_time() - cpu_start
+        metrics.peak_rss_mb = _read_peak_rss_mb()
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler: a background thread snapshots the target thread's stack every
+    `interval_sec` and counts identical stacks. The result is written in the folded-stack format
+    (`frame;frame;frame count`) understood by flamegraph tools.
+    """
+    def __init__(self, interval_sec: float = 0.005, target_thread_id: int | None = None):
+        self.__interval_sec = interval_sec
+        self.__target_thread_id = target_thread_id
+        self.__samples = Counter()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def start(self) -> None:
+        if self.__target_thread_id is None:
+            self.__target_thread_id = threading.get_ident()
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name="sampling-profiler", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> Counter:
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        return self.__samples
+
+    def get_samples(self) -> Counter:
+        return self.__samples
+
+    def write_folded(self, location: str | os.PathLike) -> str:
+        with open(location, "w") as f:
+            for stack, count in self.__samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return str(location)
+
+    def __run(self):
+        while not self.__stop_event.wait(self.__interval_sec):
+            frame = sys._current_frames().get(self.__target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.__samples[";".join(reversed(stack))] += 1
+
+
+class StageProfiler:
+    """
+    Per-run switch for the sampling profiler: when enabled, `profile(name)` samples the enclosed block
+    and writes `<output_dir>/<name>.folded`; when disabled it costs nothing.
+    """
+    def __init__(self, enabled: bool = False, interval_ms: float = 5.0, output_dir: str = "./output/profiles"):
+        self.__enabled = enabled
+        self.__interval_sec = interval_ms / 1000
+        self.__output_dir = output_dir
+
+    def is_enabled(self) -> bool:
+        return self.__enabled
+
+    def profile(self, name: str):
+        if not self.__enabled:
+            return nullcontext()
+        return self.__profile(name)
+
+    @contextmanager
+    def __profile(self, name: str):
+        profiler = SamplingProfiler(interval_sec=self.__interval_sec)
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            try:
+                os.makedirs(self.__output_dir, exist_ok=True)
+                location = profiler.write_folded(os.path.join(self.__output_dir, f"{name}.folded"))
+                logging.info(f"Saved sampling profile to: {location}")
+            except Exception as e:
+                logging.error(f"Failed to save sampling profile {name}: {e}")
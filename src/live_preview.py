@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable
+
+
+class LatestFrameQueue:
+    """
+    Single-slot, latest-frame-wins hand-off between a producer (the capture loop) and a consumer.
+
+    `put` never blocks: a frame that was not consumed yet is overwritten and counted as dropped,
+    so a slow consumer only ever sees the freshest frame and the producer is never throttled.
+    Frames carry their capture time as wall-clock nanoseconds since the epoch, like the recording's timestamp track.
+    """
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__frame = None
+        self.__captured_at_ns = 0
+        self.__frame_index = -1
+        self.__dropped = 0
+        self.__closed = False
+
+    def put(self, frame: np.ndarray, captured_at_ns: int) -> None:
+        with self.__condition:
+            if self.__frame is not None:
+                self.__dropped += 1
+            self.__frame = frame
+            self.__captured_at_ns = captured_at_ns
+            self.__frame_index += 1
+            self.__condition.notify()
+
+    def get(self, timeout: float | None = None) -> tuple[np.ndarray, int, int] | None:
+        """
+        Waits for the latest frame.
+
+        Returns:
+            tuple | None: (frame, frame_index, captured_at_ns), or None on timeout / once the queue is closed and empty.
+        """
+        with self.__condition:
+            if self.__frame is None and not self.__closed:
+                self.__condition.wait(timeout=timeout)
+            if self.__frame is None:
+                return None
+            item = (self.__frame, self.__frame_index, self.__captured_at_ns)
+            self.__frame = None
+            return item
+
+    def close(self) -> None:
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+    def is_closed(self) -> bool:
+        return self.__closed
+
+    def get_dropped_count(self) -> int:
+        return self.__dropped
+
+
+@dataclass(kw_only=True)
+class LivePreviewStats:
+    second: int
+    frames_processed: int
+    frames_dropped: int
+    processed_fps: float
+    mean_latency_ms: float
+    max_latency_ms: float
+    person_detected: bool
+    skeleton_detected: bool
+
+    def __str__(self) -> str:
+        return (f"[{self.second:>3}s] {self.processed_fps:5.1f} fps | "
+                f"latency {self.mean_latency_ms:6.1f} ms (max {self.max_latency_ms:6.1f} ms) | "
+                f"dropped {self.frames_dropped:>3} | "
+                f"person: {'yes' if self.person_detected else 'no'} | "
+                f"skeleton: {'yes' if self.skeleton_detected else 'no'}")
+
+
+class LivePoseMonitor:
+    """
+    Runs pose estimation on the latest captured frame in a background thread and reports
+    latency, processed fps and detection status once per second.
+
+    The processor must provide `process(frames)` and `detection_status(result)`, like `YoloProcessor`.
+    """
+    def __init__(self, processor, frame_queue: LatestFrameQueue,
+                 report: Callable[[LivePreviewStats], None] = print, report_interval_sec: float = 1.0):
+        self.__processor = processor
+        self.__queue = frame_queue
+        self.__report = report
+        self.__report_interval_ns = int(report_interval_sec * 1e9)
+        self.__thread = None
+        self.__stop_event = threading.Event()
+        self.__history: list[LivePreviewStats] = []
+
+    def start(self) -> None:
+        if self.__thread is not None:
+            raise Exception("Live pose monitor is already running")
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name="live-pose-monitor", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> list[LivePreviewStats]:
+        self.__stop_event.set()
+        self.__queue.close()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        return self.__history
+
+    def get_history(self) -> list[LivePreviewStats]:
+        return self.__history
+
+    def __run(self):
+        started_at = time.monotonic_ns()
+        window_start = started_at
+        latencies_ns = []
+        person_detected = False
+        skeleton_detected = False
+        dropped_at_window_start = self.__queue.get_dropped_count()
+        while not self.__stop_event.is_set():
+            item = self.__queue.get(timeout=0.1)
+            if item is not None:
+                frame, _, captured_at_ns = item
+                try:
+                    result = self.__processor.process(frame[np.newaxis])[0]
+                    has_person, has_skeleton = self.__processor.detection_status(result)
+                except Exception as e:
+                    logging.error(f"Live pose estimation failed: {e}")
+                    continue
+                latencies_ns.append(time.time_ns() - captured_at_ns)  # from capture, not from the hand-off
+                person_detected |= has_person
+                skeleton_detected |= has_skeleton
+            now = time.monotonic_ns()
+            if now - window_start >= self.__report_interval_ns:
+                dropped = self.__queue.get_dropped_count()
+                stats = self.__summarize(second=round((now - started_at) / 1e9),
+                                         window_ns=now - window_start,
+                                         latencies_ns=latencies_ns,
+                                         frames_dropped=dropped - dropped_at_window_start,
+                                         person_detected=person_detected,
+                                         skeleton_detected=skeleton_detected)
+                self.__history.append(stats)
+                self.__report(stats)
+                window_start = now
+                dropped_at_window_start = dropped
+                latencies_ns = []
+                person_detected = False
+                skeleton_detected = False
+
+    @staticmethod
+    def __summarize(second: int, window_ns: int, latencies_ns: list[int], frames_dropped: int,
+                    person_detected: bool, skeleton_detected: bool) -> LivePreviewStats:
+        latencies_ms = np.asarray(latencies_ns, dtype=np.int64) / 1e6
+        return LivePreviewStats(second=second,
+                                frames_processed=len(latencies_ns),
+                                frames_dropped=frames_dropped,
+                                processed_fps=len(latencies_ns) / (window_ns / 1e9),
+                                mean_latency_ms=float(latencies_ms.mean()) if latencies_ns else 0.0,
+                                max_latency_ms=float(latencies_ms.max()) if latencies_ns else 0.0,
+                                person_detected=person_detected,
+                                skeleton_detected=skeleton_detected)
@@ -1,17 +1,31 @@
+import argparse
 from src.session_manager import SessionManager
-from datetime import datetime
-from src.storage_manager import PreRecordingData
+from datetime import datetime, timedelta
+from src.db_manager import RecordingFilter
+from src.storage_manager import PreRecordingData, VideoEncoding, VIDEO_EXTENSIONS
 from dotenv import load_dotenv
 
 class Session:
-    def __init__(self):
+    def __init__(self, live_preview: bool = False, devices: list[int] | None = None, db_backend: str | None = None,
+                 encoding: VideoEncoding | None = None, storage_backend: str | None = None):
         self.__participant_name = None
+        self.__page_size = 20
+        self.__devices = devices
         self.__video_types = {
         1: {"activity": "Calibration", "sec": 10},
         2: {"activity": "A-pose", "sec": 30}}
         self.__choices = list(self.__video_types.keys()) + [(len(self.__video_types)+1)] + [(len(self.__video_types)+2)]
         self.__session_start = datetime.now().isoformat()
-        self.__session_manager = SessionManager(session_start = self.__session_start)
+        self.__session_manager = SessionManager(session_start = self.__session_start,
+                                                device_id=devices[0] if devices else 0,
+                                                db_backend=db_backend,
+                                                encoding=encoding,
+                                                storage_backend=storage_backend)
+        self.__live_processor = None
+        if live_preview:
+            from src.postprocessor import YoloProcessor
+            self.__live_processor = YoloProcessor()
+            self.__live_processor.load_model()
 
     def run(self):
         try:
@@ -31,14 +45,8 @@ class Session:
                 if action == self.__choices[-1]:
                     self.__exit_program()
                 elif action == self.__choices[-2]:
-                    raws, headers = self.__session_manager.get_all_recordings()
-                    if not raws or not headers:
-                        print("No recordings found in the database.")
-                        continue
-                    else:
-                        self.__print_recordings_table(raws, headers)
-                        self.__prompt_to_remove_recording()
-                        continue
+                    self.__browse_recordings()
+                    continue
                 else:
                     selected_video = self.__video_types[action]
                     self.__record_video(selected_video)
@@ -57,11 +65,22 @@ class Session:
                                            session_start=self.__session_start,
                                            participant=self.__participant_name)
 
-        successfully_recorded = self.__session_manager.record_video(video_data=video_to_record)
+        multi_view = self.__devices is not None and len(self.__devices) > 1
+        if multi_view:
+            successfully_recorded = self.__session_manager.record_multi_view_video(video_data=video_to_record,
+                                                                                   device_ids=self.__devices)
+        elif self.__live_processor is not None:
+            successfully_recorded = self.__session_manager.record_video_with_preview(video_data=video_to_record,
+                                                                                     processor=self.__live_processor)
+        else:
+            successfully_recorded = self.__session_manager.record_video(video_data=video_to_record)
         if successfully_recorded:
             to_save = input("Recording completed, would you like to save it? (yes/no): ").lower().strip()
             if to_save == "yes":
-                successfully_saved = self.__session_manager.save_last_recording()
+                if multi_view:
+                    successfully_saved = self.__session_manager.save_last_multi_view_recording()
+                else:
+                    successfully_saved = self.__session_manager.save_last_recording()
                 if successfully_saved:
                     print(
                         f"\nRecording successfully saved. Thank you for recording the {selected_video['activity']} video!")
@@ -76,7 +95,7 @@ class Session:
         print(f"\nHello, {self.__participant_name}! Please choose an action: ")
         for key, value in self.__video_types.items():
             print(f"{key}. Record a {value['activity']} Video ({value['sec']} seconds)")
-        print(f"{self.__choices[-2]}. Display all recordings / Choose a recording to remove")
+        print(f"{self.__choices[-2]}. Browse recordings / Choose a recording to remove")
         print(f"{self.__choices[-1]}. Exit")
     
     def __print_recordings_table(self, rows: list[list[str]], headers: list[str]):
@@ -96,22 +115,66 @@ class Session:
         for row in rows:
             print(format_row(row))
     
-    def __prompt_to_remove_recording(self):
+    def __browse_recordings(self):
+        filters = self.__prompt_for_recording_filter()
+        cursor = None
+        while True:
+            page = self.__session_manager.get_recordings_page(filters=filters, page_size=self.__page_size, cursor=cursor)
+            if page is None:
+                print("Failed to load recordings, please try again.")
+                return
+            rows, headers, cursor = page
+            if not rows:
+                print("No recordings found in the database.")
+                return
+            self.__print_recordings_table(rows, headers)
+            if not self.__prompt_to_remove_recording(has_next_page=cursor is not None):
+                return
+
+    def __prompt_for_recording_filter(self) -> RecordingFilter:
+        print("Filter recordings (press Enter to skip a filter):")
+        participant = input("Participant name: ").strip() or None
+        activity = input("Activity: ").strip() or None
+        recorded_from, recorded_to = None, None
         while True:
-            user_input = input("Enter recording ID to remove, or press Enter to return to main menu: ").strip()
+            day = input("Recording date (YYYY-MM-DD): ").strip()
+            if day == "":
+                break
+            try:
+                day_start = datetime.strptime(day, "%Y-%m-%d")
+            except ValueError:
+                print("Invalid date, please use the YYYY-MM-DD format.")
+                continue
+            recorded_from = day_start.isoformat()
+            recorded_to = (day_start + timedelta(days=1)).isoformat()
+            break
+        corrupted = input("Only corrupted recordings? (yes/no): ").lower().strip()
+        is_corrupted = {"yes": True, "no": False}.get(corrupted)
+        return RecordingFilter(participant=participant, activity=activity, recorded_from=recorded_from,
+                               recorded_to=recorded_to, is_corrupted=is_corrupted)
+
+    def __prompt_to_remove_recording(self, has_next_page: bool = False) -> bool:
+        """
+        Returns True when the user asked for the next page of recordings.
+        """
+        next_page_hint = ", 'n' for the next page" if has_next_page else ""
+        while True:
+            user_input = input(f"Enter recording ID to remove{next_page_hint}, or press Enter to return to main menu: ").strip()
             if user_input == "":
                 print("Returning to main menu...")
-                return
+                return False
+            if has_next_page and user_input.lower() == "n":
+                return True
             if not user_input.isdigit():
                 print("Invalid ID. Please enter a numeric recording ID: ")
                 continue
             try:
-                video_path = self.__session_manager.remove_recording(user_input)
-                if video_path:
-                    print(f"Recording {user_input} removed successfully. File was located at: {video_path}")
+                video_paths = self.__session_manager.remove_recording(user_input)
+                if video_paths:
+                    print(f"Recording {user_input} removed successfully. Files were located at: {', '.join(video_paths)}")
                 else:
                     print("Failed to remove recording, please try again.")
-                break
+                return False
             except Exception:
                 raise
     
@@ -121,6 +184,29 @@ class Session:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Video Recording Application")
+    parser.add_argument("--live-preview", action="store_true",
+                        help="Run pose estimation on the latest captured frame while recording and "
+                             "report latency, processed fps and detection status every second")
+    parser.add_argument("--db-backend", choices=["postgres", "sqlite"], default=None,
+                        help="Where recording metadata is stored, defaults to the DB_BACKEND env var (postgres)")
+    parser.add_argument("--storage-backend", choices=["local", "object_store"], default=None,
+                        help="Where recordings are saved, defaults to the STORAGE_BACKEND env var (local); "
+                             "the object store is configured through the OBJECT_STORE_* env vars")
+    parser.add_argument("--devices", type=int, nargs="+", default=None,
+                        help="Capture device indices; with more than one, all views are recorded in sync "
+                             "and stored under one logical recording")
+    parser.add_argument("--video-codec", choices=list(VIDEO_EXTENSIONS), default="ffv1",
+                        help="ffv1 (lossless), mjpeg (near-lossless, faster) or npy (raw memory-mapped frames)")
+    parser.add_argument("--segment-frames", type=int, default=None,
+                        help="Save recordings as segments of this many frames, encoded in parallel")
+    parser.add_argument("--encoder-threads", type=int, default=0,
+                        help="Parallel segment encoders / MJPEG stripes, all cores by default")
+    args = parser.parse_args()
+    if args.live_preview and args.devices and len(args.devices) > 1:
+        parser.error("--live-preview supports a single capture device, it can't be combined with several --devices")
     load_dotenv()
-    session = Session()
+    encoding = VideoEncoding(codec=args.video_codec, segment_frames=args.segment_frames, threads=args.encoder_threads)
+    session = Session(live_preview=args.live_preview, devices=args.devices, db_backend=args.db_backend,
+                      encoding=encoding, storage_backend=args.storage_backend)
     session.run()
\ No newline at end of file
@@ -0,0 +1,588 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, TYPE_CHECKING
+
+import fcntl
+import hashlib
+import io
+import json
+import logging
+import math
+import numpy as np
+import os
+import posixpath
+import struct
+import tempfile
+from itertools import islice
+from src.storage_manager import StorageManager, LocalStorageManager, VideoEncoding, MANIFEST_FILE_NAME, \
+    is_segmented_video, timestamps_location_for_video
+
+if TYPE_CHECKING:
+    import pandas
+    import pandas as pd
+
+
+def _is_not_found(e: Exception) -> bool:
+    """
+    Whether an S3 client error means the object doesn't exist, without importing botocore.
+    """
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class DiskCache:
+    """
+    Read-through cache of object-store objects on local disk, shared by every process on the node that uses the same
+    folder. Entries are keyed by object key and ETag, so an overwritten object is fetched again while an unchanged one
+    is served locally. Once the folder holds more than `max_bytes`, the least recently used entries are evicted;
+    entries in use are never evicted.
+
+    All state lives in the folder: the total size and the recency order are re-read from it under a cache-wide `flock`,
+    and every entry has a lock file that its readers hold shared while they use it and an evicting process must take
+    exclusively, so the guarantees hold across processes, not just threads.
+    """
+    STAGING_FOLDER = ".staging"
+    LOCKS_FOLDER = ".locks"
+    LOCK_FILE_NAME = ".lock"
+
+    def __init__(self, location: str = "./output/cache", max_bytes: int = 10 * 1024 ** 3):
+        self.__location = location
+        self.__max_bytes = max_bytes
+        os.makedirs(self.get_staging_location(), exist_ok=True)
+        os.makedirs(os.path.join(location, self.LOCKS_FOLDER), exist_ok=True)
+
+    def get_location(self) -> str:
+        return self.__location
+
+    def get_staging_location(self) -> str:
+        """
+        Folder for files on their way into the cache, on the same filesystem so they can be moved in.
+        """
+        return os.path.join(self.__location, self.STAGING_FOLDER)
+
+    def get_size(self) -> int:
+        with self.__locked():
+            return sum(size for _, size in self.__scan())
+
+    def contains(self, key: str, etag: str) -> bool:
+        return os.path.exists(os.path.join(self.__location, self.__entry_name(key, etag)))
+
+    @contextmanager
+    def use(self, key: str, etag: str, fetch: Callable[[str], None]) -> Iterator[str]:
+        """
+        Yields the local path of the object, calling `fetch(path)` to download it on a miss. Readers that miss the
+        same entry at once, in this process or another, wait for a single download.
+        """
+        name = self.__entry_name(key, etag)
+        path = os.path.join(self.__location, name)
+        entry_lock = self.__lock_entry(name, fcntl.LOCK_SH)
+        try:
+            if os.path.exists(path):
+                os.utime(path)  # keeps the recency order
+            else:
+                fcntl.flock(entry_lock, fcntl.LOCK_UN)
+                fcntl.flock(entry_lock, fcntl.LOCK_EX)
+                tmp_location = None
+                try:
+                    if not os.path.exists(path):  # unless another reader fetched it meanwhile
+                        fd, tmp_location = tempfile.mkstemp(dir=self.get_staging_location())
+                        os.close(fd)
+                        fetch(tmp_location)
+                    with self.__locked():  # no eviction can slip in while the lock is downgraded
+                        if tmp_location:
+                            os.replace(tmp_location, path)
+                        fcntl.flock(entry_lock, fcntl.LOCK_SH)
+                finally:
+                    if tmp_location and os.path.exists(tmp_location):
+                        os.remove(tmp_location)
+                self.__evict()
+            yield path
+        finally:
+            entry_lock.close()
+            self.__evict()
+
+    def add(self, key: str, etag: str, file_location: str) -> str:
+        """
+        Moves a local file that holds the object's content into the cache.
+        """
+        path = os.path.join(self.__location, self.__entry_name(key, etag))
+        with self.__locked():
+            os.replace(file_location, path)
+        self.__evict()
+        return path
+
+    def __evict(self) -> None:
+        with self.__locked():
+            entries = self.__scan()
+            total = sum(size for _, size in entries)
+            for name, size in entries:
+                if total <= self.__max_bytes:
+                    return
+                entry_lock = self.__lock_entry(name, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if entry_lock is None:  # in use
+                    continue
+                try:
+                    os.remove(os.path.join(self.__location, name))
+                    os.remove(entry_lock.name)
+                    total -= size
+                except FileNotFoundError:
+                    total -= size
+                except Exception as e:
+                    logging.warning(f"Failed to evict {name} from the cache: {e}")
+                finally:
+                    entry_lock.close()
+
+    def __lock_entry(self, name: str, operation: int):
+        """
+        Opens and locks the entry's lock file. Returns None if the lock is non-blocking and taken.
+        """
+        location = os.path.join(self.__location, self.LOCKS_FOLDER, name)
+        while True:
+            entry_lock = open(location, "a")
+            try:
+                fcntl.flock(entry_lock, operation)
+            except BlockingIOError:
+                entry_lock.close()
+                return None
+            try:
+                # an evicting process may have removed the file between the open and the lock
+                if os.path.samestat(os.fstat(entry_lock.fileno()), os.stat(location)):
+                    return entry_lock
+            except FileNotFoundError:
+                pass
+            entry_lock.close()
+
+    @contextmanager
+    def __locked(self) -> Iterator[None]:
+        """
+        Holds the cache-wide lock that adding and evicting entries take.
+        """
+        with open(os.path.join(self.__location, self.LOCK_FILE_NAME), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __scan(self) -> list[tuple[str, int]]:
+        """
+        The entries with their sizes, least recently used first.
+        """
+        entries = []
+        for entry in os.scandir(self.__location):
+            if entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        return [(name, size) for _, name, size in sorted(entries)]
+
+    @staticmethod
+    def __entry_name(key: str, etag: str) -> str:
+        # the extension is kept so readers that dispatch on it (npy, parquet, avi) still work
+        return hashlib.sha256(f"{key}\n{etag}".encode()).hexdigest() + posixpath.splitext(key)[1]
+
+
+class ObjectStoreStorageManager(StorageManager):
+    """
+    Stores recordings and results in an S3-compatible object store, so recording stations and processing nodes
+    don't have to share a filesystem. Locations are `s3://<bucket>/<key>` URIs laid out like LocalStorageManager's
+    folders.
+
+    Files are encoded or serialised locally first, then uploaded with parallel multipart uploads. Reads go through
+    a DiskCache filled with parallel ranged GETs, so processing the same recording again on a node doesn't download
+    it again. Segmented videos are fetched segment by segment, and the chunked reader only fetches the segments
+    from its start frame on, prefetching the next one while the current one is decoded. Videos are therefore
+    written as segments of DEFAULT_SEGMENT_FRAMES frames unless the encoding sets `segment_frames`; a
+    non-segmented video is downloaded whole before its first chunk is read.
+    """
+    SCHEME = "s3://"
+    DEFAULT_SEGMENT_FRAMES = 900
+    HEADER_BYTES = 64 * 1024  # enough for the npy header and the AVI main header
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, endpoint_url: str | None = None,
+                 cache: DiskCache | None = None, encoding: VideoEncoding | None = None,
+                 part_size: int = 8 * 1024 * 1024, max_concurrency: int = 8):
+        self.__bucket = bucket
+        self.__prefix = prefix.strip("/")
+        super().__init__(self.SCHEME + posixpath.join(bucket, self.__prefix).rstrip("/"))
+        self.__client = client or self.__create_client(endpoint_url=endpoint_url, max_concurrency=max_concurrency)
+        self.__cache = cache or DiskCache()
+        self.__encoding = encoding or VideoEncoding(segment_frames=self.DEFAULT_SEGMENT_FRAMES)
+        self.__part_size = part_size  # S3 requires at least 5 MiB for every part but the last
+        self.__max_concurrency = max_concurrency
+        self.__decoder = LocalStorageManager(location=self.__cache.get_location(), encoding=self.__encoding)
+
+    @staticmethod
+    def __create_client(endpoint_url: str | None, max_concurrency: int):
+        import boto3  # imported on first use, only the object-store backend needs it
+        from botocore.config import Config
+        return boto3.client("s3", endpoint_url=endpoint_url,
+                            config=Config(max_pool_connections=max(10, max_concurrency)))
+
+    def get_encoding(self) -> VideoEncoding:
+        return self.__encoding
+
+    def get_cache(self) -> DiskCache:
+        return self.__cache
+
+    def __location_for_key(self, key: str) -> str:
+        return f"{self.SCHEME}{self.__bucket}/{key}"
+
+    def __key_for_path(self, relative_path: str) -> str:
+        return "/".join(part for part in (self.__prefix, *relative_path.split(os.sep)) if part)
+
+    def __parse_location(self, location: str | os.PathLike) -> tuple[str, str]:
+        location = str(location)
+        if not location.startswith(self.SCHEME):
+            raise ValueError(f"{location} is not an object-store location")
+        bucket, _, key = location.removeprefix(self.SCHEME).partition("/")
+        return bucket, key
+
+    @contextmanager
+    def __staging(self) -> Iterator[str]:
+        with tempfile.TemporaryDirectory(dir=self.__cache.get_staging_location()) as staging_folder:
+            yield staging_folder
+
+    def __upload_staged(self, staging_folder: str, file_location: str) -> str:
+        """
+        Uploads a file written under `staging_folder` to the key mirroring its relative path, and keeps the file
+        in the cache so it isn't downloaded again on this node.
+        """
+        key = self.__key_for_path(os.path.relpath(file_location, staging_folder))
+        etag = self.__upload_file(file_location, self.__bucket, key)
+        self.__cache.add(f"{self.__bucket}/{key}", etag, file_location)
+        return self.__location_for_key(key)
+
+    def __upload_file(self, file_location: str, bucket: str, key: str) -> str:
+        """
+        Uploads a file, in `part_size` parts sent in parallel when it's larger than one part. Returns its ETag.
+        """
+        size = os.path.getsize(file_location)
+        try:
+            if size <= self.__part_size:
+                with open(file_location, "rb") as f:
+                    return self.__client.put_object(Bucket=bucket, Key=key, Body=f.read())["ETag"]
+        except Exception as e:
+            raise Exception(f"Failed to upload {key}: {e}")
+
+        upload_id = self.__client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+        def upload_part(part_number: int) -> dict:
+            with open(file_location, "rb") as f:
+                f.seek((part_number - 1) * self.__part_size)
+                body = f.read(self.__part_size)
+            response = self.__client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                 PartNumber=part_number, Body=body)
+            return {"ETag": response["ETag"], "PartNumber": part_number}
+        try:
+            with ThreadPoolExecutor(max_workers=self.__max_concurrency) as pool:
+                parts = list(pool.map(upload_part, range(1, math.ceil(size / self.__part_size) + 1)))
+            return self.__client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                           MultipartUpload={"Parts": parts})["ETag"]
+        except Exception as e:
+            self.__client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            raise Exception(f"Failed to upload {key}: {e}")
+
+    def __head(self, location: str | os.PathLike) -> dict | None:
+        bucket, key = self.__parse_location(location)
+        try:
+            return self.__client.head_object(Bucket=bucket, Key=key)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+    def __download(self, location: str | os.PathLike, head: dict, file_location: str) -> None:
+        """
+        Downloads an object into `file_location`, with parallel ranged GETs when it's larger than one part.
+        """
+        bucket, key = self.__parse_location(location)
+        size = head["ContentLength"]
+        if size <= self.__part_size:
+            body = self.__client.get_object(Bucket=bucket, Key=key, IfMatch=head["ETag"])["Body"].read()
+            with open(file_location, "wb") as f:
+                f.write(body)
+            return
+
+        with open(file_location, "wb") as f:
+            f.truncate(size)
+        fd = os.open(file_location, os.O_WRONLY)
+        def fetch_range(start: int) -> None:
+            end = min(start + self.__part_size, size) - 1
+            body = self.__client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}",
+                                            IfMatch=head["ETag"])["Body"].read()
+            os.pwrite(fd, body, start)
+        try:
+            with ThreadPoolExecutor(max_workers=self.__max_concurrency) as pool:
+                list(pool.map(fetch_range, range(0, size, self.__part_size)))
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def __cached(self, location: str | os.PathLike) -> Iterator[str]:
+        """
+        Yields a local copy of the object, downloading it only if the cache doesn't hold its current version.
+        """
+        head = self.__head(location)
+        if head is None:
+            raise FileNotFoundError(f"Object {location} not found")
+        bucket, key = self.__parse_location(location)
+        with self.__cache.use(f"{bucket}/{key}", head["ETag"],
+                              lambda file_location: self.__download(location, head, file_location)) as path:
+            yield path
+
+    def __fetch(self, location: str | os.PathLike) -> None:
+        with self.__cached(location):
+            pass
+
+    def __list(self, location: str | os.PathLike) -> list[dict]:
+        """
+        All objects under the "folder" at `location`.
+        """
+        bucket, key = self.__parse_location(location)
+        objects, token = [], None
+        while True:
+            kwargs = {"ContinuationToken": token} if token else {}
+            response = self.__client.list_objects_v2(Bucket=bucket, Prefix=key.rstrip("/") + "/", **kwargs)
+            objects.extend(response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return objects
+            token = response["NextContinuationToken"]
+
+    def __delete(self, bucket: str, keys: list[str]) -> None:
+        for start in range(0, len(keys), 1000):  # the most a single DeleteObjects request takes
+            self.__client.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": key}
+                                                                            for key in keys[start:start + 1000]]})
+
+    def __read_json(self, location: str | os.PathLike) -> dict:
+        with self.__cached(location) as path, open(path) as f:
+            return json.load(f)
+
+    def __segment_locations(self, location: str | os.PathLike, manifest: dict) -> list[str]:
+        folder = posixpath.dirname(str(location))
+        return [f"{folder}/{segment['file']}" for segment in manifest["segments"]]
+
+    def write_video_to_storage(self, frames: np.ndarray, fps: int, file_name: str = "") -> str:
+        with self.__staging() as staging_folder:
+            encoder = LocalStorageManager(location=staging_folder, encoding=self.__encoding)
+            file_location = encoder.write_video_to_storage(frames=frames, fps=fps, file_name=file_name)
+            if not is_segmented_video(file_location):
+                return self.__upload_staged(staging_folder, file_location)
+            with open(file_location) as f:
+                segments = json.load(f)["segments"]
+            folder = os.path.dirname(file_location)
+            with ThreadPoolExecutor(max_workers=self.__max_concurrency) as pool:
+                list(pool.map(lambda segment: self.__upload_staged(staging_folder, os.path.join(folder, segment["file"])),
+                              segments))
+            return self.__upload_staged(staging_folder, file_location)  # the manifest goes last, as locally
+
+    def read_video_from_storage(self, location: str | os.PathLike) -> np.ndarray:
+        try:
+            if is_segmented_video(location):
+                return self.__read_video_segments(location)
+            with self.__cached(location) as path:
+                return self.__decoder.read_video_from_storage(path)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to read {location} from storage: {e}")
+
+    def __read_video_segments(self, location: str | os.PathLike) -> np.ndarray:
+        """
+        Fetches and decodes the segments concurrently, each into its slice of one preallocated array.
+        """
+        manifest = self.__read_json(location)
+        frames = np.empty((manifest["frame_count"], *manifest["frame_shape"]), dtype=manifest["dtype"])
+
+        def read_segment(segment: dict, segment_location: str) -> None:
+            with self.__cached(segment_location) as path:
+                decoded = self.__decoder.read_video_from_storage(path)
+            if decoded.shape[0] != segment["frames"]:
+                raise ValueError(f"Segment {segment['file']} has {decoded.shape[0]} frames, expected {segment['frames']}")
+            frames[segment["first_frame"]:segment["first_frame"] + segment["frames"]] = decoded
+        with ThreadPoolExecutor(max_workers=self.__max_concurrency) as pool:
+            list(pool.map(read_segment, manifest["segments"], self.__segment_locations(location, manifest)))
+        return frames
+
+    def __iter_frames(self, location: str | os.PathLike, start_frame: int, chunk_size: int) -> Iterator[np.ndarray]:
+        if not is_segmented_video(location):
+            with self.__cached(location) as path:
+                for _, chunk in self.__decoder.read_video_chunks_from_storage(path, chunk_size=chunk_size,
+                                                                             start_frame=start_frame):
+                    yield from chunk
+            return
+        manifest = self.__read_json(location)
+        first_segment = start_frame // manifest["segment_frames"]
+        segments = manifest["segments"][first_segment:]
+        locations = self.__segment_locations(location, manifest)[first_segment:]
+
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            for index, (segment, segment_location) in enumerate(zip(segments, locations)):
+                with self.__cached(segment_location) as path:
+                    if index + 1 < len(locations):
+                        prefetcher.submit(self.__fetch, locations[index + 1])
+                    for _, chunk in self.__decoder.read_video_chunks_from_storage(
+                            path, chunk_size=chunk_size, start_frame=max(0, start_frame - segment["first_frame"])):
+                        yield from chunk
+
+    def read_video_chunks_from_storage(self, location: str | os.PathLike, chunk_size: int,
+                                       start_frame: int = 0) -> Iterator[tuple[int, np.ndarray]]:
+        frames = self.__iter_frames(location, start_frame=start_frame, chunk_size=chunk_size)
+        first_frame = start_frame
+        while True:
+            chunk = list(islice(frames, chunk_size))
+            if not chunk:
+                return
+            yield first_frame, np.array(chunk)
+            first_frame += len(chunk)
+
+    def get_video_frame_count(self, location: str | os.PathLike) -> int:
+        if is_segmented_video(location):
+            return self.__read_json(location)["frame_count"]
+        with self.__cached(location) as path:
+            return self.__decoder.get_video_frame_count(path)
+
+    def get_video_frame_shape(self, location: str | os.PathLike) -> tuple[int, ...]:
+        """
+        Read from the segments' manifest or the file header, so the video isn't downloaded.
+        """
+        if is_segmented_video(location):
+            return tuple(self.__read_json(location)["frame_shape"])
+        header = self.__read_header(location)
+        try:
+            if str(location).endswith(".npy"):
+                f = io.BytesIO(header)
+                version = np.lib.format.read_magic(f)
+                read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+                return read_header(f)[0][1:]
+            index = header.index(b"avih")  # the AVI main header, its width and height follow 8 other fields
+            width, height = struct.unpack_from("<II", header, index + 8 + 32)
+            return height, width, 3  # decoded as BGR
+        except Exception as e:
+            raise Exception(f"Failed to read the frame shape from the header of {location}: {e}")
+
+    def __read_header(self, location: str | os.PathLike) -> bytes:
+        """
+        The first HEADER_BYTES of an object, with one ranged GET.
+        """
+        bucket, key = self.__parse_location(location)
+        try:
+            response = self.__client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{self.HEADER_BYTES - 1}")
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(f"Object {location} not found")
+            raise
+        return response["Body"].read()
+
+    def get_size(self, location: str | os.PathLike) -> int:
+        if is_segmented_video(location):
+            manifest = self.__read_json(location)
+            return self.__head(location)["ContentLength"] + sum(self.__head(segment_location)["ContentLength"]
+                                                                for segment_location in self.__segment_locations(location, manifest))
+        head = self.__head(location)
+        if head is not None:
+            return head["ContentLength"]
+        objects = self.__list(location)  # a chunked result's "folder" of parts
+        if not objects:
+            raise FileNotFoundError(f"Object {location} not found")
+        return sum(obj["Size"] for obj in objects)
+
+    def remove_video_from_storage(self, location: str | os.PathLike) -> str:
+        if self.__head(location) is None:
+            raise FileNotFoundError(f"Video file {location} not found")
+        bucket, key = self.__parse_location(location)
+        try:
+            keys = [key, timestamps_location_for_video(key)]
+            if is_segmented_video(location):
+                keys += [obj["Key"] for obj in self.__list(str(location).removesuffix(".json"))]
+            self.__delete(bucket, keys)
+        except Exception as e:
+            raise Exception(f"Failed to remove video at {location}: {e}")
+        return str(location)
+
+    def write_timestamps_to_storage(self, timestamps_ns: np.ndarray, video_location: str | os.PathLike) -> str:
+        bucket, key = self.__parse_location(timestamps_location_for_video(video_location))
+        with self.__staging() as staging_folder:
+            file_location = os.path.join(staging_folder, posixpath.basename(key))
+            np.save(file_location, np.asarray(timestamps_ns, dtype=np.int64), allow_pickle=False)
+            etag = self.__upload_file(file_location, bucket, key)
+            self.__cache.add(f"{bucket}/{key}", etag, file_location)
+        return self.__location_for_key(key)
+
+    def read_timestamps_from_storage(self, video_location: str | os.PathLike) -> np.ndarray | None:
+        location = timestamps_location_for_video(video_location)
+        try:
+            with self.__cached(location) as path:
+                return np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            raise Exception(f"Failed to read timestamps {location} from storage: {e}")
+
+    def write_dataframe_to_storage(self, data: pandas.DataFrame, file_name: str = "") -> str:
+        with self.__staging() as staging_folder:
+            file_location = LocalStorageManager(location=staging_folder).write_dataframe_to_storage(data=data,
+                                                                                                  file_name=file_name)
+            return self.__upload_staged(staging_folder, file_location)
+
+    def read_dataframe_from_storage(self, location: str | os.PathLike) -> pd.DataFrame:
+        import pandas as pd
+        if self.__head(location) is not None:
+            with self.__cached(location) as path:
+                df = pd.read_parquet(path)
+        else:
+            # a chunked result, read like a local parquet folder: underscore and dot files aren't data
+            parts = sorted(f"{self.SCHEME}{self.__parse_location(location)[0]}/{obj['Key']}"
+                           for obj in self.__list(location)
+                           if not posixpath.basename(obj["Key"]).startswith(("_", ".")))
+            if not parts:
+                raise FileNotFoundError(f"Data file {location} not found")
+            with ThreadPoolExecutor(max_workers=self.__max_concurrency) as pool:
+                list(pool.map(self.__fetch, parts))
+            dfs = []
+            for part in parts:
+                with self.__cached(part) as path:
+                    dfs.append(pd.read_parquet(path))
+            df = pd.concat(dfs, ignore_index=True)
+        if df.empty:
+            raise ValueError(f"No data found in {location}")
+        return df
+
+    def get_dataset_location(self, dataset_name: str) -> str:
+        return self.__location_for_key(self.__key_for_path(os.path.join("results", dataset_name)))
+
+    def write_dataframe_part_to_storage(self, data: pandas.DataFrame, dataset_name: str, part_index: int) -> str:
+        with self.__staging() as staging_folder:
+            file_location = LocalStorageManager(location=staging_folder).write_dataframe_part_to_storage(
+                data=data, dataset_name=dataset_name, part_index=part_index)
+            return self.__upload_staged(staging_folder, file_location)
+
+    def read_manifest_from_storage(self, dataset_name: str) -> dict | None:
+        # manifests change as chunks complete, so they are always read from the store
+        bucket, key = self.__parse_location(posixpath.join(self.get_dataset_location(dataset_name), MANIFEST_FILE_NAME))
+        try:
+            return json.loads(self.__client.get_object(Bucket=bucket, Key=key)["Body"].read())
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise Exception(f"Failed to read manifest {key} from storage: {e}")
+
+    def write_manifest_to_storage(self, manifest: dict, dataset_name: str) -> str:
+        location = posixpath.join(self.get_dataset_location(dataset_name), MANIFEST_FILE_NAME)
+        bucket, key = self.__parse_location(location)
+        try:
+            self.__client.put_object(Bucket=bucket, Key=key, Body=json.dumps(manifest, indent=2).encode())
+        except Exception as e:
+            raise Exception(f"Failed to save {location}: {e}")
+        return location
+
+    def remove_dataset_from_storage(self, dataset_name: str) -> None:
+        location = self.get_dataset_location(dataset_name)
+        try:
+            self.__delete(self.__bucket, [obj["Key"] for obj in self.__list(location)])
+        except Exception as e:
+            raise Exception(f"Failed to remove dataset {dataset_name}: {e}")
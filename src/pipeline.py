@@ -1,123 +1,424 @@
+import re
 import numpy as np
-import pandas as pd
-from dagster import op, job, In, Out, ResourceDefinition, DynamicOut, DynamicOutput, Definitions, graph
-from ultralytics.engine.results import Results
-from typing import Dict, List
+from dagster import op, job, In, Out, ResourceDefinition, DynamicOut, DynamicOutput, Definitions, graph, DagsterType, Field
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
 from src.postprocessor import YoloProcessor
-from src.db_manager import PostgresDBManager
-from src.storage_manager import LocalStorageManager
+from src.db_manager import create_db_manager, RecordingToProcess, ResultRecord
+from src.result_buffer import WriteBehindBuffer
+from src.checkpoint import ChunkCheckpoint
+from src.prefilter import FrameSelection, StaticFramePrefilter
+from src.scheduler import MemoryLedger, MemoryScheduler
+from src.storage_manager import create_storage_manager
+from src.instrumentation import StageProfiler, measure_stage
 from dotenv import load_dotenv
 from datetime import datetime
 
 
 load_dotenv()
 
+
+def _is_dataframe_per_processor(_, value) -> bool:
+    import pandas as pd
+    return isinstance(value, dict) and all(isinstance(df, pd.DataFrame) for df in value.values())
+
+DataFramesByProcessor = DagsterType(name="DataFramesByProcessor", type_check_fn=_is_dataframe_per_processor,
+                                    description="A DataFrame per processor name")
+
 db = ResourceDefinition(
-    lambda _: PostgresDBManager()
+    lambda init_context: create_db_manager(**init_context.resource_config),
+    config_schema={
+        "backend": Field(str, is_required=False, description='"postgres" or "sqlite", defaults to the DB_BACKEND env var'),
+        "sqlite_location": Field(str, is_required=False, description="SQLite file, defaults to the SQLITE_DB_PATH env var"),
+    }
 )
 
 storage = ResourceDefinition(
-    lambda _: LocalStorageManager()
+    lambda init_context: create_storage_manager(**init_context.resource_config),
+    config_schema={
+        "backend": Field(str, is_required=False, description='"local" or "object_store", defaults to the STORAGE_BACKEND env var'),
+        "location": Field(str, is_required=False, description="Local output folder"),
+        "bucket": Field(str, is_required=False, description="Object-store bucket, defaults to the OBJECT_STORE_BUCKET env var"),
+        "prefix": Field(str, is_required=False, description="Key prefix inside the bucket"),
+        "endpoint_url": Field(str, is_required=False, description="S3-API endpoint, for stores other than AWS"),
+        "cache_location": Field(str, is_required=False, description="Local read-through cache of the object store"),
+        "cache_max_gb": Field(float, is_required=False, description="Cache size above which least recently used objects are evicted"),
+    }
+)
+
+def _processors(init_context) -> list[YoloProcessor]:
+    processors = [YoloProcessor(**processor_config) for processor_config in init_context.resource_config["processors"]]
+    names = [processor.get_name() for processor in processors]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Processor names must be unique, got: {names}")
+    return processors
+
+processors = ResourceDefinition(
+    _processors,
+    config_schema={
+        "processors": Field(
+            [{
+                "model": Field(str, default_value=YoloProcessor.DEFAULT_MODEL, is_required=False),
+                "imgsz": Field(int, is_required=False),
+                "name": Field(str, is_required=False, description="Name results are registered under, derived from the model by default"),
+            }],
+            default_value=[{"model": YoloProcessor.DEFAULT_MODEL}],
+            is_required=False,
+        ),
+    },
+    description="Processors that all consume the same decoded frames of every video"
+)
+
+profiler = ResourceDefinition(
+    lambda init_context: StageProfiler(**init_context.resource_config),
+    config_schema={
+        "enabled": Field(bool, default_value=False, is_required=False),
+        "interval_ms": Field(float, default_value=5.0, is_required=False),
+        "output_dir": Field(str, default_value="./output/profiles", is_required=False),
+    },
+    description="Optional sampling profiler around every instrumented stage, enabled per run through config"
 )
 
-pose_extractor = ResourceDefinition(
-    lambda _: YoloProcessor())
+prefilter = ResourceDefinition(
+    lambda init_context: StaticFramePrefilter(**init_context.resource_config),
+    config_schema={
+        "enabled": Field(bool, default_value=False, is_required=False),
+        "static_threshold": Field(float, default_value=1.0, is_required=False,
+                                  description="Mean gray-level difference from the last inferred frame below which a frame counts as static"),
+        "max_carry_frames": Field(int, default_value=30, is_required=False,
+                                  description="Most consecutive frames that reuse one inferred result"),
+        "signature_size": Field(int, default_value=32, is_required=False),
+    },
+    description="Skips duplicate and near-static frames before inference and carries the last result forward to them"
+)
+
+scheduler = ResourceDefinition(
+    lambda init_context: MemoryScheduler(**init_context.resource_config),
+    config_schema={
+        "budget_gb": Field(float, is_required=False, description="Memory all video processing on this node may use, 70% of RAM by default"),
+        "max_in_memory_fraction": Field(float, default_value=0.25, is_required=False,
+                                        description="Videos estimated to need more of the budget than this are processed in chunks"),
+        "overhead": Field(float, default_value=2.0, is_required=False,
+                          description="Peak memory of processing a video, as a multiple of its decoded frames"),
+        "ledger_location": Field(str, default_value=MemoryLedger.DEFAULT_LOCATION, is_required=False,
+                                 description="File shared by every process on the node to record reservations"),
+        "max_wait_sec": Field(float, default_value=3600.0, is_required=False),
+    },
+    description="Admits video processing on a node only within its memory budget"
+)
+
+def _result_buffer(init_context):
+    config = init_context.resource_config
+    buffer = WriteBehindBuffer(db=init_context.resources.db,
+                               max_pending=config["max_pending"] if config["enabled"] else 1,
+                               max_delay_sec=config["max_delay_sec"])
+    try:
+        yield buffer
+    finally:
+        buffer.close()
+
+result_buffer = ResourceDefinition(
+    _result_buffer,
+    required_resource_keys={"db"},
+    config_schema={
+        "enabled": Field(bool, default_value=False, is_required=False),
+        "max_pending": Field(int, default_value=100, is_required=False),
+        "max_delay_sec": Field(float, default_value=5.0, is_required=False),
+    },
+    description="Write-behind buffer for result registrations; when disabled every result is written through"
+)
+
+
+def _file_name_for_processor(processor_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", processor_name).strip("_")
+
+@contextmanager
+def instrumented_stage(context, stage: str, video_id: str):
+    """
+    Measures the enclosed stage, attaches the metrics to the op's output metadata and persists them to
+    `processing_metrics`. Metrics are best effort: failing to store them never fails the op.
+    """
+    with context.resources.profiler.profile(name=f"{context.run_id}_{video_id}_{stage}"), measure_stage(stage) as metrics:
+        yield metrics
+    context.add_output_metadata(metrics.to_metadata())
+    try:
+        context.resources.db.log_processing_metrics(run_id=context.run_id, video_id=video_id, metrics=[metrics])
+    except Exception as e:
+        context.log.warning(f"Failed to persist {stage} metrics for video {video_id}: {e}")
 
 @op(
     required_resource_keys={"db"},
     config_schema={"range_start": str, "range_end": str},
-    out=Out(Dict[str, str])
+    out=Out(Dict[str, RecordingToProcess])
 )
-def get_video_locations(context) -> Dict[str, str]:
+def get_video_locations(context) -> Dict[str, RecordingToProcess]:
     range_start = context.op_config["range_start"]
     range_end = context.op_config["range_end"]
-    return context.resources.db.get_all_recordings_in_time_range(start_time=range_start,
+    return context.resources.db.get_recordings_to_process(start_time=range_start,
                                         end_time=range_end)
 
 @op(
-    required_resource_keys={"storage"},
+    required_resource_keys={"storage", "scheduler", "db", "profiler"},
     out=Out(np.ndarray)
 )
-def extract_frames(context, video_location: str) -> np.ndarray:
-    return context.resources.storage.read_video_from_storage(video_location)
+def extract_frames(context, video_location: str, video_id: str, estimated_bytes: int) -> np.ndarray:
+    storage = context.resources.storage
+    with context.resources.scheduler.reserve(estimated_bytes, description=f"decoding video {video_id}"), \
+            instrumented_stage(context, stage="decode", video_id=video_id) as metrics:
+        frames = storage.read_video_from_storage(video_location)
+        metrics.frames = frames.shape[0]
+        metrics.bytes_read = storage.get_size(video_location)
+    return frames
 
 @op(
-    required_resource_keys={"pose_extractor"},
-    out=Out(List[Results])
+    required_resource_keys={"storage"},
+    out=Out(Optional[np.ndarray])
 )
-def get_pose_estimations(context, frames: np.ndarray) -> List[Results]:
-    return context.resources.pose_extractor.process(frames)
+def load_frame_timestamps(context, video_location: str) -> Optional[np.ndarray]:
+    timestamps_ns = context.resources.storage.read_timestamps_from_storage(video_location)
+    if timestamps_ns is None:
+        context.log.warning(f"No frame timestamps stored for {video_location}, results won't be aligned to capture time")
+    return timestamps_ns
+
+def _timestamps_for_frames(context, timestamps_ns: Optional[np.ndarray], frames: int,
+                           video_id: str) -> Optional[np.ndarray]:
+    """
+    The timestamp track holds every captured frame. When frames were lost on save, which ones is unknown, so the
+    track can't be aligned with the stored frames and the results are written without timestamps.
+    """
+    if timestamps_ns is not None and len(timestamps_ns) != frames:
+        context.log.warning(f"Video {video_id} has {frames} stored frames but {len(timestamps_ns)} frame timestamps, "
+                            f"its results are written without timestamps")
+        return None
+    return timestamps_ns
+
+def _reserve_for_frames(context, frames: np.ndarray, description: str):
+    scheduler = context.resources.scheduler
+    return scheduler.reserve(scheduler.estimate_bytes(frames.shape[0], frames.shape[1:]), description=description)
+
+@op(
+    required_resource_keys={"prefilter", "scheduler", "db", "profiler"},
+    out=Out(FrameSelection)
+)
+def prefilter_frames(context, frames: np.ndarray, video_id: str) -> FrameSelection:
+    with _reserve_for_frames(context, frames, description=f"prefiltering video {video_id}"), \
+            instrumented_stage(context, stage="prefilter", video_id=video_id) as metrics:
+        selection = context.resources.prefilter.select(frames)
+        metrics.frames = frames.shape[0]
+        metrics.frames_skipped = selection.get_skipped_count()
+    if selection.get_skipped_count():
+        context.log.info(f"Skipping {selection.duplicates} duplicate and {selection.static} static frames "
+                         f"of video {video_id} ({selection.get_skip_ratio():.1%})")
+    return selection
+
+@op(
+    required_resource_keys={"processors", "scheduler", "db", "profiler"},
+    out=Out(Dict[str, List[Any]])
+)
+def get_pose_estimations(context, frames: np.ndarray, selection: FrameSelection, video_id: str) -> Dict[str, List[Any]]:
+    """
+    Runs every configured processor over the same decoded frames, keyed by processor name. Only the selected
+    representative frames are inferred; the other frames get their representative's result.
+    """
+    with _reserve_for_frames(context, frames, description=f"inference on video {video_id}"), \
+            instrumented_stage(context, stage="inference", video_id=video_id) as metrics:
+        representatives = selection.get_representatives()
+        inferred = frames if len(representatives) == len(frames) else frames[representatives]
+        results = {processor.get_name(): selection.expand(processor.process(inferred))
+                   for processor in context.resources.processors}
+        metrics.frames = inferred.shape[0]
+    return results
+
+@op(
+    required_resource_keys={"processors", "db", "profiler"},
+    out=Out(DataFramesByProcessor)
+)
+def yolo_results_to_dataframe(context, yolo_results: Dict[str, List[Any]], timestamps_ns: Optional[np.ndarray],
+                              video_id: str) -> DataFramesByProcessor:
+    processors = {processor.get_name(): processor for processor in context.resources.processors}
+    frames = max((len(results) for results in yolo_results.values()), default=0)
+    timestamps_ns = _timestamps_for_frames(context, timestamps_ns, frames=frames, video_id=video_id)
+    with instrumented_stage(context, stage="conversion", video_id=video_id) as metrics:
+        dfs = {name: processors[name].frames_results_to_video_df(results, timestamps_ns=timestamps_ns)
+               for name, results in yolo_results.items()}
+        metrics.frames = frames
+    return dfs
 
 @op(
-    required_resource_keys={"pose_extractor"},
-    out=Out(pd.DataFrame)
+    required_resource_keys={"storage", "scheduler"},
+    config_schema={
+        "min_frames_for_chunking": Field(int, default_value=9000, is_required=False,
+                                         description="Videos with at least this many frames are processed in checkpointed chunks"),
+    },
+    out={"in_memory": DynamicOut(), "chunked": DynamicOut()}
 )
-def yolo_results_to_dataframe(context, yolo_results: List[Results]) -> pd.DataFrame:
-    return context.resources.pose_extractor.frames_results_to_video_df(yolo_results)
+def split_video_locations(context, videos_to_process: Dict[str, RecordingToProcess]):
+    """
+    Fans the videos out, routing long recordings, and any video whose estimated footprint is too large a share of
+    the node's memory budget, to the chunked path so they aren't decoded into memory at once and a failure doesn't
+    restart them from the first frame. Videos are launched largest first, so the small ones fill in the budget
+    left over while the large ones run.
 
-@op(out=DynamicOut())
-def split_video_locations(videos_to_process: Dict[str, str]):
-    for video_id, location in videos_to_process.items():
+    Footprints are estimated from the frame count and resolution stored in the DB. Only recordings saved before the
+    resolution was recorded are looked up in storage, which reads a manifest or a file header, never a whole video.
+    """
+    storage = context.resources.storage
+    scheduler = context.resources.scheduler
+    plans = []
+    for video_id, recording in videos_to_process.items():
+        amount_of_frames = recording.amount_of_frames
+        frame_shape = recording.get_frame_shape() or storage.get_video_frame_shape(recording.location)
+        estimated_bytes = scheduler.estimate_bytes(amount_of_frames, frame_shape)
+        chunked = amount_of_frames >= context.op_config["min_frames_for_chunking"] or scheduler.should_stream(estimated_bytes)
+        plans.append((estimated_bytes, video_id, recording.location, amount_of_frames, list(frame_shape), chunked))
+    plans.sort(key=lambda plan: plan[0], reverse=True)
+    context.log.info(f"{sum(plan[5] for plan in plans)} of {len(plans)} videos will be processed in chunks, "
+                     f"{sum(plan[0] for plan in plans if not plan[5]) / 1024 ** 3:.2f} GB estimated for the rest")
+    for estimated_bytes, video_id, location, amount_of_frames, frame_shape, chunked in plans:
         yield DynamicOutput(
-            value={"video_id": video_id, "location": location},
-            mapping_key=video_id
+            value={"video_id": video_id, "location": location, "amount_of_frames": amount_of_frames,
+                   "estimated_bytes": estimated_bytes, "frame_shape": frame_shape},
+            mapping_key=video_id,
+            output_name="chunked" if chunked else "in_memory"
         )
 
-@op(out={"video_id": Out(str), "location": Out(str)})
+@op(out={"video_id": Out(str), "location": Out(str), "amount_of_frames": Out(int), "estimated_bytes": Out(int),
+         "frame_shape": Out(list)})
 def unpack_video_data(video_data: dict):
-    return video_data["video_id"], video_data["location"]
+    return (video_data["video_id"], video_data["location"], video_data["amount_of_frames"],
+            video_data["estimated_bytes"], video_data["frame_shape"])
 
 @op(
-    required_resource_keys={"storage"},
-    out=Out(str)
+    required_resource_keys={"storage", "db", "profiler"},
+    out=Out(Dict[str, str])
 )
-def save_dataframe_to_storage(context, df: pd.DataFrame, video_id: str, process_description: str) -> str:
+def save_dataframe_to_storage(context, dfs: DataFramesByProcessor, video_id: str) -> Dict[str, str]:
     timestamp = datetime.now().isoformat(timespec="seconds").replace(":", "-")
-    description_clean = process_description.replace(" ", "_")
-    filename = f"{timestamp}_{video_id}_{description_clean}"
-    return context.resources.storage.write_dataframe_to_storage(data=df, file_name=filename)
+    locations = {}
+    with instrumented_stage(context, stage="parquet_write", video_id=video_id) as metrics:
+        for processor_name, df in dfs.items():
+            filename = f"{timestamp}_{video_id}_{_file_name_for_processor(processor_name)}"
+            locations[processor_name] = context.resources.storage.write_dataframe_to_storage(data=df, file_name=filename)
+            metrics.frames = max(metrics.frames, df['frame'].nunique() if 'frame' in df else 0)
+            metrics.bytes_written += context.resources.storage.get_size(locations[processor_name])
+    return locations
 
-@op(required_resource_keys={"db"})
-def log_result_for_video_to_db(context, result_location: str, process_description: str, video_id: str):
-    return context.resources.db.update_results_for_video(
-        processor_name=process_description,
-        results_location=result_location,
-        video_id=video_id)
+@op(
+    required_resource_keys={"db", "profiler", "result_buffer"},
+    out=Out(List[ResultRecord])
+)
+def log_result_for_video_to_db(context, result_locations: Dict[str, str], video_id: str) -> List[ResultRecord]:
+    records = [ResultRecord(video_id=video_id, processor_name=processor_name, results_location=location)
+               for processor_name, location in result_locations.items()]
+    with instrumented_stage(context, stage="db_logging", video_id=video_id):
+        for record in records:
+            context.resources.result_buffer.add(record)
+    return records
 
-@op(out=Out(str))
-def get_yolo_process_description() -> str:
-    return "YOLO Pose Extraction"
+@op(required_resource_keys={"db", "result_buffer"})
+def register_results(context, in_memory_results: List[List[ResultRecord]], chunked_results: List[List[ResultRecord]]):
+    """
+    Runs once every video is processed: re-sends all results in one batch, so results still buffered or lost
+    with another process are registered. Already registered results are skipped by the DB. The flush and the
+    batch raise on failure, so a registration that can't be written fails the step instead of being lost.
+    """
+    results = [record for video_results in in_memory_results + chunked_results for record in video_results]
+    context.resources.result_buffer.flush()
+    inserted = context.resources.db.register_results_batch(results)
+    context.log.info(f"Registered {len(results)} results, {inserted} of them in the final batch")
+
+@op(
+    required_resource_keys={"storage", "processors", "prefilter", "scheduler", "db", "profiler"},
+    config_schema={"chunk_size": Field(int, default_value=1024, is_required=False)},
+    out=Out(Dict[str, str])
+)
+def process_video_in_chunks(context, video_location: str, video_id: str, amount_of_frames: int,
+                            frame_shape: list) -> Dict[str, str]:
+    """
+    Decodes the video one chunk at a time and runs every processor over each chunk. Every processor's
+    finished chunk is checkpointed, so a retry or rerun continues after its last completed chunk.
+    """
+    storage = context.resources.storage
+    chunk_size = context.op_config["chunk_size"]
+    checkpoints = {
+        processor.get_name(): ChunkCheckpoint(storage=storage,
+                                              dataset_name=f"{video_id}_{_file_name_for_processor(processor.get_name())}",
+                                              video_location=video_location,
+                                              chunk_size=chunk_size)
+        for processor in context.resources.processors
+    }
+    pending = [processor for processor in context.resources.processors
+               if not checkpoints[processor.get_name()].is_complete()]
+    if not pending:
+        context.log.info(f"Results for {video_location} are already complete")
+        return {name: checkpoint.get_location() for name, checkpoint in checkpoints.items()}
+    timestamps_ns = _timestamps_for_frames(context, storage.read_timestamps_from_storage(video_location),
+                                           frames=amount_of_frames, video_id=video_id)
+    chunk_bytes = context.resources.scheduler.estimate_bytes(chunk_size, tuple(frame_shape))
+    with context.resources.scheduler.reserve(chunk_bytes, description=f"chunks of video {video_id}"), \
+            instrumented_stage(context, stage="chunked_processing", video_id=video_id) as metrics:
+        start_frame = min(checkpoints[processor.get_name()].get_next_frame() for processor in pending)
+        if start_frame > 0:
+            context.log.info(f"Resuming {video_location} from frame {start_frame}")
+        for first_frame, frames in storage.read_video_chunks_from_storage(video_location,
+                                                                           chunk_size=chunk_size,
+                                                                           start_frame=start_frame):
+            chunk_timestamps = None if timestamps_ns is None else timestamps_ns[first_frame:first_frame + len(frames)]
+            selection = context.resources.prefilter.select(frames)
+            inferred = frames[selection.get_representatives()] if selection.get_skipped_count() else frames
+            for processor in pending:
+                checkpoint = checkpoints[processor.get_name()]
+                if checkpoint.get_next_frame() > first_frame:
+                    continue  # completed by this processor before the restart
+                results = selection.expand(processor.process(inferred))
+                df = processor.frames_results_to_video_df(results, timestamps_ns=chunk_timestamps, first_frame=first_frame)
+                part_location = checkpoint.commit_chunk(first_frame=first_frame, frames=len(frames), data=df)
+                metrics.bytes_written += storage.get_size(part_location) if part_location else 0
+            metrics.frames += len(frames)
+            metrics.frames_skipped += selection.get_skipped_count()
+        for processor in pending:
+            checkpoints[processor.get_name()].finalize(empty_result=processor.frames_results_to_video_df([]))
+    return {name: checkpoint.get_location() for name, checkpoint in checkpoints.items()}
 
 @graph(ins={"video_data": In(dict)})
 def process_single_video_graph(video_data):
-    video_id, location = unpack_video_data(video_data)
-    frames = extract_frames(video_location=location)
-    yolo_results = get_pose_estimations(frames)
-    df = yolo_results_to_dataframe(yolo_results)
-    desc = get_yolo_process_description()
-    result_path = save_dataframe_to_storage(df=df,
-                                            process_description=desc,
-                                            video_id=video_id)
-    log_result_for_video_to_db(
-        result_location=result_path,
-        process_description=desc,
-        video_id=video_id,
-    )
+    video_id, location, _, estimated_bytes, _ = unpack_video_data(video_data)
+    frames = extract_frames(video_location=location, video_id=video_id, estimated_bytes=estimated_bytes)
+    timestamps_ns = load_frame_timestamps(video_location=location)
+    selection = prefilter_frames(frames, video_id)
+    yolo_results = get_pose_estimations(frames, selection, video_id)
+    dfs = yolo_results_to_dataframe(yolo_results, timestamps_ns, video_id)
+    result_paths = save_dataframe_to_storage(dfs=dfs, video_id=video_id)
+    return log_result_for_video_to_db(result_locations=result_paths, video_id=video_id)
+
+@graph(ins={"video_data": In(dict)})
+def process_chunked_video_graph(video_data):
+    video_id, location, amount_of_frames, _, frame_shape = unpack_video_data(video_data)
+    result_paths = process_video_in_chunks(video_location=location, video_id=video_id,
+                                           amount_of_frames=amount_of_frames, frame_shape=frame_shape)
+    return log_result_for_video_to_db(result_locations=result_paths, video_id=video_id)
 
 @job(
     resource_defs={
         "db": db,
         "storage": storage,
-        "pose_extractor": pose_extractor,
+        "processors": processors,
+        "profiler": profiler,
+        "prefilter": prefilter,
+        "scheduler": scheduler,
+        "result_buffer": result_buffer,
     }
 )
 def video_processing_job():
     video_locations = get_video_locations()
-    split = split_video_locations(video_locations)
+    in_memory_videos, chunked_videos = split_video_locations(video_locations)
 
-    split.map(process_single_video_graph)
+    in_memory_results = in_memory_videos.map(process_single_video_graph)
+    chunked_results = chunked_videos.map(process_chunked_video_graph)
+    register_results(in_memory_results.collect(), chunked_results.collect())
 
 defs = Definitions(
     jobs=[video_processing_job],
-    resources={"db": db, "storage": storage, "pose_extractor": pose_extractor}
+    resources={"db": db, "storage": storage, "processors": processors, "profiler": profiler,
+               "prefilter": prefilter, "scheduler": scheduler, "result_buffer": result_buffer}
 )
\ No newline at end of file
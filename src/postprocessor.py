@@ -1,24 +1,96 @@
-import pandas
+from __future__ import annotations
+
 import numpy as np
-import pandas as pd
 
-from typing import List
-from ultralytics import YOLO
-from ultralytics.engine.results import Results
+from abc import ABC, abstractmethod
+from typing import Any, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas
+    from ultralytics import YOLO
+    from ultralytics.engine.results import Results
+
+
+class FrameProcessor(ABC):
+    """
+    One analysis over decoded frames. The pipeline decodes each video once and hands the frames to every
+    configured processor; each processor's results are stored and registered under its own name.
+    """
+    @abstractmethod
+    def get_name(self) -> str:
+        pass
+
+    @abstractmethod
+    def process(self, data: np.ndarray) -> List[Any]:
+        pass
+
+    @abstractmethod
+    def frames_results_to_video_df(self, results: List[Any], timestamps_ns: np.ndarray | None = None,
+                                   first_frame: int = 0) -> pandas.DataFrame:
+        pass
 
 
-class YoloProcessor:
-    def __init__(self):
-        self.__name = "yolo11_pose_estimation"
-        self.__model = YOLO("yolo11n-pose.pt")
+class YoloProcessor(FrameProcessor):
+    DEFAULT_MODEL = "yolo11n-pose.pt"
+    DEFAULT_NAME = "YOLO Pose Extraction"
+
+    def __init__(self, model: str = DEFAULT_MODEL, imgsz: int | None = None, name: str | None = None):
+        self.__model_name = model
+        self.__imgsz = imgsz
+        self.__name = name or self.__default_name()
+        self.__model = None
+
+    def get_name(self) -> str:
+        return self.__name
 
     def process(self, data: np.ndarray) -> List[Results]:
-        return self.__model([_ for _ in data])
+        options = {"imgsz": self.__imgsz} if self.__imgsz else {}
+        return self.load_model()([_ for _ in data], **options)
+
+    def load_model(self) -> YOLO:
+        """
+        Loads the model on first call; `process` calls it implicitly, call it upfront to pay the load before latency matters.
+        """
+        if self.__model is None:
+            from ultralytics import YOLO
+            self.__model = YOLO(self.__model_name)
+        return self.__model
+
+    def __default_name(self) -> str:
+        if self.__model_name == self.DEFAULT_MODEL and self.__imgsz is None:
+            return self.DEFAULT_NAME
+        settings = self.__model_name.removesuffix(".pt") + (f", imgsz={self.__imgsz}" if self.__imgsz else "")
+        return f"{self.DEFAULT_NAME} ({settings})"
+
+    def detection_status(self, result: Results) -> tuple[bool, bool]:
+        """
+        Returns whether a person was detected in a single frame's result, and whether a skeleton (keypoints) was found for it.
+        """
+        person_detected = result.boxes is not None and len(result.boxes) > 0
+        keypoints = result.keypoints
+        skeleton_detected = (keypoints is not None and len(keypoints) > 0 and
+                             (keypoints.conf is None or bool((keypoints.conf > 0.5).any())))
+        return person_detected, skeleton_detected
 
-    def frames_results_to_video_df(self, results: List[Results]) -> pandas.DataFrame:
+    def frames_results_to_video_df(self, results: List[Results], timestamps_ns: np.ndarray | None = None,
+                                   first_frame: int = 0) -> pandas.DataFrame:
+        """
+        Flattens per-frame results into one DataFrame with a `frame` column, and a `timestamp_ns` column
+        holding each frame's capture time when the recording's timestamp track is given (missing otherwise).
+        For a chunk of a longer video, `first_frame` is the video frame number of `results[0]`, and
+        `timestamps_ns` covers just the chunk. No results give the empty DataFrame of a video without detections.
+        """
+        import pandas as pd
+        if timestamps_ns is not None and len(timestamps_ns) != len(results):
+            raise ValueError(f"Got {len(timestamps_ns)} frame timestamps for {len(results)} frames")
         frame_dfs = []
         for frame_num, result in enumerate(results):
             df = result.to_df()
-            df['frame'] = frame_num
+            df['frame'] = first_frame + frame_num
             frame_dfs.append(df)
-        return pd.concat(frame_dfs, ignore_index=True)
\ No newline at end of file
+        video_df = pd.concat(frame_dfs, ignore_index=True) if frame_dfs else pd.DataFrame({'frame': pd.Series(dtype="int64")})
+        if timestamps_ns is not None:
+            video_df['timestamp_ns'] = pd.array(np.asarray(timestamps_ns)[video_df['frame'].to_numpy() - first_frame], dtype="Int64")
+        else:
+            video_df['timestamp_ns'] = pd.array([pd.NA] * len(video_df), dtype="Int64")
+        return video_df
\ No newline at end of file
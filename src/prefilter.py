@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Any, List
+
+import numpy as np
+
+
+@dataclass(kw_only=True, frozen=True)
+class FrameSelection:
+    """
+    Which frames of a batch are sent to the model. `sources[i]` is the frame whose result frame `i` carries:
+    itself for a representative, the preceding representative for a skipped frame.
+    """
+    sources: np.ndarray
+    duplicates: int = 0
+    static: int = 0
+
+    def get_representatives(self) -> np.ndarray:
+        return np.flatnonzero(self.sources == np.arange(len(self.sources)))
+
+    def get_skipped_count(self) -> int:
+        return self.duplicates + self.static
+
+    def get_skip_ratio(self) -> float:
+        return self.get_skipped_count() / len(self.sources) if len(self.sources) else 0.0
+
+    def expand(self, results: List[Any]) -> List[Any]:
+        """
+        Turns the results of the representatives, in order, into one result per frame, carrying each
+        representative's result forward to the frames it stands for.
+        """
+        representatives = self.get_representatives()
+        if len(results) != len(representatives):
+            raise ValueError(f"Got {len(results)} results for {len(representatives)} representative frames")
+        return [results[position] for position in np.searchsorted(representatives, self.sources)]
+
+
+class StaticFramePrefilter:
+    """
+    Picks the frames worth running the model on. Every frame is compared with the last representative through a
+    downscaled grayscale signature: an identical frame (a duplicate from the capture side) or one whose signature
+    differs by less than `static_threshold` gray levels on average (a motionless participant) reuses the
+    representative's result. At most `max_carry_frames` frames in a row reuse one result, so slow motion below
+    the threshold is still picked up.
+
+    The first frame of every batch is a representative, so a chunk selects the same frames whether or not the
+    chunks before it were processed in the same run.
+    """
+    def __init__(self, enabled: bool = False, static_threshold: float = 1.0, max_carry_frames: int = 30,
+                 signature_size: int = 32):
+        self.__enabled = enabled
+        self.__static_threshold = static_threshold
+        self.__max_carry_frames = max_carry_frames
+        self.__signature_size = signature_size
+
+    def is_enabled(self) -> bool:
+        return self.__enabled
+
+    def select(self, frames: np.ndarray) -> FrameSelection:
+        num_frames = len(frames)
+        sources = np.arange(num_frames)
+        if not self.__enabled or num_frames == 0:
+            return FrameSelection(sources=sources)
+        duplicates = static = carried = 0
+        representative = 0
+        representative_signature = self.__signature(frames[0])
+        for i in range(1, num_frames):
+            signature = self.__signature(frames[i])
+            difference = float(np.abs(signature - representative_signature).mean())
+            if carried < self.__max_carry_frames and difference == 0 and np.array_equal(frames[i], frames[representative]):
+                duplicates += 1
+            elif carried < self.__max_carry_frames and difference < self.__static_threshold:
+                static += 1
+            else:
+                representative, representative_signature, carried = i, signature, 0
+                continue
+            sources[i] = representative
+            carried += 1
+        return FrameSelection(sources=sources, duplicates=duplicates, static=static)
+
+    def __signature(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Block means of the frame's gray levels on a grid of about `signature_size` x `signature_size`.
+        """
+        height, width = frame.shape[:2]
+        block_height = max(1, height // self.__signature_size)
+        block_width = max(1, width // self.__signature_size)
+        rows, columns = height // block_height, width // block_width
+        blocks = frame[:rows * block_height, :columns * block_width].reshape(rows, block_height, columns, block_width, -1)
+        return blocks.mean(axis=(1, 3, 4), dtype=np.float32)
@@ -1,13 +1,23 @@
+from __future__ import annotations
+
 import numpy as np
+import threading
 import time
-import cv2
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Callable, TYPE_CHECKING
+from src.frame_timing import FrameTimingStats, compute_frame_timing_stats
+from src.live_preview import LatestFrameQueue
+
+if TYPE_CHECKING:
+    import cv2
 
 
 class VideoRecorder(ABC):
     def __init__(self, fps=60):
         self._fps: int = fps
+        self._frame_queue: LatestFrameQueue | None = None
 
     def set_fps(self, fps: int) -> None:
         self._fps = fps
@@ -15,8 +25,15 @@ class VideoRecorder(ABC):
     def get_fps(self) -> int:
         return self._fps
 
+    def set_frame_queue(self, frame_queue: LatestFrameQueue | None) -> None:
+        """
+        Publishes every captured frame with its capture timestamp to `frame_queue` (e.g. for a live preview consumer).
+        Publishing never blocks, so the capture rate is not affected by the consumer.
+        """
+        self._frame_queue = frame_queue
+
     @abstractmethod
-    def record_video(self, duration_in_sec: int) -> tuple[np.ndarray, int, int, str, str, bool]:
+    def record_video(self, duration_in_sec: int) -> tuple[np.ndarray, int, int, str, str, FrameTimingStats, np.ndarray]:
         """
         Records a video for a given duration.
 
@@ -29,51 +46,53 @@ class VideoRecorder(ABC):
                 - num_frames (int): The total number of frames captured.
                 - start_time (str): The recording start time in ISO format.
                 - end_time (str): The recording end time in ISO format.
-                - is_corrupted (bool): Whether the recording is corrupted.
+                - timing_stats (FrameTimingStats): Frame drop and jitter statistics; any dropped frame marks the recording as corrupted.
+                - timestamps_ns (np.ndarray): int64 wall-clock capture time of every frame, in nanoseconds since the epoch.
         """
         pass
 
 
-def validate_video(fps: int, amount_of_frames: int, duration: int) -> bool:
-    if fps * duration != amount_of_frames: # Frame drop
-        return True
-    return False
-
-
 class WebCamVideoRecorder(VideoRecorder):
-    def __init__(self):
+    def __init__(self, device_id: int = 0):
         super().__init__()
+        self.__device_id = device_id
 
-    def record_video(self, duration_in_sec: int) -> tuple[np.ndarray, int, int, str, str, bool]:
+    def record_video(self, duration_in_sec: int) -> tuple[np.ndarray, int, int, str, str, FrameTimingStats, np.ndarray]:
         try:
-            frames, fps, start, end = self.__record_video(duration=duration_in_sec)
+            frames, fps, timestamps_ns, start, end = self.__record_video(duration=duration_in_sec)
         except:
             raise
         amount_of_frames = frames.shape[0]
         start_time = datetime.fromtimestamp(start).isoformat()
         end_time = datetime.fromtimestamp(end).isoformat()
-        if_corrupted = validate_video(fps=fps,
-                                             amount_of_frames=amount_of_frames,
-                                             duration=duration_in_sec)
-        return frames, fps, amount_of_frames, start_time, end_time, if_corrupted
+        timing_stats = compute_frame_timing_stats(timestamps_ns=timestamps_ns, fps=fps)
+        return frames, fps, amount_of_frames, start_time, end_time, timing_stats, timestamps_ns
 
-    def __record_video(self, duration: int) -> tuple[np.ndarray, int, float, float]:
+    def __record_video(self, duration: int) -> tuple[np.ndarray, int, np.ndarray, float, float]:
         requested_fps = self._fps
         frames = []
+        timestamps_ns = []
+        import cv2
         try:
-            cap = cv2.VideoCapture(0)
+            cap = cv2.VideoCapture(self.__device_id)
             cap.set(cv2.CAP_PROP_FPS, requested_fps)
             cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
             cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
             actual_fps = cap.get(cv2.CAP_PROP_FPS)
 
+            # cap.read() blocks until the device delivers the next frame, so the loop runs at the camera's pace
             start = time.time()
-            while time.time() - start <= duration:
+            clock = WallClock()
+            deadline_ns = clock.now_ns() + int(duration * 1e9)
+            while clock.now_ns() < deadline_ns:
                 ret, frame = cap.read()
                 if not ret:
                     break
+                captured_at_ns = clock.now_ns()
+                timestamps_ns.append(captured_at_ns)
                 frames.append(frame)
-                cv2.waitKey(int(1000 / actual_fps))
+                if self._frame_queue is not None:
+                    self._frame_queue.put(frame, captured_at_ns=captured_at_ns)
 
             frames = np.array(frames)
 
@@ -83,4 +102,147 @@ class WebCamVideoRecorder(VideoRecorder):
                 raise Exception("No frames captured")
         except Exception as e:
             raise e
-        return frames, int(actual_fps), start, end
+        return frames, int(actual_fps), np.array(timestamps_ns, dtype=np.int64), start, end
+
+
+class WallClock:
+    """
+    Wall-clock nanosecond timestamps that advance with the monotonic clock, so intervals stay exact
+    even if the system time is adjusted while recording.
+    """
+    def __init__(self):
+        self.__origin_wall_ns = time.time_ns()
+        self.__origin_monotonic_ns = time.monotonic_ns()
+
+    def now_ns(self) -> int:
+        return self.__origin_wall_ns + (time.monotonic_ns() - self.__origin_monotonic_ns)
+
+    def to_wall_ns(self, monotonic_ns: np.ndarray | int) -> np.ndarray | int:
+        return self.__origin_wall_ns + (monotonic_ns - self.__origin_monotonic_ns)
+
+
+@dataclass(kw_only=True)
+class CameraStream:
+    device_id: int
+    frames: np.ndarray
+    timestamps_ns: np.ndarray
+    fps: int
+    timing_stats: FrameTimingStats
+
+
+class MultiCamVideoRecorder:
+    """
+    Records several capture devices at once, one capture thread per device.
+
+    Frames are read straight into per-device buffers preallocated before capture starts, and every
+    frame is stamped from the same monotonic clock, anchored to wall-clock nanoseconds at the shared
+    capture start, so views can be aligned frame by frame afterwards.
+    """
+    def __init__(self, device_ids: list[int], fps: int = 30, width: int = 1280, height: int = 720,
+                 capture_factory: Callable[[int], cv2.VideoCapture] | None = None,
+                 buffer_headroom: float = 1.2):
+        if not device_ids:
+            raise ValueError("At least one capture device is required")
+        self.__device_ids = list(device_ids)
+        self.__fps = fps
+        self.__width = width
+        self.__height = height
+        self.__capture_factory = capture_factory
+        if self.__capture_factory is None:
+            import cv2
+            self.__capture_factory = cv2.VideoCapture
+        self.__buffer_headroom = buffer_headroom
+
+    def get_device_ids(self) -> list[int]:
+        return list(self.__device_ids)
+
+    def record_videos(self, duration_in_sec: int) -> tuple[list[CameraStream], str, str]:
+        """
+        Records all devices for a given duration.
+
+        Args:
+            duration_in_sec (int): The duration of the recording in seconds.
+        Returns:
+            tuple: A tuple containing:
+                - streams (list[CameraStream]): One stream per device, in the order of `device_ids`.
+                - start_time (str): The shared recording start time in ISO format.
+                - end_time (str): The recording end time in ISO format.
+        """
+        captures = []
+        try:
+            for device_id in self.__device_ids:
+                captures.append(self.__open_device(device_id))
+            buffers = [self.__allocate_buffer(cap, actual_fps, duration_in_sec) for cap, actual_fps in captures]
+            timestamps = [np.zeros(buffer.shape[0], dtype=np.int64) for buffer in buffers]
+            counts = [0] * len(captures)
+            errors = [None] * len(captures)
+            start_barrier = threading.Barrier(len(captures) + 1)
+            clock = {}
+
+            def capture_loop(index: int):
+                cap, _ = captures[index]
+                buffer, stamps = buffers[index], timestamps[index]
+                try:
+                    start_barrier.wait()
+                    deadline_ns = clock["deadline_ns"]
+                    n = 0
+                    while n < buffer.shape[0] and time.monotonic_ns() < deadline_ns:
+                        ret, frame = cap.read(buffer[n])
+                        if not ret:
+                            break
+                        stamps[n] = time.monotonic_ns()
+                        if not np.may_share_memory(frame, buffer[n]):
+                            buffer[n] = frame
+                        n += 1
+                    counts[index] = n
+                except Exception as e:
+                    errors[index] = e
+
+            threads = [threading.Thread(target=capture_loop, args=(i,), name=f"capture-{device_id}", daemon=True)
+                       for i, device_id in enumerate(self.__device_ids)]
+            for thread in threads:
+                thread.start()
+            start = time.time()
+            wall_clock = WallClock()
+            clock["deadline_ns"] = time.monotonic_ns() + int(duration_in_sec * 1e9)
+            start_barrier.wait()
+            for thread in threads:
+                thread.join()
+            end = time.time()
+        finally:
+            for cap, _ in captures:
+                cap.release()
+
+        streams = []
+        for i, device_id in enumerate(self.__device_ids):
+            if errors[i] is not None:
+                raise Exception(f"Capture failed on device {device_id}: {errors[i]}")
+            if counts[i] <= 0:
+                raise Exception(f"No frames captured on device {device_id}")
+            actual_fps = captures[i][1]
+            stream_timestamps = wall_clock.to_wall_ns(timestamps[i][:counts[i]])
+            streams.append(CameraStream(device_id=device_id,
+                                        frames=buffers[i][:counts[i]],
+                                        timestamps_ns=stream_timestamps,
+                                        fps=actual_fps,
+                                        timing_stats=compute_frame_timing_stats(stream_timestamps, actual_fps)))
+        return streams, datetime.fromtimestamp(start).isoformat(), datetime.fromtimestamp(end).isoformat()
+
+    def __open_device(self, device_id: int) -> tuple[cv2.VideoCapture, int]:
+        import cv2
+        cap = self.__capture_factory(device_id)
+        if not cap.isOpened():
+            cap.release()
+            raise Exception(f"Could not open capture device {device_id}")
+        cap.set(cv2.CAP_PROP_FPS, self.__fps)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.__width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.__height)
+        actual_fps = int(cap.get(cv2.CAP_PROP_FPS)) or self.__fps
+        return cap, actual_fps
+
+    def __allocate_buffer(self, cap: cv2.VideoCapture, fps: int, duration_in_sec: int) -> np.ndarray:
+        ret, probe = cap.read()  # warm-up read, also tells the real frame geometry
+        if not ret:
+            raise Exception("Capture device returned no frames")
+        capacity = int(np.ceil(fps * duration_in_sec * self.__buffer_headroom)) + 1
+        return np.empty((capacity, *probe.shape), dtype=probe.dtype)
@@ -0,0 +1,69 @@
+import logging
+import threading
+import time
+from src.db_manager import DBManager, ResultRecord
+
+
+class WriteBehindBuffer:
+    """
+    Write-behind queue for result registrations. Records accumulate in memory and are written with a single
+    `register_results_batch` call once `max_pending` are waiting or the oldest has waited `max_delay_sec`
+    (checked whenever a record is added), instead of one transaction per video.
+
+    A failed flush keeps its records pending for the next one, and `close()` flushes whatever is left, raising if
+    that fails. Registration is idempotent, so the same records may also be re-sent at the end of a job to guarantee
+    at-least-once delivery. With `max_pending=1` every record is written through immediately.
+
+    The age is only checked when a record arrives, so the last records wait for an explicit `flush` or `close`.
+    Records are only batched within one process: under a multiprocess executor every step has its own buffer.
+    """
+    def __init__(self, db: DBManager, max_pending: int = 100, max_delay_sec: float = 5.0):
+        self.__db = db
+        self.__max_pending = max(1, max_pending)
+        self.__max_delay_sec = max_delay_sec
+        self.__pending: list[ResultRecord] = []
+        self.__oldest_pending_at = None
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+
+    def get_pending_count(self) -> int:
+        with self.__lock:
+            return len(self.__pending)
+
+    def add(self, record: ResultRecord) -> None:
+        with self.__lock:
+            if not self.__pending:
+                self.__oldest_pending_at = time.monotonic()
+            self.__pending.append(record)
+            due = (len(self.__pending) >= self.__max_pending
+                   or time.monotonic() - self.__oldest_pending_at >= self.__max_delay_sec)
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Write-behind flush failed, {self.get_pending_count()} results stay pending: {e}")
+
+    def flush(self) -> int:
+        """
+        Writes all pending records. Returns the number of newly registered results.
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                batch, self.__pending = self.__pending, []
+                self.__oldest_pending_at = None
+            if not batch:
+                return 0
+            try:
+                return self.__db.register_results_batch(batch)
+            except Exception:
+                with self.__lock:
+                    self.__pending = batch + self.__pending
+                    self.__oldest_pending_at = time.monotonic()
+                raise
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"Final write-behind flush failed, {self.get_pending_count()} results were not registered: {e}")
+            raise
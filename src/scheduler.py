@@ -0,0 +1,139 @@
+import fcntl
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # alive, owned by another user
+        return True
+    return True
+
+
+def _default_budget_bytes() -> int:
+    return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * 0.7)
+
+
+class MemoryLedger:
+    """
+    Node-wide record of the memory reserved by running work. Every process on the node shares it through one JSON
+    file, read and rewritten under an exclusive `flock`; reservations of processes that have died are dropped on the
+    next access, so a crashed worker can't hold on to the budget.
+    """
+    DEFAULT_LOCATION = os.path.join(tempfile.gettempdir(), "pose_estimator_memory_ledger.json")
+
+    def __init__(self, budget_bytes: int, location: str = DEFAULT_LOCATION, poll_interval_sec: float = 0.5,
+                 max_wait_sec: float = 3600.0):
+        self.__budget_bytes = budget_bytes
+        self.__location = location
+        self.__poll_interval_sec = poll_interval_sec
+        self.__max_wait_sec = max_wait_sec
+
+    def get_budget_bytes(self) -> int:
+        return self.__budget_bytes
+
+    def get_reserved_bytes(self) -> int:
+        with self.__locked() as reservations:
+            return sum(reservation["bytes"] for reservation in reservations.values())
+
+    @contextmanager
+    def reserve(self, size: int, description: str) -> Iterator[int]:
+        """
+        Waits until `size` bytes fit in the budget next to everything already reserved on the node, and holds them
+        for the enclosed work. Work larger than the whole budget is admitted once it can run alone.
+        Yields the reserved size.
+        """
+        size = min(size, self.__budget_bytes)
+        reservation_id = uuid.uuid4().hex
+        deadline = time.monotonic() + self.__max_wait_sec
+        waiting = False
+        while True:
+            with self.__locked() as reservations:
+                reserved = sum(reservation["bytes"] for reservation in reservations.values())
+                if reserved + size <= self.__budget_bytes:
+                    reservations[reservation_id] = {"pid": os.getpid(), "bytes": size, "description": description}
+                    break
+            if time.monotonic() > deadline:
+                raise Exception(f"Timed out after {self.__max_wait_sec}s waiting for {size} bytes of the memory budget "
+                                f"for {description}")
+            if not waiting:
+                logging.info(f"Waiting for {size / 1024 ** 2:.0f} MB of the memory budget for {description}, "
+                             f"{reserved / 1024 ** 2:.0f} of {self.__budget_bytes / 1024 ** 2:.0f} MB are reserved")
+                waiting = True
+            time.sleep(self.__poll_interval_sec)
+        try:
+            yield size
+        finally:
+            with self.__locked() as reservations:
+                reservations.pop(reservation_id, None)
+
+    @contextmanager
+    def __locked(self) -> Iterator[dict]:
+        """
+        Yields the live reservations while holding the node-wide lock, and saves them on exit.
+        """
+        os.makedirs(os.path.dirname(self.__location) or ".", exist_ok=True)
+        with open(self.__location, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                try:
+                    reservations = json.loads(content) if content else {}
+                except ValueError:
+                    logging.warning(f"Discarding unreadable memory ledger {self.__location}")
+                    reservations = {}
+                reservations = {reservation_id: reservation for reservation_id, reservation in reservations.items()
+                                if _is_alive(reservation["pid"])}
+                yield reservations
+                f.seek(0)
+                f.truncate()
+                json.dump(reservations, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class MemoryScheduler:
+    """
+    Keeps concurrent video processing on a node within a memory budget. A video's footprint is estimated from its
+    frame count and resolution before it is launched: videos that would take more than `max_in_memory_fraction` of the
+    budget are streamed in chunks, while smaller ones are decoded whole and run in parallel as long as their
+    reservations fit in the budget together.
+
+    `overhead` accounts for the copies made while a video is processed (model input batches, inference results and
+    serialising the frames between steps) on top of the decoded frames.
+    """
+    def __init__(self, budget_gb: float | None = None, max_in_memory_fraction: float = 0.25, overhead: float = 2.0,
+                 ledger_location: str = MemoryLedger.DEFAULT_LOCATION, poll_interval_sec: float = 0.5,
+                 max_wait_sec: float = 3600.0):
+        budget_bytes = int(budget_gb * 1024 ** 3) if budget_gb else _default_budget_bytes()
+        self.__ledger = MemoryLedger(budget_bytes=budget_bytes, location=ledger_location,
+                                     poll_interval_sec=poll_interval_sec, max_wait_sec=max_wait_sec)
+        self.__max_in_memory_fraction = max_in_memory_fraction
+        self.__overhead = overhead
+
+    def get_ledger(self) -> MemoryLedger:
+        return self.__ledger
+
+    def estimate_bytes(self, frames: int, frame_shape: tuple[int, ...]) -> int:
+        """
+        Peak memory of holding and processing `frames` uint8 frames of `frame_shape`.
+        """
+        return int(frames * math.prod(frame_shape) * self.__overhead)
+
+    def should_stream(self, estimated_bytes: int) -> bool:
+        return estimated_bytes > self.__ledger.get_budget_bytes() * self.__max_in_memory_fraction
+
+    def reserve(self, estimated_bytes: int, description: str):
+        return self.__ledger.reserve(size=estimated_bytes, description=description)
@@ -1,36 +1,61 @@
 import logging
-from src.recorder import WebCamVideoRecorder
-from src.storage_manager import LocalStorageManager, PreRecordingData, PostRecordingData, RecordingMetaData
-from src.db_manager import PostgresDBManager
+from src.recorder import WebCamVideoRecorder, MultiCamVideoRecorder, CameraStream
+from src.storage_manager import create_storage_manager, PreRecordingData, PostRecordingData, RecordingMetaData, RecordingView, \
+    VideoEncoding
+from src.db_manager import create_db_manager, RecordingFilter
+from src.live_preview import LatestFrameQueue, LivePoseMonitor, LivePreviewStats
+from typing import Callable
 
 class SessionManager:
-    def __init__(self, session_start: str):
+    def __init__(self, session_start: str, device_id: int = 0, db_backend: str | None = None,
+                 encoding: VideoEncoding | None = None, storage_backend: str | None = None):
         self.__session_start = session_start
-        self.__recorder = WebCamVideoRecorder()
-        self.__db = PostgresDBManager()
-        self.__storage = LocalStorageManager(location='./output/')
+        self.__recorder = WebCamVideoRecorder(device_id=device_id)
+        self.__db = create_db_manager(backend=db_backend)
+        self.__storage = create_storage_manager(backend=storage_backend, location='./output/', encoding=encoding)
         self.__last_recording_frames = None
+        self.__last_recording_timestamps = None
         self.__last_recording_data = None
+        self.__last_multi_view_streams = None
 
     def get_session_name(self) -> str:
         return self.__session_start
 
     def record_video(self, video_data: PreRecordingData) -> bool:
         self.__last_recording_frames = None
+        self.__last_recording_timestamps = None
         self.__last_recording_data = None
         try:
-            self.__last_recording_frames, fps, amount_of_frames, start, end, if_corrupted = self.__recorder.record_video(video_data.duration_in_sec)
+            (self.__last_recording_frames, fps, amount_of_frames, start, end,
+             timing_stats, self.__last_recording_timestamps) = self.__recorder.record_video(video_data.duration_in_sec)
             self.__last_recording_data = PostRecordingData(**video_data.__dict__,
                                                            fps=fps,
                                                            amount_of_frames=amount_of_frames,
                                                            start_time=start,
                                                            end_time=end,
-                                                           if_corrupted=if_corrupted)
+                                                           if_corrupted=timing_stats.frames_dropped > 0,
+                                                           timing_stats=timing_stats)
         except Exception as e:
             logging.error(f"Failed to record: {e}")
             return False
         return True
 
+    def record_video_with_preview(self, video_data: PreRecordingData, processor,
+                                  report: Callable[[LivePreviewStats], None] = print) -> bool:
+        frame_queue = LatestFrameQueue()
+        monitor = LivePoseMonitor(processor=processor, frame_queue=frame_queue, report=report)
+        self.__recorder.set_frame_queue(frame_queue)
+        monitor.start()
+        try:
+            return self.record_video(video_data)
+        finally:
+            self.__recorder.set_frame_queue(None)
+            history = monitor.stop()
+            if history:
+                mean_fps = sum(stats.processed_fps for stats in history) / len(history)
+                logging.info(f"Live preview processed {mean_fps:.1f} fps on average, "
+                             f"{frame_queue.get_dropped_count()} stale frames skipped")
+
     def save_last_recording(self) -> bool:
         if self.__last_recording_frames is None:
             logging.error("No recordings available")
@@ -43,6 +68,8 @@ class SessionManager:
             location = self.__storage.write_video_to_storage(frames=self.__last_recording_frames,
                                                              fps=self.__last_recording_data.fps,
                                                              file_name=file_name)
+            self.__storage.write_timestamps_to_storage(timestamps_ns=self.__last_recording_timestamps,
+                                                       video_location=location)
         except Exception as e:
             logging.error(f"Failed to write recording to storage: {e}")
             return False
@@ -52,12 +79,16 @@ class SessionManager:
                                                   location=location)
         except Exception as e:
             logging.error(f"Failed to read saved recording from storage: {e}")
+        height, width = self.__last_recording_frames.shape[1:3]
         del self.__last_recording_frames
         self.__last_recording_frames = None
+        self.__last_recording_timestamps = None
         logging.info(f"Saved recording to: {location}")
         recording_metadata = RecordingMetaData(**self.__last_recording_data.__dict__,
                                                frames_lost_on_save=frames_lost,
-                                               file_location=location)
+                                               file_location=location,
+                                               width=width,
+                                               height=height)
         try:
             self.__db.save_metadata_for_video(metadata=recording_metadata)
         except Exception as e:
@@ -66,13 +97,80 @@ class SessionManager:
         logging.info(f"Saved recording metadata to DB: {recording_metadata}")
         return True
 
+    def record_multi_view_video(self, video_data: PreRecordingData, device_ids: list[int]) -> bool:
+        self.__last_multi_view_streams = None
+        self.__last_recording_data = None
+        try:
+            recorder = MultiCamVideoRecorder(device_ids=device_ids, fps=self.__recorder.get_fps())
+            streams, start, end = recorder.record_videos(video_data.duration_in_sec)
+            primary = streams[0]
+            self.__last_multi_view_streams = streams
+            self.__last_recording_data = PostRecordingData(**video_data.__dict__,
+                                                           fps=primary.fps,
+                                                           amount_of_frames=min(s.frames.shape[0] for s in streams),
+                                                           start_time=start,
+                                                           end_time=end,
+                                                           if_corrupted=any(s.timing_stats.frames_dropped > 0 for s in streams),
+                                                           timing_stats=primary.timing_stats)
+        except Exception as e:
+            logging.error(f"Failed to record from devices {device_ids}: {e}")
+            return False
+        for stream in streams:
+            stats = stream.timing_stats
+            logging.info(f"Device {stream.device_id}: {stream.frames.shape[0]} frames, {stats.frames_dropped} dropped, "
+                         f"jitter p95 {stats.jitter_p95_ms:.2f} ms, effective fps {stats.effective_fps:.2f}")
+        return True
+
+    def save_last_multi_view_recording(self) -> bool:
+        if self.__last_multi_view_streams is None:
+            logging.error("No multi-view recordings available")
+            return False
+        elif self.__last_recording_data is None:
+            logging.error("No recording metadata available")
+            return False
+        base_name = f"recording_{self.__last_recording_data.participant}_{self.__last_recording_data.activity}_{self.__last_recording_data.start_time}"
+        views = []
+        try:
+            for stream in self.__last_multi_view_streams:
+                location = self.__storage.write_video_to_storage(frames=stream.frames,
+                                                                 fps=stream.fps,
+                                                                 file_name=f"{base_name}_cam{stream.device_id}")
+                self.__storage.write_timestamps_to_storage(timestamps_ns=stream.timestamps_ns,
+                                                           video_location=location)
+                views.append(self.__to_recording_view(stream=stream, location=location))
+        except Exception as e:
+            logging.error(f"Failed to write multi-view recording to storage: {e}")
+            return False
+        height, width = self.__last_multi_view_streams[0].frames.shape[1:3]
+        self.__last_multi_view_streams = None
+        recording_metadata = RecordingMetaData(**self.__last_recording_data.__dict__,
+                                               file_location=views[0].file_location,
+                                               width=width,
+                                               height=height)
+        try:
+            self.__db.save_metadata_for_multi_view_video(metadata=recording_metadata, views=views)
+        except Exception as e:
+            logging.error(f"Failed writing to DB: {e}")
+            return False
+        logging.info(f"Saved multi-view recording metadata to DB: {recording_metadata}")
+        return True
+
+    @staticmethod
+    def __to_recording_view(stream: CameraStream, location: str) -> RecordingView:
+        return RecordingView(device_id=stream.device_id,
+                             file_location=location,
+                             amount_of_frames=stream.frames.shape[0],
+                             frames_dropped=stream.timing_stats.frames_dropped,
+                             longest_gap_ms=stream.timing_stats.longest_gap_ms,
+                             jitter_p95_ms=stream.timing_stats.jitter_p95_ms,
+                             effective_fps=stream.timing_stats.effective_fps)
+
     def __validate_writing(self, frames_lost: int, location: str) -> int:
-        saved_frames = self.__storage.read_video_from_storage(location=location)
-        new_amount_of_frames = saved_frames.shape[0]
+        new_amount_of_frames = self.__storage.get_video_frame_count(location=location)  # container metadata, no decode
         if new_amount_of_frames != self.__last_recording_data.amount_of_frames:
             logging.info(f"Frames were lost during saving")
             self.__last_recording_data.if_corrupted = True
-            frames_lost = saved_frames - new_amount_of_frames
+            frames_lost = self.__last_recording_data.amount_of_frames - new_amount_of_frames
         return frames_lost
 
     def get_all_recordings(self) -> dict[str: RecordingMetaData]:
@@ -82,17 +180,36 @@ class SessionManager:
             logging.error(f"Failed to get all recordings: {e}")
             return None
 
-    def remove_recording(self, recording_id: str) -> str | None:
+    def get_recordings_page(self, filters: RecordingFilter | None = None, page_size: int = 20,
+                            cursor: tuple | None = None) -> tuple[list, list[str], tuple | None] | None:
+        try:
+            page = self.__db.get_recordings_page(filters=filters, page_size=page_size, cursor=cursor)
+            rows, headers = self.__parse_recordings_to_table(page.recordings)
+            return rows, headers, page.next_cursor
+        except Exception as e:
+            logging.error(f"Failed to get recordings page: {e}")
+            return None
+
+    def remove_recording(self, recording_id: str) -> list[str] | None:
+        """
+        Removes the recording from the DB and its videos, one per view, from storage. Returns their locations.
+        """
         try:
-            file_location = self.__db.remove_recording_by_id(recording_id)
-            try:
-                self.__storage.remove_file_if_exists(file_location)
-            except:
-                raise Exception(f"Recording with id {recording_id} removed from DB, but failed to remove from storage.")
+            file_locations = self.__db.remove_recording_by_id(recording_id)
+            failed = []
+            for file_location in file_locations:
+                try:
+                    self.__storage.remove_video_from_storage(file_location)
+                except Exception as e:
+                    logging.error(f"Failed to remove {file_location}: {e}")
+                    failed.append(file_location)
+            if failed:
+                raise Exception(f"Recording with id {recording_id} removed from DB, but failed to remove "
+                                f"{', '.join(failed)} from storage.")
         except Exception as e:
             logging.error(f"Failed to remove recording: {e}")
             return None
-        return file_location
+        return file_locations
 
     def __parse_recordings_to_table(self, recordings: dict[str: RecordingMetaData]):
         try:
@@ -114,6 +231,14 @@ class SessionManager:
                 meta.start_time,
                 meta.end_time,
                 meta.duration_in_sec,
+                meta.timing_stats.frames_dropped,
+                round(meta.timing_stats.longest_gap_ms, 2),
+                round(meta.timing_stats.jitter_p50_ms, 2),
+                round(meta.timing_stats.jitter_p95_ms, 2),
+                round(meta.timing_stats.jitter_p99_ms, 2),
+                round(meta.timing_stats.effective_fps, 2),
+                meta.width,
+                meta.height,
             ])
         return rows, headers
 
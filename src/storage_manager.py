@@ -1,12 +1,21 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterator, TYPE_CHECKING
 
-import cv2
+import json
 import numpy as np
 import os
-import pandas
-import pandas as pd
+import shutil
+from src.frame_timing import FrameTimingStats
+
+if TYPE_CHECKING:
+    import pandas
+    import pandas as pd
 
 
 @dataclass(kw_only=True)
@@ -23,11 +32,60 @@ class PostRecordingData(PreRecordingData):
     start_time: str
     end_time: str
     if_corrupted: bool
+    timing_stats: FrameTimingStats = field(default_factory=FrameTimingStats)
 
 @dataclass(kw_only=True)
 class RecordingMetaData(PostRecordingData):
     file_location: str | os.PathLike
     frames_lost_on_save: int = 0
+    width: int = 0  # of the stored frames, 0 for recordings saved before the resolution was recorded
+    height: int = 0
+
+@dataclass(kw_only=True)
+class RecordingView:
+    device_id: int
+    file_location: str | os.PathLike
+    amount_of_frames: int
+    frames_dropped: int
+    longest_gap_ms: float
+    jitter_p95_ms: float
+    effective_fps: float
+
+
+MANIFEST_FILE_NAME = "_manifest.json"  # underscore-prefixed files are skipped when a parquet folder is read
+SEGMENTED_VIDEO_SUFFIX = ".segments.json"
+VIDEO_EXTENSIONS = {"ffv1": ".avi", "mjpeg": ".avi", "npy": ".npy"}
+
+
+@dataclass(kw_only=True)
+class VideoEncoding:
+    """
+    How recordings are written. "ffv1" is lossless; "mjpeg" is near-lossless at `quality` (0-100) and much
+    faster to encode; "npy" stores raw frames as a memory-mapped array, for scratch data.
+    With `segment_frames`, a recording is written as fixed-length segments encoded by up to `threads`
+    workers, and its location is the segments' manifest.
+    """
+    codec: str = "ffv1"
+    quality: int = 95
+    threads: int = 0  # 0 uses every core
+    segment_frames: int | None = None
+
+    def __post_init__(self):
+        if self.codec not in VIDEO_EXTENSIONS:
+            raise ValueError(f"Unknown video codec {self.codec}, expected one of: {', '.join(VIDEO_EXTENSIONS)}")
+        if self.segment_frames is not None and self.segment_frames <= 0:
+            raise ValueError(f"segment_frames must be positive, got {self.segment_frames}")
+
+    def get_threads(self) -> int:
+        return self.threads or os.cpu_count() or 1
+
+
+def is_segmented_video(location: str | os.PathLike) -> bool:
+    return str(location).endswith(SEGMENTED_VIDEO_SUFFIX)
+
+
+def timestamps_location_for_video(video_location: str | os.PathLike) -> str:
+    return os.path.splitext(str(video_location))[0] + ".timestamps.npy"
 
 
 class StorageManager(ABC):
@@ -42,6 +100,14 @@ class StorageManager(ABC):
     def read_video_from_storage(self, location: str | os.PathLike) -> np.ndarray:
         pass
 
+    @abstractmethod
+    def write_timestamps_to_storage(self, timestamps_ns: np.ndarray, video_location: str | os.PathLike) -> str:
+        pass
+
+    @abstractmethod
+    def read_timestamps_from_storage(self, video_location: str | os.PathLike) -> np.ndarray | None:
+        pass
+
     @abstractmethod
     def read_dataframe_from_storage(self, location: str | os.PathLike) -> pd.DataFrame:
         pass
@@ -50,6 +116,61 @@ class StorageManager(ABC):
     def write_dataframe_to_storage(self, data: pandas.DataFrame, file_name: str = "") -> str:
         pass
 
+    @abstractmethod
+    def get_video_frame_count(self, location: str | os.PathLike) -> int:
+        pass
+
+    @abstractmethod
+    def get_video_frame_shape(self, location: str | os.PathLike) -> tuple[int, ...]:
+        """
+        Shape of a decoded frame, (height, width, channels), read from the container without decoding.
+        """
+        pass
+
+    @abstractmethod
+    def read_video_chunks_from_storage(self, location: str | os.PathLike, chunk_size: int,
+                                       start_frame: int = 0) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Decodes the video from `start_frame` on, yielding `(first_frame, frames)` with up to `chunk_size` frames each,
+        so only one chunk is held in memory at a time.
+        """
+        pass
+
+    @abstractmethod
+    def get_dataset_location(self, dataset_name: str) -> str:
+        """
+        Location of a chunked result: a folder of parquet parts that reads back as one DataFrame.
+        """
+        pass
+
+    @abstractmethod
+    def write_dataframe_part_to_storage(self, data: pandas.DataFrame, dataset_name: str, part_index: int) -> str:
+        pass
+
+    @abstractmethod
+    def read_manifest_from_storage(self, dataset_name: str) -> dict | None:
+        pass
+
+    @abstractmethod
+    def write_manifest_to_storage(self, manifest: dict, dataset_name: str) -> str:
+        pass
+
+    @abstractmethod
+    def remove_dataset_from_storage(self, dataset_name: str) -> None:
+        pass
+
+    @abstractmethod
+    def remove_video_from_storage(self, location: str | os.PathLike) -> str:
+        """
+        Removes a video with its segments and timestamps sidecar.
+        """
+        pass
+
+    def get_size(self, location: str | os.PathLike) -> int:
+        if os.path.isdir(location):
+            return sum(entry.stat().st_size for entry in os.scandir(location) if entry.is_file())
+        return os.path.getsize(location)
+
     def set_output_location(self, location: str | os.PathLike):
         self._output_location = location
 
@@ -57,9 +178,12 @@ class StorageManager(ABC):
         return self._output_location
 
 class LocalStorageManager(StorageManager):
-    def __init__(self, location:str = "./output"):
+    def __init__(self, location:str = "./output", encoding: VideoEncoding | None = None):
         super().__init__(location)
-        pass
+        self.__encoding = encoding or VideoEncoding()
+
+    def get_encoding(self) -> VideoEncoding:
+        return self.__encoding
 
     def __prepare_file_location(self, file_name: str, file_extension: str, folder: str) -> str:
         output_folder = os.path.join(self._output_location, folder)
@@ -69,6 +193,24 @@ class LocalStorageManager(StorageManager):
             file_name = f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         return os.path.join(output_folder, file_name) + file_extension
 
+    def __save_atomically(self, file_location: str, save_func: Callable[[str], None]) -> str:
+        """
+        Saves through a hidden temporary file that is synced and renamed over `file_location`,
+        so readers and resumed runs only ever see complete files.
+        """
+        folder, file_name = os.path.split(file_location)
+        tmp_location = os.path.join(folder, f".{file_name}.tmp")
+        try:
+            save_func(tmp_location)
+            with open(tmp_location, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_location, file_location)
+        except Exception as e:
+            if os.path.exists(tmp_location):
+                os.remove(tmp_location)
+            raise Exception(f"Failed to save {file_location}: {e}")
+        return file_location
+
     def __save_and_verify(self, file_location: str, save_func: callable) -> str:
         try:
             save_func()
@@ -79,17 +221,79 @@ class LocalStorageManager(StorageManager):
         return file_location
 
     def write_video_to_storage(self, frames: np.ndarray, fps: int, file_name: str = "") -> str:
+        encoding = self.__encoding
+        if encoding.segment_frames:
+            return self.__write_video_segments(frames=frames, fps=fps, file_name=file_name, encoding=encoding)
         file_location = self.__prepare_file_location(file_name=file_name,
-                                                     file_extension=".avi",
+                                                     file_extension=VIDEO_EXTENSIONS[encoding.codec],
                                                      folder="videos")
-        def save_func():
-            num_frames, height, width, channels = frames.shape
-            fourcc = cv2.VideoWriter_fourcc(*'FFV1')
-            out = cv2.VideoWriter(file_location, fourcc, fps, (width, height))
+        save_func = lambda: self.__encode_video(frames=frames, fps=fps, file_location=file_location, encoding=encoding)
+        return self.__save_and_verify(file_location, save_func)
+
+    def __encode_video(self, frames: np.ndarray, fps: int, file_location: str, encoding: VideoEncoding) -> None:
+        if encoding.codec == "npy":
+            stored = np.lib.format.open_memmap(file_location, mode="w+", dtype=frames.dtype, shape=frames.shape)
+            stored[:] = frames
+            stored.flush()
+            del stored
+            return
+        import cv2
+        num_frames, height, width, channels = frames.shape
+        if encoding.codec == "mjpeg":
+            # OpenCV's own MJPEG encoder splits every frame into stripes that are encoded in parallel
+            out = cv2.VideoWriter(file_location, cv2.CAP_OPENCV_MJPEG, cv2.VideoWriter_fourcc(*'MJPG'), fps,
+                                  (width, height), [cv2.VIDEOWRITER_PROP_QUALITY, encoding.quality,
+                                                    cv2.VIDEOWRITER_PROP_NSTRIPES, encoding.get_threads()])
+        else:
+            out = cv2.VideoWriter(file_location, cv2.VideoWriter_fourcc(*'FFV1'), fps, (width, height))
+        if not out.isOpened():
+            raise ValueError(f"Could not open a {encoding.codec} writer for {file_location}")
+        try:
             for frame in frames:
                 out.write(frame)
+        finally:
             out.release()
-        return self.__save_and_verify(file_location, save_func)
+
+    def __write_video_segments(self, frames: np.ndarray, fps: int, file_name: str, encoding: VideoEncoding) -> str:
+        """
+        Encodes `segment_frames`-long segments concurrently (OpenCV releases the GIL while encoding), then writes
+        the manifest last, so a recording only exists once all its segments do.
+        """
+        manifest_location = self.__prepare_file_location(file_name=file_name,
+                                                         file_extension=SEGMENTED_VIDEO_SUFFIX,
+                                                         folder="videos")
+        segment_folder = manifest_location.removesuffix(".json")
+        os.makedirs(segment_folder, exist_ok=True)
+        num_frames = frames.shape[0]
+        segments = [{"file": f"{os.path.basename(segment_folder)}/segment-{index:06d}{VIDEO_EXTENSIONS[encoding.codec]}",
+                     "first_frame": first_frame,
+                     "frames": min(encoding.segment_frames, num_frames - first_frame)}
+                    for index, first_frame in enumerate(range(0, num_frames, encoding.segment_frames))]
+        segment_encoding = replace(encoding, segment_frames=None, threads=1)  # the segments already run in parallel
+
+        def encode_segment(segment: dict):
+            segment_location = os.path.join(os.path.dirname(manifest_location), segment["file"])
+            segment_frames = frames[segment["first_frame"]:segment["first_frame"] + segment["frames"]]
+            self.__save_and_verify(segment_location, lambda: self.__encode_video(frames=segment_frames, fps=fps,
+                                                                                  file_location=segment_location,
+                                                                                  encoding=segment_encoding))
+        with ThreadPoolExecutor(max_workers=encoding.get_threads()) as pool:
+            list(pool.map(encode_segment, segments))
+
+        manifest = {"codec": encoding.codec, "fps": fps, "frame_count": num_frames,
+                    "frame_shape": list(frames.shape[1:]), "dtype": str(frames.dtype),
+                    "segment_frames": encoding.segment_frames, "segments": segments}
+        def save_func(tmp_location: str):
+            with open(tmp_location, "w") as f:
+                json.dump(manifest, f, indent=2)
+        return self.__save_atomically(manifest_location, save_func)
+
+    def __read_segment_manifest(self, location: str | os.PathLike) -> dict:
+        try:
+            with open(location) as f:
+                return json.load(f)
+        except Exception as e:
+            raise Exception(f"Failed to read segment manifest {location}: {e}")
 
     def write_dataframe_to_storage(self, data: pandas.DataFrame, file_name: str = "") -> str:
         file_location = self.__prepare_file_location(file_name=file_name,
@@ -103,6 +307,7 @@ class LocalStorageManager(StorageManager):
                                                      file_extension=".png",
                                                      folder="results")
         def save_func():
+            import cv2
             success = cv2.imwrite(file_location, image)
             if not success:
                 raise ValueError("Failed to write image to disk")
@@ -112,25 +317,187 @@ class LocalStorageManager(StorageManager):
         if not os.path.exists(location):
             raise FileNotFoundError(f"Video file {location} not found")
         try:
-            cap = cv2.VideoCapture(location)
+            if is_segmented_video(location):
+                frames = self.__read_video_segments(location)
+            elif str(location).endswith(".npy"):
+                frames = np.load(location, mmap_mode="r")
+            else:
+                frames = np.array(list(self.__iter_frames(location)))
+            if frames.shape[0] == 0:
+                raise ValueError(f"No frames could be read from {location}")
+            return frames
+        except Exception as e:
+            raise Exception(f"Failed to read {location} from storage: {e}")
+
+    def __read_video_segments(self, location: str | os.PathLike) -> np.ndarray:
+        """
+        Decodes all segments concurrently, each straight into its slice of one preallocated array.
+        """
+        manifest = self.__read_segment_manifest(location)
+        frames = np.empty((manifest["frame_count"], *manifest["frame_shape"]), dtype=manifest["dtype"])
+        folder = os.path.dirname(location)
+
+        def decode_segment(segment: dict) -> int:
+            target = frames[segment["first_frame"]:segment["first_frame"] + segment["frames"]]
+            decoded = 0
+            for decoded, frame in enumerate(self.__iter_frames(os.path.join(folder, segment["file"])), start=1):
+                target[decoded - 1] = frame
+            if decoded != segment["frames"]:
+                raise ValueError(f"Segment {segment['file']} has {decoded} frames, expected {segment['frames']}")
+            return decoded
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            list(pool.map(decode_segment, manifest["segments"]))
+        return frames
+
+    def __iter_frames(self, location: str | os.PathLike, start_frame: int = 0) -> Iterator[np.ndarray]:
+        if is_segmented_video(location):
+            manifest = self.__read_segment_manifest(location)
+            folder = os.path.dirname(location)
+            # Segments have a fixed length, so the one holding `start_frame` is found without scanning
+            for segment in manifest["segments"][start_frame // manifest["segment_frames"]:]:
+                yield from self.__iter_frames(os.path.join(folder, segment["file"]),
+                                              start_frame=max(0, start_frame - segment["first_frame"]))
+            return
+        if str(location).endswith(".npy"):
+            yield from np.load(location, mmap_mode="r")[start_frame:]
+            return
+        import cv2
+        cap = cv2.VideoCapture(str(location))
+        try:
             if not cap.isOpened():
                 raise ValueError(f"Could not open video file {location}")
-            frames = []
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)  # exact for FFV1 and MJPEG, where every frame is a keyframe
             while True:
                 ret, frame = cap.read()
                 if not ret: # no more frames
-                    break
-                frames.append(frame)
+                    return
+                yield frame
+        finally:
             cap.release()
-            if not frames:
-                raise ValueError(f"No frames could be read from {location}")
-            return np.array(frames)
+
+    def get_video_frame_count(self, location: str | os.PathLike) -> int:
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"Video file {location} not found")
+        if is_segmented_video(location):
+            return self.__read_segment_manifest(location)["frame_count"]
+        if str(location).endswith(".npy"):
+            return np.load(location, mmap_mode="r").shape[0]
+        import cv2
+        cap = cv2.VideoCapture(str(location))
+        try:
+            if not cap.isOpened():
+                raise ValueError(f"Could not open video file {location}")
+            return int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        finally:
+            cap.release()
+
+    def get_video_frame_shape(self, location: str | os.PathLike) -> tuple[int, ...]:
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"Video file {location} not found")
+        if is_segmented_video(location):
+            return tuple(self.__read_segment_manifest(location)["frame_shape"])
+        if str(location).endswith(".npy"):
+            return np.load(location, mmap_mode="r").shape[1:]
+        import cv2
+        cap = cv2.VideoCapture(str(location))
+        try:
+            if not cap.isOpened():
+                raise ValueError(f"Could not open video file {location}")
+            return int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3  # decoded as BGR
+        finally:
+            cap.release()
+
+    def read_video_chunks_from_storage(self, location: str | os.PathLike, chunk_size: int,
+                                       start_frame: int = 0) -> Iterator[tuple[int, np.ndarray]]:
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"Video file {location} not found")
+        frames = self.__iter_frames(location, start_frame=start_frame)
+        first_frame = start_frame
+        while True:
+            chunk = list(islice(frames, chunk_size))
+            if not chunk:
+                return
+            yield first_frame, np.array(chunk)
+            first_frame += len(chunk)
+
+    def get_size(self, location: str | os.PathLike) -> int:
+        if is_segmented_video(location):
+            folder = os.path.dirname(location)
+            return os.path.getsize(location) + sum(os.path.getsize(os.path.join(folder, segment["file"]))
+                                                   for segment in self.__read_segment_manifest(location)["segments"])
+        return super().get_size(location)
+
+    def remove_video_from_storage(self, location: str | os.PathLike) -> str:
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"Video file {location} not found")
+        try:
+            if is_segmented_video(location):
+                shutil.rmtree(str(location).removesuffix(".json"), ignore_errors=True)
+            os.remove(location)
+            timestamps_location = timestamps_location_for_video(location)
+            if os.path.exists(timestamps_location):
+                os.remove(timestamps_location)
         except Exception as e:
-            raise Exception(f"Failed to read {location} from storage: {e}")
+            raise Exception(f"Failed to remove video at {location}: {e}")
+        return str(location)
+
+    def get_dataset_location(self, dataset_name: str) -> str:
+        return os.path.join(self._output_location, "results", dataset_name)
+
+    def write_dataframe_part_to_storage(self, data: pandas.DataFrame, dataset_name: str, part_index: int) -> str:
+        folder = self.get_dataset_location(dataset_name)
+        os.makedirs(folder, exist_ok=True)
+        file_location = os.path.join(folder, f"part-{part_index:06d}.parquet")
+        return self.__save_atomically(file_location, lambda tmp_location: data.to_parquet(tmp_location))
+
+    def read_manifest_from_storage(self, dataset_name: str) -> dict | None:
+        file_location = os.path.join(self.get_dataset_location(dataset_name), MANIFEST_FILE_NAME)
+        if not os.path.exists(file_location):
+            return None
+        try:
+            with open(file_location) as f:
+                return json.load(f)
+        except Exception as e:
+            raise Exception(f"Failed to read manifest {file_location} from storage: {e}")
+
+    def write_manifest_to_storage(self, manifest: dict, dataset_name: str) -> str:
+        folder = self.get_dataset_location(dataset_name)
+        os.makedirs(folder, exist_ok=True)
+        def save_func(tmp_location: str):
+            with open(tmp_location, "w") as f:
+                json.dump(manifest, f, indent=2)
+        return self.__save_atomically(os.path.join(folder, MANIFEST_FILE_NAME), save_func)
+
+    def remove_dataset_from_storage(self, dataset_name: str) -> None:
+        try:
+            shutil.rmtree(self.get_dataset_location(dataset_name), ignore_errors=False)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            raise Exception(f"Failed to remove dataset {dataset_name}: {e}")
+
+    def write_timestamps_to_storage(self, timestamps_ns: np.ndarray, video_location: str | os.PathLike) -> str:
+        """
+        Saves the per-frame capture timestamps (int64 ns) as a sidecar `.timestamps.npy` file next to the video.
+        """
+        file_location = timestamps_location_for_video(video_location)
+        save_func = lambda: np.save(file_location, np.asarray(timestamps_ns, dtype=np.int64), allow_pickle=False)
+        return self.__save_and_verify(file_location, save_func)
+
+    def read_timestamps_from_storage(self, video_location: str | os.PathLike) -> np.ndarray | None:
+        file_location = timestamps_location_for_video(video_location)
+        if not os.path.exists(file_location):
+            return None
+        try:
+            return np.load(file_location, allow_pickle=False)
+        except Exception as e:
+            raise Exception(f"Failed to read timestamps {file_location} from storage: {e}")
 
     def read_dataframe_from_storage(self, location: str | os.PathLike) -> pd.DataFrame:
         if not os.path.exists(location):
             raise FileNotFoundError(f"Data file {location} not found")
+        import pandas as pd
         try:
             df = pd.read_parquet(location)
             if df.empty:
@@ -150,3 +517,31 @@ class LocalStorageManager(StorageManager):
             raise Exception(f"Failed to remove file at {file_path}: {e}")
 
 
+def create_storage_manager(backend: str | None = None, location: str | None = None,
+                           encoding: VideoEncoding | None = None, bucket: str | None = None,
+                           prefix: str | None = None, endpoint_url: str | None = None,
+                           cache_location: str | None = None, cache_max_gb: float | None = None) -> StorageManager:
+    """
+    Creates the configured StorageManager. Unset arguments fall back to the `STORAGE_BACKEND` ("local" or
+    "object_store"), `OBJECT_STORE_BUCKET`, `OBJECT_STORE_PREFIX`, `OBJECT_STORE_ENDPOINT_URL`, `STORAGE_CACHE_DIR`
+    and `STORAGE_CACHE_MAX_GB` environment variables. The object store writes segmented videos unless the encoding
+    sets `segment_frames`, so the chunked pipeline path can stream them.
+    """
+    backend = (backend or os.environ.get('STORAGE_BACKEND') or "local").lower()
+    if backend == "local":
+        return LocalStorageManager(location=location or "./output", encoding=encoding)
+    if backend == "object_store":
+        from src.object_store import DiskCache, ObjectStoreStorageManager
+        if encoding is not None and not encoding.segment_frames:
+            encoding = replace(encoding, segment_frames=ObjectStoreStorageManager.DEFAULT_SEGMENT_FRAMES)
+        bucket = bucket or os.environ.get('OBJECT_STORE_BUCKET')
+        if not bucket:
+            raise ValueError("The object_store storage backend needs a bucket, set OBJECT_STORE_BUCKET")
+        cache_max_gb = cache_max_gb or float(os.environ.get('STORAGE_CACHE_MAX_GB') or 10)
+        cache = DiskCache(location=cache_location or os.environ.get('STORAGE_CACHE_DIR') or "./output/cache",
+                          max_bytes=int(cache_max_gb * 1024 ** 3))
+        return ObjectStoreStorageManager(bucket=bucket,
+                                         prefix=prefix if prefix is not None else os.environ.get('OBJECT_STORE_PREFIX', ""),
+                                         endpoint_url=endpoint_url or os.environ.get('OBJECT_STORE_ENDPOINT_URL'),
+                                         cache=cache, encoding=encoding)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,25 @@
+import numpy as np
+from benchmarks.run_benchmarks import compare_reports, run_benchmarks
+from benchmarks.synthetic import StubPoseProcessor, generate_synthetic_frames
+
+
+def test_synthetic_frames_and_stub_model_are_deterministic():
+    frames = generate_synthetic_frames(num_frames=4, width=32, height=24, seed=1)
+    assert frames.shape == (4, 24, 32, 3)
+    assert np.array_equal(frames, generate_synthetic_frames(num_frames=4, width=32, height=24, seed=1))
+
+    processor = StubPoseProcessor()
+    first = processor.frames_results_to_video_df(processor.process(frames))
+    second = processor.frames_results_to_video_df(processor.process(frames))
+    assert first.equals(second)
+    assert first["frame"].tolist() == [0, 1, 2, 3]
+
+
+def test_benchmark_report_covers_all_stages(tmp_path):
+    report = run_benchmarks(num_frames=6, width=32, height=24, fps=30, videos=2, repeats=1, workdir=str(tmp_path))
+    assert set(report["stages"]) == {"storage_write_video", "storage_read_video", "stub_inference",
+                                     "frames_results_to_video_df", "parquet_write", "video_processing_job"}
+    assert report["stages"]["video_processing_job"]["frames"] == 12
+    assert all(stage["frames_per_sec"] > 0 for stage in report["stages"].values())
+    assert report["peak_rss_mb"] > 0
+    assert len(compare_reports(report, report)) == len(report["stages"]) + 1
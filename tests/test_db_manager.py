@@ -0,0 +1,129 @@
+import sqlite3
+import pytest
+from src.db_manager import SQLiteDBManager, RecordingFilter, RecordingToProcess, ResultRecord, create_db_manager
+from src.frame_timing import FrameTimingStats
+from src.instrumentation import StageMetrics
+from src.storage_manager import RecordingMetaData, RecordingView
+
+
+def make_metadata(participant: str = "TestUser", start_time: str = "2025-03-10T10:00:00",
+                  end_time: str = "2025-03-10T10:00:10", file_location: str = "/videos/a.avi") -> RecordingMetaData:
+    return RecordingMetaData(duration_in_sec=10, activity="Calibration", session_start="2025-03-10T09:59:00",
+                             participant=participant, fps=30, amount_of_frames=300, start_time=start_time,
+                             end_time=end_time, if_corrupted=False, file_location=file_location, width=640, height=480,
+                             timing_stats=FrameTimingStats(frames_dropped=2, longest_gap_ms=99.5, effective_fps=29.8))
+
+
+def test_sqlite_save_list_and_remove_recordings(tmp_path):
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    db.save_metadata_for_video(make_metadata(participant="Alice", file_location="/videos/a.avi"))
+    db.save_metadata_for_video(make_metadata(participant="Bob", file_location="/videos/b.avi"))
+
+    recordings = db.get_all_recordings()
+    assert list(recordings) == ["1", "2"]
+    assert recordings["1"].participant == "Alice"
+    assert recordings["2"].timing_stats.frames_dropped == 2
+    assert recordings["2"].if_corrupted is False
+    assert (recordings["2"].width, recordings["2"].height) == (640, 480)
+
+    headers = db.get_recordings_column_names()
+    assert headers[:4] == ["id", "session_name", "activity_name", "participant_name"]
+    assert headers[-2:] == ["width", "height"]
+
+    with sqlite3.connect(db.get_location()) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    assert db.remove_recording_by_id("1") == ["/videos/a.avi"]
+    assert list(db.get_all_recordings()) == ["2"]
+    with pytest.raises(Exception):
+        db.remove_recording_by_id("1")
+
+
+def test_sqlite_time_range_results_and_metrics(tmp_path):
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    db.save_metadata_for_video(make_metadata(file_location="/videos/march.avi"))
+    db.save_metadata_for_video(make_metadata(start_time="2025-05-01T10:00:00", end_time="2025-05-01T10:00:10",
+                                             file_location="/videos/may.avi"))
+
+    assert db.get_all_recordings_in_time_range("2025-03-01T00:00:00", "2025-04-30T00:00:00") == {"1": "/videos/march.avi"}
+    assert db.get_recordings_to_process("2025-03-01T00:00:00", "2025-04-30T00:00:00") == {
+        "1": RecordingToProcess(location="/videos/march.avi", amount_of_frames=300, width=640, height=480)}
+    with pytest.raises(Exception):
+        db.get_all_recordings_in_time_range("2024-01-01T00:00:00", "2024-02-01T00:00:00")
+
+    db.update_results_for_video(processor_name="YOLO Pose Extraction", results_location="/results/1.parquet", video_id="1")
+    db.log_processing_metrics(run_id="run", video_id="1", metrics=[StageMetrics(stage="decode", frames=300),
+                                                                    StageMetrics(stage="inference", frames=300)])
+    db.save_metadata_for_multi_view_video(make_metadata(file_location="/videos/cam0.avi"), views=[
+        RecordingView(device_id=device_id, file_location=f"/videos/cam{device_id}.avi", amount_of_frames=300,
+                      frames_dropped=0, longest_gap_ms=34.0, jitter_p95_ms=1.2, effective_fps=29.9)
+        for device_id in (0, 1)
+    ])
+    assert len(db.get_all_recordings()) == 3
+    assert db.remove_recording_by_id("3") == ["/videos/cam0.avi", "/videos/cam1.avi"]
+
+
+def test_sqlite_failed_batch_is_rolled_back(tmp_path):
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    db.save_metadata_for_video(make_metadata())
+    bad_view = RecordingView(device_id=None, file_location="/videos/cam1.avi", amount_of_frames=1,
+                             frames_dropped=0, longest_gap_ms=0, jitter_p95_ms=0, effective_fps=0)
+    with pytest.raises(Exception):
+        db.save_metadata_for_multi_view_video(make_metadata(file_location="/videos/cam0.avi"), views=[bad_view])
+    assert list(db.get_all_recordings()) == ["1"]
+
+
+def test_sqlite_recordings_pages_do_not_overlap(tmp_path):
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    for i in range(7):
+        db.save_metadata_for_video(make_metadata(participant="Alice" if i % 2 == 0 else "Bob",
+                                                 start_time=f"2025-03-1{i}T10:00:00",
+                                                 file_location=f"/videos/{i}.avi"))
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_recordings_page(page_size=3, cursor=cursor)
+        assert len(page.recordings) <= 3
+        seen.extend(page.recordings)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == ["7", "6", "5", "4", "3", "2", "1"]  # newest first, every recording exactly once
+
+    alice = db.get_recordings_page(filters=RecordingFilter(participant="Alice"), page_size=10)
+    assert list(alice.recordings) == ["7", "5", "3", "1"]
+    assert alice.next_cursor is None
+
+    one_day = db.get_recordings_page(filters=RecordingFilter(recorded_from="2025-03-12T00:00:00",
+                                                             recorded_to="2025-03-13T00:00:00"))
+    assert [meta.file_location for meta in one_day.recordings.values()] == ["/videos/2.avi"]
+    assert db.get_recordings_page(filters=RecordingFilter(is_corrupted=True)).recordings == {}
+
+
+def test_sqlite_batches_are_single_transactions_and_idempotent(tmp_path):
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    ids = db.save_metadata_batch([make_metadata(participant=name, file_location=f"/videos/{name}.avi")
+                                  for name in ("Alice", "Bob", "Alice")])
+    assert ids == [1, 2, 3]
+    with sqlite3.connect(db.get_location()) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0] == 2
+
+    results = [ResultRecord(video_id=str(video_id), processor_name="YOLO Pose Extraction",
+                            results_location=f"/results/{video_id}.parquet") for video_id in ids]
+    assert db.register_results_batch(results + results[:1]) == 3
+    assert db.register_results_batch(results) == 0  # re-delivered batch is a no-op
+    with pytest.raises(Exception):
+        db.register_results_batch([ResultRecord(video_id="99", processor_name="YOLO Pose Extraction",
+                                                results_location="/results/99.parquet")] + results)
+    with sqlite3.connect(db.get_location()) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 3
+
+
+def test_create_db_manager_selects_backend_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_DB_PATH", str(tmp_path / "env.db"))
+    db = create_db_manager()
+    assert isinstance(db, SQLiteDBManager)
+    assert db.get_location() == str(tmp_path / "env.db")
+    with pytest.raises(ValueError):
+        create_db_manager(backend="oracle")
@@ -0,0 +1,25 @@
+import numpy as np
+from src.frame_timing import compute_frame_timing_stats
+
+
+def test_perfectly_paced_stream_has_no_drops_or_jitter():
+    timestamps = np.arange(0, 90, dtype=np.int64) * (10**9 // 30)
+    stats = compute_frame_timing_stats(timestamps, fps=30)
+    assert stats.frames_dropped == 0
+    assert stats.jitter_p99_ms < 0.001
+    assert abs(stats.effective_fps - 30) < 0.01
+
+
+def test_gaps_are_counted_as_dropped_frames():
+    interval = 10**9 // 30
+    frame_numbers = np.delete(np.arange(90), [10, 11, 50])
+    stats = compute_frame_timing_stats(frame_numbers.astype(np.int64) * interval, fps=30)
+    assert stats.frames_dropped == 3
+    assert abs(stats.longest_gap_ms - 3 * interval / 1e6) < 0.001
+    assert stats.jitter_p99_ms > stats.jitter_p50_ms
+
+
+def test_too_short_stream_returns_empty_stats():
+    stats = compute_frame_timing_stats(np.array([5], dtype=np.int64), fps=30)
+    assert stats.frames_dropped == 0
+    assert stats.effective_fps == 0.0
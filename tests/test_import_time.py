@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = {"cv2", "ultralytics", "torch", "pandas", "psycopg2"}
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """Imports `module` in a fresh interpreter with `-X importtime` and returns cumulative microseconds per imported module."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.removeprefix("import time:").split("|")
+        profile[name.strip()] = int(cumulative_us)
+    return profile
+
+
+@pytest.mark.parametrize("module, budget_sec", [
+    ("src.main", 0.5),
+    ("src.pipeline", 3.0),  # dominated by dagster itself, which the code location can't avoid
+])
+def test_import_time_within_budget(module, budget_sec):
+    profile = import_profile(module)
+    assert profile[module] / 1e6 < budget_sec
+    heavy_imported = {name.split(".")[0] for name in profile} & HEAVY_MODULES
+    assert not heavy_imported, f"{module} imports {heavy_imported} at load time"
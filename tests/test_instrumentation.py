@@ -0,0 +1,46 @@
+import os
+import time
+import numpy as np
+from src.instrumentation import SamplingProfiler, StageProfiler, measure_stage
+
+
+def busy_work(duration_sec: float):
+    deadline = time.perf_counter() + duration_sec
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_measure_stage_records_times_and_memory():
+    with measure_stage("decode") as metrics:
+        buffer = np.ones(8 * 1024 * 1024, dtype=np.uint8)
+        busy_work(0.05)
+        metrics.frames = 10
+    del buffer
+    assert metrics.stage == "decode"
+    assert metrics.wall_time_sec >= 0.05
+    assert metrics.cpu_time_sec > 0
+    assert metrics.peak_rss_mb > 8
+    assert metrics.to_metadata()["frames_per_sec"] == metrics.frames_per_sec() > 0
+
+
+def test_sampling_profiler_collects_folded_stacks(tmp_path):
+    profiler = SamplingProfiler(interval_sec=0.001)
+    profiler.start()
+    busy_work(0.1)
+    samples = profiler.stop()
+    assert sum(samples.values()) > 0
+    assert any("busy_work" in stack for stack in samples)
+    location = profiler.write_folded(tmp_path / "profile.folded")
+    with open(location) as f:
+        stack, count = f.readline().rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_stage_profiler_only_writes_profiles_when_enabled(tmp_path):
+    with StageProfiler(enabled=False, output_dir=str(tmp_path)).profile("disabled"):
+        busy_work(0.01)
+    assert os.listdir(tmp_path) == []
+
+    with StageProfiler(enabled=True, interval_ms=1, output_dir=str(tmp_path)).profile("enabled"):
+        busy_work(0.05)
+    assert os.listdir(tmp_path) == ["enabled.folded"]
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+from src.live_preview import LatestFrameQueue, LivePoseMonitor
+
+
+class SlowStubProcessor:
+    def __init__(self, delay_sec: float):
+        self.delay_sec = delay_sec
+        self.processed_frames = []
+
+    def process(self, data: np.ndarray) -> list:
+        time.sleep(self.delay_sec)
+        self.processed_frames.append(int(data[0, 0, 0, 0]))
+        return [data[0]]
+
+    def detection_status(self, result) -> tuple[bool, bool]:
+        return True, False
+
+
+def test_latest_frame_queue_keeps_only_newest_frame():
+    queue = LatestFrameQueue()
+    for i in range(5):
+        queue.put(np.full((2, 2, 3), i, dtype=np.uint8), captured_at_ns=1_000 + i)
+    frame, index, captured_at_ns = queue.get(timeout=0.1)
+    assert frame[0, 0, 0] == 4
+    assert index == 4
+    assert captured_at_ns == 1_004
+    assert queue.get_dropped_count() == 4
+    assert queue.get(timeout=0.01) is None
+
+
+def test_latest_frame_queue_close_releases_waiting_consumer():
+    queue = LatestFrameQueue()
+    queue.close()
+    assert queue.get(timeout=5) is None
+    assert queue.is_closed()
+
+
+def test_live_pose_monitor_drops_stale_frames_without_blocking_producer():
+    queue = LatestFrameQueue()
+    processor = SlowStubProcessor(delay_sec=0.05)
+    reports = []
+    monitor = LivePoseMonitor(processor=processor, frame_queue=queue,
+                              report=reports.append, report_interval_sec=0.2)
+    monitor.start()
+    start = time.monotonic()
+    for i in range(60):
+        queue.put(np.full((1, 1, 3), i, dtype=np.uint8), captured_at_ns=time.time_ns())
+        time.sleep(0.01)
+    producer_duration = time.monotonic() - start
+    history = monitor.stop()
+
+    assert producer_duration < 60 * 0.05
+    assert 0 < len(processor.processed_frames) < 60
+    assert processor.processed_frames == sorted(processor.processed_frames)
+    assert queue.get_dropped_count() > 0
+    assert reports == history
+    assert all(stats.person_detected and not stats.skeleton_detected for stats in history if stats.frames_processed)
+    assert all(stats.max_latency_ms >= stats.mean_latency_ms for stats in history)
+
+
+def test_live_pose_monitor_measures_latency_from_capture():
+    queue = LatestFrameQueue()
+    monitor = LivePoseMonitor(processor=SlowStubProcessor(delay_sec=0), frame_queue=queue,
+                              report=lambda stats: None, report_interval_sec=0.05)
+    monitor.start()
+    queue.put(np.zeros((1, 1, 3), dtype=np.uint8), captured_at_ns=time.time_ns() - 200_000_000)  # captured 200 ms ago
+    time.sleep(0.2)
+    history = monitor.stop()
+
+    assert max(stats.max_latency_ms for stats in history) >= 200
@@ -0,0 +1,252 @@
+import hashlib
+import io
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from dagster import ResourceDefinition
+from benchmarks.synthetic import StubPoseProcessor, generate_synthetic_frames, generate_synthetic_timestamps
+from src.db_manager import SQLiteDBManager
+from src.object_store import DiskCache, ObjectStoreStorageManager
+from src.pipeline import prefilter, profiler, result_buffer, scheduler, video_processing_job
+from src.storage_manager import VideoEncoding
+from tests.test_pipeline import RUN_CONFIG, make_recordings, query
+
+
+class ClientError(Exception):
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class InMemoryS3Client:
+    """Local stand-in for the subset of the S3 API the object-store backend uses. Records every call."""
+    def __init__(self):
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.calls: list[tuple] = []
+        self.lock = threading.Lock()
+
+    def __object(self, bucket, key):
+        if (bucket, key) not in self.objects:
+            raise ClientError("404")
+        return self.objects[(bucket, key)]
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append(("put_object", Key))
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        with self.lock:
+            self.objects[(Bucket, Key)] = (bytes(Body), etag)
+        return {"ETag": etag}
+
+    def head_object(self, Bucket, Key):
+        data, etag = self.__object(Bucket, Key)
+        return {"ContentLength": len(data), "ETag": etag}
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        self.calls.append(("get_object", Key, Range))
+        data, etag = self.__object(Bucket, Key)
+        if IfMatch is not None and IfMatch != etag:
+            raise ClientError("PreconditionFailed")
+        if Range:
+            start, end = map(int, Range.removeprefix("bytes=").split("-"))
+            data = data[start:end + 1]
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def create_multipart_upload(self, Bucket, Key):
+        with self.lock:
+            upload_id = str(len(self.uploads))
+            self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append(("upload_part", Key, PartNumber))
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        data = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+        etag = f'"{hashlib.md5(data).hexdigest()}-{len(parts)}"'
+        with self.lock:
+            self.objects[(Bucket, Key)] = (data, etag)
+        return {"ETag": etag}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for bucket, key in list(self.objects) if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + 2]  # small pages, so pagination is exercised
+        return {"Contents": [{"Key": key, "Size": len(self.objects[(Bucket, key)][0])} for key in page],
+                "IsTruncated": start + 2 < len(keys), "NextContinuationToken": str(start + 2)}
+
+    def delete_objects(self, Bucket, Delete):
+        with self.lock:
+            for obj in Delete["Objects"]:
+                self.objects.pop((Bucket, obj["Key"]), None)
+
+    def count(self, operation: str, ranged: bool = False) -> int:
+        return sum(1 for call in self.calls if call[0] == operation and (not ranged or call[2]))
+
+
+def make_storage(tmp_path, client, node: str = "node", **kwargs) -> ObjectStoreStorageManager:
+    return ObjectStoreStorageManager(bucket="recordings", prefix="lab", client=client,
+                                     cache=DiskCache(location=str(tmp_path / node / "cache")), **kwargs)
+
+
+def test_video_round_trip_uses_multipart_upload_ranged_reads_and_the_cache(tmp_path):
+    client = InMemoryS3Client()
+    frames = generate_synthetic_frames(num_frames=8, width=32, height=24)
+    station = make_storage(tmp_path, client, node="station", part_size=1024, encoding=VideoEncoding(codec="npy"))
+
+    location = station.write_video_to_storage(frames=frames, fps=30, file_name="take")
+    station.write_timestamps_to_storage(timestamps_ns=generate_synthetic_timestamps(8, fps=30), video_location=location)
+
+    assert location == "s3://recordings/lab/videos/take.npy"
+    assert client.count("upload_part") == -(-frames.nbytes // 1024) + 1  # every part of the npy body and header
+    assert station.get_video_frame_count(location) == 8
+    assert client.count("get_object") == 0  # the station kept what it uploaded
+
+    node = make_storage(tmp_path, client, part_size=1024)
+    np.testing.assert_array_equal(node.read_video_from_storage(location), frames)
+    ranged_reads = client.count("get_object", ranged=True)
+    assert ranged_reads > 1
+    chunks = list(node.read_video_chunks_from_storage(location, chunk_size=3, start_frame=2))
+    assert [first_frame for first_frame, _ in chunks] == [2, 5]
+    np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in chunks]), frames[2:])
+    assert node.read_timestamps_from_storage(location).tolist() == generate_synthetic_timestamps(8, fps=30).tolist()
+    assert client.count("get_object", ranged=True) == ranged_reads  # served from the cache
+
+    node.remove_video_from_storage(location)
+    assert client.objects == {}
+    assert node.read_timestamps_from_storage(location) is None
+    with pytest.raises(FileNotFoundError):
+        node.read_video_from_storage(location)
+
+
+def test_chunked_read_of_segmented_video_fetches_only_the_segments_it_reaches(tmp_path):
+    client = InMemoryS3Client()
+    frames = generate_synthetic_frames(num_frames=10, width=32, height=24)
+    station = make_storage(tmp_path, client, node="station", encoding=VideoEncoding(codec="ffv1", segment_frames=4))
+    location = station.write_video_to_storage(frames=frames, fps=30, file_name="take")
+    node = make_storage(tmp_path, client)
+
+    chunks = list(node.read_video_chunks_from_storage(location, chunk_size=3, start_frame=5))
+
+    assert [first_frame for first_frame, _ in chunks] == [5, 8]
+    np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in chunks]), frames[5:])
+    fetched = sorted(call[1].rsplit("/", 1)[-1] for call in client.calls if call[0] == "get_object")
+    assert fetched == ["segment-000001.avi", "segment-000002.avi", "take.segments.json"]
+    assert node.get_video_frame_count(location) == 10
+    np.testing.assert_array_equal(node.read_video_from_storage(location), frames)
+    assert node.get_size(location) == sum(len(data) for data, _ in client.objects.values())
+
+
+def test_videos_are_segmented_by_default_so_the_chunked_reader_can_stream_them(tmp_path):
+    client = InMemoryS3Client()
+    storage = make_storage(tmp_path, client)
+
+    location = storage.write_video_to_storage(frames=generate_synthetic_frames(num_frames=4, width=32, height=24),
+                                              fps=30, file_name="take")
+
+    assert location == "s3://recordings/lab/videos/take.segments.json"
+    assert storage.get_video_frame_count(location) == 4
+
+
+@pytest.mark.parametrize("codec", ["ffv1", "mjpeg", "npy"])
+def test_frame_shape_of_an_unsegmented_video_comes_from_its_header(tmp_path, codec):
+    client = InMemoryS3Client()
+    frames = generate_synthetic_frames(num_frames=4, width=32, height=24)
+    station = make_storage(tmp_path, client, node="station", encoding=VideoEncoding(codec=codec))
+    location = station.write_video_to_storage(frames=frames, fps=30, file_name="take")
+
+    assert make_storage(tmp_path, client).get_video_frame_shape(location) == (24, 32, 3)
+    assert [call[2] for call in client.calls if call[0] == "get_object"] == [f"bytes=0-{64 * 1024 - 1}"]
+
+
+def test_chunked_results_read_back_as_one_dataframe_and_can_be_discarded(tmp_path):
+    client = InMemoryS3Client()
+    storage = make_storage(tmp_path, client)
+    parts = [pd.DataFrame({"frame": [0, 1]}), pd.DataFrame({"frame": [2]}), pd.DataFrame({"frame": [3, 4]})]
+
+    for index, part in enumerate(parts):
+        storage.write_dataframe_part_to_storage(data=part, dataset_name="video_1", part_index=index)
+    storage.write_manifest_to_storage(manifest={"complete": True}, dataset_name="video_1")
+    location = storage.get_dataset_location("video_1")
+
+    assert storage.read_manifest_from_storage("video_1") == {"complete": True}
+    assert storage.read_dataframe_from_storage(location)["frame"].tolist() == [0, 1, 2, 3, 4]
+    assert storage.get_size(location) > 0
+    storage.remove_dataset_from_storage("video_1")
+    assert storage.read_manifest_from_storage("video_1") is None
+    with pytest.raises(FileNotFoundError):
+        storage.read_dataframe_from_storage(location)
+
+
+def test_disk_cache_evicts_least_recently_used_entries_but_not_ones_in_use(tmp_path):
+    cache = DiskCache(location=str(tmp_path / "cache"), max_bytes=250)
+    def fetch(content: bytes):
+        return lambda path: open(path, "wb").write(content)
+
+    for key in ("a", "b"):
+        with cache.use(key, "v1", fetch(b"x" * 100)):
+            pass
+    with cache.use("a", "v1", fetch(b"")):  # a hit makes "a" the most recently used
+        pass
+    with cache.use("c", "v1", fetch(b"x" * 100)) as in_use:
+        with cache.use("d", "v1", fetch(b"x" * 100)):
+            pass
+        assert open(in_use, "rb").read() == b"x" * 100
+
+    assert [cache.contains(key, "v1") for key in "abcd"] == [False, False, True, True]
+    assert cache.get_size() == 200
+    assert not cache.contains("c", "v2")  # a new version of an object is a miss
+    assert DiskCache(location=str(tmp_path / "cache"), max_bytes=250).get_size() == 200  # survives restarts
+
+
+def test_disk_caches_sharing_a_folder_keep_to_its_limit_and_not_evict_each_others_entries(tmp_path):
+    reader = DiskCache(location=str(tmp_path / "cache"), max_bytes=250)
+    writer = DiskCache(location=str(tmp_path / "cache"), max_bytes=250)
+    def fetch(content: bytes):
+        return lambda path: open(path, "wb").write(content)
+
+    with reader.use("a", "v1", fetch(b"a" * 100)) as in_use:
+        for key in "bcd":
+            with writer.use(key, "v1", fetch(b"x" * 100)):
+                pass
+            assert reader.get_size() <= 250
+        assert open(in_use, "rb").read() == b"a" * 100
+        with writer.use("a", "v1", fetch(b"")) as shared:  # a hit on the other instance's entry
+            assert shared == in_use
+
+    assert [writer.contains(key, "v1") for key in "abcd"] == [True, False, False, True]
+    assert reader.get_size() == writer.get_size() == 200
+
+
+def test_job_runs_against_the_object_store(tmp_path):
+    client = InMemoryS3Client()
+    storage = make_storage(tmp_path, client, encoding=VideoEncoding(segment_frames=4))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=1, num_frames=6)
+    make_recordings(storage, db, videos=1, num_frames=10, prefix="long")
+    run_config = {"ops": {**RUN_CONFIG["ops"], "split_video_locations": {"config": {"min_frames_for_chunking": 8}},
+                          "process_chunked_video_graph": {"ops": {"process_video_in_chunks": {"config": {"chunk_size": 4}}}}}}
+    job = video_processing_job.graph.to_job(resource_defs={
+        "db": ResourceDefinition.hardcoded_resource(db),
+        "storage": ResourceDefinition.hardcoded_resource(storage),
+        "processors": ResourceDefinition.hardcoded_resource([StubPoseProcessor()]),
+        "profiler": profiler,
+        "prefilter": prefilter,
+        "scheduler": scheduler,
+        "result_buffer": result_buffer,
+    })
+
+    result = job.execute_in_process(run_config=run_config)
+
+    assert result.success
+    registered = query(db, "SELECT recording_id, file_location FROM results ORDER BY recording_id")
+    assert [row[0] for row in registered] == [1, 2]
+    assert all(row[1].startswith("s3://recordings/lab/results/") for row in registered)
+    assert [len(storage.read_dataframe_from_storage(row[1])) for row in registered] == [6, 10]
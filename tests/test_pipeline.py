@@ -0,0 +1,271 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from dagster import ResourceDefinition
+from benchmarks.synthetic import StubPoseProcessor, generate_synthetic_frames, generate_synthetic_timestamps
+from src.db_manager import SQLiteDBManager
+from src.pipeline import prefilter, profiler, result_buffer, scheduler, video_processing_job
+from src.scheduler import MemoryLedger
+from src.storage_manager import LocalStorageManager, RecordingMetaData
+
+RUN_CONFIG = {"ops": {"get_video_locations": {"config": {"range_start": "2025-01-01T00:00:00",
+                                                         "range_end": "2025-01-02T00:00:00"}}}}
+
+
+def make_recordings(storage: LocalStorageManager, db: SQLiteDBManager, videos: int = 2, num_frames: int = 6,
+                    prefix: str = "video"):
+    frames = generate_synthetic_frames(num_frames=num_frames, width=32, height=24)
+    metadata = []
+    for i in range(videos):
+        location = storage.write_video_to_storage(frames=frames, fps=30, file_name=f"{prefix}_{i}")
+        storage.write_timestamps_to_storage(timestamps_ns=generate_synthetic_timestamps(num_frames, fps=30),
+                                            video_location=location)
+        metadata.append(RecordingMetaData(duration_in_sec=1, activity="Test", session_start="2025-01-01T00:00:00",
+                                          participant="Synthetic", fps=30, amount_of_frames=num_frames,
+                                          start_time="2025-01-01T00:00:00", end_time="2025-01-01T00:00:01",
+                                          if_corrupted=False, file_location=location, width=32, height=24))
+    db.save_metadata_batch(metadata)
+
+
+def query(db: SQLiteDBManager, sql: str) -> list[tuple]:
+    with sqlite3.connect(db.get_location()) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def make_job(db, storage, processors=None):
+    return video_processing_job.graph.to_job(resource_defs={
+        "db": ResourceDefinition.hardcoded_resource(db),
+        "storage": ResourceDefinition.hardcoded_resource(storage),
+        "processors": ResourceDefinition.hardcoded_resource(processors or [StubPoseProcessor()]),
+        "profiler": profiler,
+        "prefilter": prefilter,
+        "scheduler": scheduler,
+        "result_buffer": result_buffer,
+    })
+
+
+def test_job_persists_stage_metrics_per_video(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db)
+
+    result = make_job(db, storage).execute_in_process(run_config=RUN_CONFIG)
+
+    assert result.success
+    assert query(db, "SELECT recording_id FROM results ORDER BY recording_id") == [(1,), (2,)]
+    metrics = query(db, "SELECT run_id, recording_id, stage, frames, bytes_read, bytes_written FROM processing_metrics")
+    assert {row[0] for row in metrics} == {result.run_id}
+    assert sorted((row[1], row[2]) for row in metrics) == sorted(
+        (video_id, stage) for video_id in (1, 2)
+        for stage in ("decode", "prefilter", "inference", "conversion", "parquet_write", "db_logging"))
+    assert all(row[3] == 6 and row[4] > 0 for row in metrics if row[2] == "decode")
+    assert all(row[5] > 0 for row in metrics if row[2] == "parquet_write")
+
+
+def test_job_writes_sampling_profiles_when_enabled(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=1)
+    profile_dir = tmp_path / "profiles"
+    run_config = {**RUN_CONFIG, "resources": {"profiler": {"config": {"enabled": True, "interval_ms": 1.0,
+                                                                      "output_dir": str(profile_dir)}}}}
+
+    result = make_job(db, storage).execute_in_process(run_config=run_config)
+
+    assert result.success
+    assert len(list(profile_dir.glob(f"{result.run_id}_1_*.folded"))) == 6
+
+
+def test_buffered_job_registers_every_result_once(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=3)
+    run_config = {**RUN_CONFIG, "resources": {"result_buffer": {"config": {"enabled": True, "max_pending": 2,
+                                                                           "max_delay_sec": 60.0}}}}
+
+    result = make_job(db, storage).execute_in_process(run_config=run_config)
+
+    assert result.success
+    # two results flushed by count, the third by the final batch, and nothing registered twice
+    assert query(db, "SELECT recording_id FROM results ORDER BY recording_id") == [(1,), (2,), (3,)]
+
+
+class FlakyPoseProcessor(StubPoseProcessor):
+    """Fails once, on the chunk starting at `fail_at_frame`, and records the frames it was asked to process."""
+    def __init__(self, fail_at_frame: int):
+        super().__init__()
+        self.fail_at_frame = fail_at_frame
+        self.processed_frames = 0
+
+    def process(self, data):
+        if self.processed_frames == self.fail_at_frame and self.fail_at_frame is not None:
+            self.fail_at_frame = None
+            raise RuntimeError("inference crashed")
+        self.processed_frames += len(data)
+        return super().process(data)
+
+
+def test_chunked_job_resumes_from_last_completed_chunk(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=1, num_frames=10)
+    run_config = {"ops": {**RUN_CONFIG["ops"],
+                          "split_video_locations": {"config": {"min_frames_for_chunking": 1}},
+                          "process_chunked_video_graph": {"ops": {"process_video_in_chunks": {"config": {"chunk_size": 4}}}}}}
+    processor = FlakyPoseProcessor(fail_at_frame=4)
+    job = make_job(db, storage, processors=[processor])
+
+    assert not job.execute_in_process(run_config=run_config, raise_on_error=False).success
+    assert query(db, "SELECT COUNT(*) FROM results") == [(0,)]
+
+    result = job.execute_in_process(run_config=run_config)
+
+    assert result.success
+    assert processor.processed_frames == 10  # the first chunk was not inferred again
+    [(location, video_path)] = query(db, "SELECT f.file_location, r.video_path FROM results f "
+                                         "JOIN recordings r ON f.recording_id = r.id")
+    df = storage.read_dataframe_from_storage(location)
+    stub = StubPoseProcessor()
+    expected = stub.frames_results_to_video_df(stub.process(storage.read_video_from_storage(video_path)),
+                                               timestamps_ns=generate_synthetic_timestamps(10, fps=30))
+    assert df["frame"].tolist() == list(range(10))
+    assert df["timestamp_ns"].tolist() == expected["timestamp_ns"].tolist()
+    assert df["confidence"].tolist() == expected["confidence"].tolist()
+
+
+def test_results_of_videos_that_lost_frames_on_save_are_written_without_timestamps(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    metadata = []
+    for name, stored_frames in (("short", 5), ("long", 9)):  # one take processed in memory and one in chunks
+        location = storage.write_video_to_storage(frames=generate_synthetic_frames(num_frames=stored_frames, width=32,
+                                                                                   height=24),
+                                                  fps=30, file_name=name)
+        storage.write_timestamps_to_storage(timestamps_ns=generate_synthetic_timestamps(stored_frames + 1, fps=30),
+                                            video_location=location)
+        metadata.append(RecordingMetaData(duration_in_sec=1, activity="Test", session_start="2025-01-01T00:00:00",
+                                          participant="Synthetic", fps=30, amount_of_frames=stored_frames + 1,
+                                          frames_lost_on_save=1, start_time="2025-01-01T00:00:00",
+                                          end_time="2025-01-01T00:00:01", if_corrupted=True, file_location=location,
+                                          width=32, height=24))
+    db.save_metadata_batch(metadata)
+    run_config = {"ops": {**RUN_CONFIG["ops"], "split_video_locations": {"config": {"min_frames_for_chunking": 8}},
+                          "process_chunked_video_graph": {"ops": {"process_video_in_chunks": {"config": {"chunk_size": 4}}}}}}
+
+    result = make_job(db, storage).execute_in_process(run_config=run_config)
+
+    assert result.success
+    locations = query(db, "SELECT file_location FROM results ORDER BY recording_id")
+    dfs = [storage.read_dataframe_from_storage(location) for (location,) in locations]
+    assert [sorted(df["frame"].unique().tolist()) for df in dfs] == [list(range(5)), list(range(9))]
+    assert all(df["timestamp_ns"].isna().all() for df in dfs)
+
+
+class NobodyPoseProcessor(StubPoseProcessor):
+    """Detects nobody in any frame."""
+    def process(self, data: np.ndarray) -> list:
+        return [EmptyResult() for _ in data]
+
+
+class EmptyResult:
+    def to_df(self) -> pd.DataFrame:
+        return pd.DataFrame()
+
+
+def test_videos_without_detections_get_the_same_empty_result_in_memory_and_in_chunks(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=1, num_frames=6)
+    make_recordings(storage, db, videos=1, num_frames=10, prefix="long")
+    run_config = {"ops": {**RUN_CONFIG["ops"], "split_video_locations": {"config": {"min_frames_for_chunking": 8}},
+                          "process_chunked_video_graph": {"ops": {"process_video_in_chunks": {"config": {"chunk_size": 4}}}}}}
+    job = make_job(db, storage, processors=[NobodyPoseProcessor()])
+
+    assert job.execute_in_process(run_config=run_config).success
+
+    locations = [row[0] for row in query(db, "SELECT file_location FROM results ORDER BY recording_id")]
+    in_memory, chunked = (pd.read_parquet(location) for location in locations)
+    assert os.path.isdir(locations[1])
+    assert in_memory.empty and chunked.empty
+    assert dict(chunked.dtypes) == dict(in_memory.dtypes)
+
+
+def test_processors_share_one_decode_and_register_under_their_own_names(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=2, num_frames=6)
+    make_recordings(storage, db, videos=1, num_frames=8, prefix="long")  # the third video goes through the chunked path
+    processors = [StubPoseProcessor(name="Stub Pose A"), StubPoseProcessor(name="Stub Pose B (imgsz=320)")]
+    run_config = {"ops": {**RUN_CONFIG["ops"], "split_video_locations": {"config": {"min_frames_for_chunking": 7}}}}
+
+    result = make_job(db, storage, processors=processors).execute_in_process(run_config=run_config)
+
+    assert result.success
+    registered = query(db, "SELECT f.recording_id, p.processor_name, f.file_location FROM results f "
+                           "JOIN processors p ON f.processor_id = p.id ORDER BY f.recording_id, p.processor_name")
+    assert [row[:2] for row in registered] == [(video_id, name) for video_id in (1, 2, 3)
+                                               for name in ("Stub Pose A", "Stub Pose B (imgsz=320)")]
+    assert len({row[2] for row in registered}) == 6
+    assert all(len(storage.read_dataframe_from_storage(row[2])) == (8 if row[0] == 3 else 6) for row in registered)
+    decodes = query(db, "SELECT recording_id FROM processing_metrics WHERE stage IN ('decode', 'chunked_processing')")
+    assert sorted(decodes) == [(1,), (2,), (3,)]
+
+
+def test_prefiltered_job_carries_results_forward_to_every_skipped_frame(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    # four distinct poses held for three frames each, one take short enough for memory and one chunked
+    frames = np.repeat(generate_synthetic_frames(num_frames=4, width=32, height=24), 3, axis=0)
+    metadata = []
+    for name, video_frames in (("short", frames[:9]), ("long", frames)):
+        location = storage.write_video_to_storage(frames=video_frames, fps=30, file_name=name)
+        storage.write_timestamps_to_storage(timestamps_ns=generate_synthetic_timestamps(len(video_frames), fps=30),
+                                            video_location=location)
+        metadata.append(RecordingMetaData(duration_in_sec=1, activity="Calibration", session_start="2025-01-01T00:00:00",
+                                          participant="Synthetic", fps=30, amount_of_frames=len(video_frames),
+                                          start_time="2025-01-01T00:00:00", end_time="2025-01-01T00:00:01",
+                                          if_corrupted=False, file_location=location))
+    db.save_metadata_batch(metadata)
+    processor = FlakyPoseProcessor(fail_at_frame=None)
+    ops = {**RUN_CONFIG["ops"], "split_video_locations": {"config": {"min_frames_for_chunking": 10}},
+           "process_chunked_video_graph": {"ops": {"process_video_in_chunks": {"config": {"chunk_size": 5}}}}}
+
+    result = make_job(db, storage, processors=[processor]).execute_in_process(
+        run_config={"ops": ops, "resources": {"prefilter": {"config": {"enabled": True}}}})
+
+    assert result.success
+    # only the first frame of every pose, and the first frame of every chunk, reached the model
+    assert processor.processed_frames == 3 + 6
+    stub = StubPoseProcessor()
+    for (video_id, location), video_frames in zip(query(db, "SELECT recording_id, file_location FROM results "
+                                                            "ORDER BY recording_id"), (frames[:9], frames)):
+        df = storage.read_dataframe_from_storage(location)
+        unfiltered = stub.frames_results_to_video_df(stub.process(video_frames),
+                                                     timestamps_ns=generate_synthetic_timestamps(len(video_frames), fps=30))
+        assert len(df) == len(unfiltered)
+        assert df["frame"].tolist() == unfiltered["frame"].tolist()
+        assert df["timestamp_ns"].tolist() == unfiltered["timestamp_ns"].tolist()
+        assert df["confidence"].tolist() == unfiltered["confidence"].tolist()
+    skipped = query(db, "SELECT stage, frames, frames_skipped FROM processing_metrics "
+                        "WHERE stage IN ('prefilter', 'chunked_processing') ORDER BY recording_id")
+    assert skipped == [("prefilter", 9, 6), ("chunked_processing", 12, 6)]
+
+
+def test_videos_over_their_share_of_the_memory_budget_are_processed_in_chunks(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    db = SQLiteDBManager(location=tmp_path / "test.db")
+    make_recordings(storage, db, videos=2, num_frames=6)
+    make_recordings(storage, db, videos=1, num_frames=10, prefix="long")
+    ledger_location = str(tmp_path / "ledger.json")
+    # 6 frames of 32x24 take about 27 KB to process, 10 frames about 46 KB: only the latter exceeds a quarter of 150 KB
+    run_config = {**RUN_CONFIG, "resources": {"scheduler": {"config": {"budget_gb": 150_000 / 1024 ** 3,
+                                                                       "ledger_location": ledger_location}}}}
+
+    result = make_job(db, storage).execute_in_process(run_config=run_config)
+
+    assert result.success
+    assert query(db, "SELECT DISTINCT recording_id, stage FROM processing_metrics "
+                     "WHERE stage IN ('decode', 'chunked_processing') ORDER BY recording_id") == [
+        (1, "decode"), (2, "decode"), (3, "chunked_processing")]
+    assert MemoryLedger(budget_bytes=150_000, location=ledger_location).get_reserved_bytes() == 0
@@ -4,3 +4,9 @@ from src.postprocessor import YoloProcessor
 def test_yolo_processor_model_loads():
     processor = YoloProcessor()
     assert processor is not None
+
+
+def test_yolo_processor_names_follow_model_settings():
+    assert YoloProcessor().get_name() == "YOLO Pose Extraction"
+    assert YoloProcessor(model="yolo11s-pose.pt", imgsz=960).get_name() == "YOLO Pose Extraction (yolo11s-pose, imgsz=960)"
+    assert YoloProcessor(model="yolo11s-pose.pt", name="Pose S").get_name() == "Pose S"
@@ -0,0 +1,25 @@
+import numpy as np
+from benchmarks.synthetic import generate_synthetic_frames
+from src.prefilter import StaticFramePrefilter
+
+
+def test_duplicates_and_static_frames_reuse_the_last_representative():
+    frames = generate_synthetic_frames(num_frames=3, width=64, height=48)
+    noisy = frames[0].copy()
+    noisy[0, 0] ^= 1  # one pixel off by one gray level: static, not a duplicate
+    batch = np.stack([frames[0], frames[0], noisy, frames[1], frames[2], frames[2]])
+
+    selection = StaticFramePrefilter(enabled=True).select(batch)
+
+    assert selection.sources.tolist() == [0, 0, 0, 3, 4, 4]
+    assert (selection.duplicates, selection.static) == (2, 1)
+    assert selection.get_representatives().tolist() == [0, 3, 4]
+    assert selection.expand(["a", "b", "c"]) == ["a", "a", "a", "b", "c", "c"]
+    assert selection.get_skip_ratio() == 0.5
+
+
+def test_results_are_carried_forward_at_most_max_carry_frames():
+    frames = np.repeat(generate_synthetic_frames(num_frames=1, width=32, height=24), 7, axis=0)
+
+    assert StaticFramePrefilter(enabled=True, max_carry_frames=2).select(frames).sources.tolist() == [0, 0, 0, 3, 3, 3, 6]
+    assert StaticFramePrefilter(enabled=False).select(frames).get_skipped_count() == 0
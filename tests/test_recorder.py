@@ -1,13 +1,18 @@
+import time
 import numpy as np
-from src.recorder import validate_video, WebCamVideoRecorder
+import pytest
+from src.frame_timing import FrameTimingStats
+from src.recorder import WebCamVideoRecorder, MultiCamVideoRecorder, WallClock
 
 
-def test_validate_video_perfect_recording():
-    assert validate_video(fps=30, amount_of_frames=90, duration=3) is False
-
-
-def test_validate_video_with_frame_drop():
-    assert validate_video(fps=30, amount_of_frames=85, duration=3) is True
+def test_wall_clock_is_anchored_to_epoch_and_monotonic():
+    clock = WallClock()
+    before = time.time_ns()
+    first = clock.now_ns()
+    second = clock.now_ns()
+    assert abs(first - before) < 10**8
+    assert second >= first
+    assert clock.to_wall_ns(np.array([time.monotonic_ns()], dtype=np.int64)).dtype == np.int64
 
 def test_webcam_recorder_fps_getter_setter():
     recorder = WebCamVideoRecorder()
@@ -22,7 +27,7 @@ def test_record_real_video_short():
     recorder.set_fps(10)
 
     duration = 2
-    frames, fps, num_frames, start_time, end_time, is_corrupted = recorder.record_video(duration)
+    frames, fps, num_frames, start_time, end_time, timing_stats, timestamps_ns = recorder.record_video(duration)
 
     assert isinstance(frames, np.ndarray)
     assert frames.ndim == 4  # [num_frames, height, width, channels]
@@ -30,4 +35,73 @@ def test_record_real_video_short():
     assert fps > 0
     assert isinstance(start_time, str)
     assert isinstance(end_time, str)
-    assert isinstance(is_corrupted, bool)
\ No newline at end of file
+    assert isinstance(timing_stats, FrameTimingStats)
+    assert timestamps_ns.dtype == np.int64
+    assert timestamps_ns.shape[0] == num_frames
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture: yields numbered frames at a fixed rate, optionally skipping some."""
+    def __init__(self, device_id: int, fps: int = 50, shape=(24, 32, 3), skip_every: int = 0):
+        self.device_id = device_id
+        self.fps = fps
+        self.shape = shape
+        self.skip_every = skip_every
+        self.frame_index = 0
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return self.fps
+
+    def read(self, image=None):
+        time.sleep(1 / self.fps)
+        self.frame_index += 1
+        if self.skip_every and self.frame_index % self.skip_every == 0:
+            time.sleep(1 / self.fps)
+        frame = np.full(self.shape, self.frame_index % 256, dtype=np.uint8)
+        if image is not None:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.released = True
+
+
+def test_multi_cam_recorder_records_all_devices_on_shared_clock():
+    captures = {}
+
+    def factory(device_id):
+        captures[device_id] = FakeCapture(device_id, skip_every=5 if device_id == 1 else 0)
+        return captures[device_id]
+
+    recorder = MultiCamVideoRecorder(device_ids=[0, 1], fps=50, capture_factory=factory)
+    started_at_ns = time.time_ns()
+    streams, start_time, end_time = recorder.record_videos(duration_in_sec=1)
+
+    assert [stream.device_id for stream in streams] == [0, 1]
+    assert all(capture.released for capture in captures.values())
+    for stream in streams:
+        assert stream.frames.shape[1:] == (24, 32, 3)
+        assert stream.frames.shape[0] == stream.timestamps_ns.shape[0] > 0
+        assert stream.timestamps_ns.dtype == np.int64
+        assert np.all(np.diff(stream.timestamps_ns) > 0)
+        assert 0 <= stream.timestamps_ns[0] - started_at_ns < 1e9
+        assert stream.timestamps_ns[-1] - started_at_ns < 2e9
+    assert streams[1].timing_stats.frames_dropped > streams[0].timing_stats.frames_dropped
+    assert start_time < end_time
+
+
+def test_multi_cam_recorder_fails_on_unopened_device():
+    class ClosedCapture(FakeCapture):
+        def isOpened(self):
+            return False
+
+    recorder = MultiCamVideoRecorder(device_ids=[0], capture_factory=ClosedCapture)
+    with pytest.raises(Exception):
+        recorder.record_videos(duration_in_sec=1)
@@ -0,0 +1,63 @@
+import pytest
+from src.db_manager import ResultRecord
+from src.result_buffer import WriteBehindBuffer
+
+
+class RecordingDB:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def register_results_batch(self, results):
+        if self.fail:
+            raise Exception("database unavailable")
+        self.batches.append(list(results))
+        return len(results)
+
+
+def make_record(video_id: int) -> ResultRecord:
+    return ResultRecord(video_id=str(video_id), processor_name="YOLO Pose Extraction",
+                        results_location=f"/results/{video_id}.parquet")
+
+
+def test_buffer_flushes_by_count_and_on_close():
+    db = RecordingDB()
+    buffer = WriteBehindBuffer(db=db, max_pending=2, max_delay_sec=60)
+    for video_id in range(3):
+        buffer.add(make_record(video_id))
+    assert db.batches == [[make_record(0), make_record(1)]]
+    assert buffer.get_pending_count() == 1
+    buffer.close()
+    assert db.batches[-1] == [make_record(2)]
+    assert buffer.get_pending_count() == 0
+
+
+def test_buffer_flushes_by_age():
+    db = RecordingDB()
+    buffer = WriteBehindBuffer(db=db, max_pending=100, max_delay_sec=0)
+    buffer.add(make_record(1))
+    assert db.batches == [[make_record(1)]]
+
+
+def test_failed_flush_keeps_records_pending():
+    db = RecordingDB()
+    buffer = WriteBehindBuffer(db=db, max_pending=1)
+    db.fail = True
+    buffer.add(make_record(1))  # write-behind errors are logged, the record stays queued
+    assert buffer.get_pending_count() == 1
+    with pytest.raises(Exception):
+        buffer.flush()
+    db.fail = False
+    buffer.add(make_record(2))
+    assert db.batches == [[make_record(1), make_record(2)]]
+
+
+def test_failed_final_flush_is_raised():
+    db = RecordingDB()
+    buffer = WriteBehindBuffer(db=db, max_pending=100, max_delay_sec=60)
+    buffer.add(make_record(1))
+    db.fail = True
+    with pytest.raises(Exception, match="database unavailable"):
+        buffer.close()
+    assert buffer.get_pending_count() == 1
+
@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from src.scheduler import MemoryLedger, MemoryScheduler
+
+
+def test_reservations_wait_for_the_budget_and_ignore_dead_processes(tmp_path):
+    location = tmp_path / "ledger.json"
+    dead = subprocess.Popen([sys.executable, "-c", ""])
+    dead.wait()
+    location.write_text(json.dumps({"crashed": {"pid": dead.pid, "bytes": 100, "description": "crashed worker"}}))
+    ledger = MemoryLedger(budget_bytes=100, location=str(location), poll_interval_sec=0.01)
+    release, admitted = threading.Event(), []
+
+    def hold(name: str):
+        with ledger.reserve(60, description=name):
+            admitted.append(name)
+            release.wait()
+    first = threading.Thread(target=hold, args=("first",))
+    first.start()
+    while not admitted:
+        time.sleep(0.01)
+    second = threading.Thread(target=hold, args=("second",))
+    second.start()
+    time.sleep(0.1)
+
+    assert admitted == ["first"] and ledger.get_reserved_bytes() == 60
+    release.set()
+    first.join()
+    second.join()
+    assert admitted == ["first", "second"] and ledger.get_reserved_bytes() == 0
+    with ledger.reserve(500, description="larger than the budget") as reserved:
+        assert reserved == 100  # admitted alone
+        with pytest.raises(Exception, match="Timed out"):
+            with MemoryLedger(budget_bytes=100, location=str(location), max_wait_sec=0.05,
+                              poll_interval_sec=0.01).reserve(1, description="no room"):
+                pass
+
+
+def test_videos_too_large_for_their_share_of_the_budget_are_streamed():
+    scheduler = MemoryScheduler(budget_gb=1.0, max_in_memory_fraction=0.25, overhead=2.0)
+
+    assert scheduler.estimate_bytes(100, (720, 1280, 3)) == 100 * 720 * 1280 * 3 * 2
+    assert scheduler.should_stream(scheduler.estimate_bytes(100, (720, 1280, 3)))
+    assert not scheduler.should_stream(scheduler.estimate_bytes(10, (720, 1280, 3)))
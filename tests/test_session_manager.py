@@ -1,6 +1,10 @@
+import os
+import numpy as np
 from datetime import datetime
+from src.frame_timing import FrameTimingStats
+from src.recorder import CameraStream
 from src.session_manager import SessionManager
-from src.storage_manager import PreRecordingData
+from src.storage_manager import PreRecordingData, timestamps_location_for_video
 from dotenv import load_dotenv
 
 def test_record_and_save_adds_recording_correctly():
@@ -28,4 +32,36 @@ def test_record_and_save_adds_recording_correctly():
     assert new_row[2] == data.activity
     assert new_row[3] == data.participant
     assert new_row[1].replace(' ', 'T') == data.session_start
-    assert new_row[-1] == data.duration_in_sec
\ No newline at end of file
+    assert new_row[11] == data.duration_in_sec
+
+
+class StubMultiCamVideoRecorder:
+    def __init__(self, device_ids: list[int], fps: int):
+        self.device_ids = device_ids
+
+    def record_videos(self, duration_in_sec: int):
+        streams = [CameraStream(device_id=device_id, frames=np.full((3, 24, 32, 3), device_id, dtype=np.uint8),
+                                timestamps_ns=np.arange(3, dtype=np.int64), fps=30, timing_stats=FrameTimingStats())
+                   for device_id in self.device_ids]
+        return streams, "2025-01-01T00:00:00", "2025-01-01T00:00:01"
+
+
+def test_removing_a_multi_view_recording_removes_every_view(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SQLITE_DB_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setattr("src.session_manager.MultiCamVideoRecorder", StubMultiCamVideoRecorder)
+    sm = SessionManager(session_start="2025-01-01T00:00:00", db_backend="sqlite", storage_backend="local")
+    data = PreRecordingData(duration_in_sec=1, activity="TestActivity", session_start=sm.get_session_name(),
+                            participant="TestUser")
+    assert sm.record_multi_view_video(data, device_ids=[0, 1])
+    assert sm.save_last_multi_view_recording()
+    videos = sorted(os.listdir(tmp_path / "output" / "videos"))
+    assert len(videos) == 4  # a video and a timestamps sidecar per view
+
+    removed = sm.remove_recording("1")
+
+    assert len(removed) == 2
+    assert not any(os.path.exists(location) or os.path.exists(timestamps_location_for_video(location))
+                   for location in removed)
+    assert os.listdir(tmp_path / "output" / "videos") == []
+
@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
 import os
-from src.storage_manager import LocalStorageManager
+import pytest
+from src.storage_manager import LocalStorageManager, VideoEncoding, timestamps_location_for_video
 
 
 def test_write_and_read_video(tmp_path):
@@ -38,3 +39,79 @@ def test_write_and_read_dataframe(tmp_path):
     assert isinstance(loaded_df, pd.DataFrame)
     assert loaded_df.equals(df)
     os.remove(saved_path)
+
+
+def test_write_and_read_frame_timestamps(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    video_location = storage.write_video_to_storage(frames=np.zeros((3, 16, 16, 3), dtype=np.uint8), fps=30, file_name="ts_video")
+    assert storage.read_timestamps_from_storage(video_location) is None
+
+    timestamps = np.array([10, 20, 30], dtype=np.int64) + 1_700_000_000_000_000_000
+    saved_path = storage.write_timestamps_to_storage(timestamps_ns=timestamps, video_location=video_location)
+    assert saved_path == timestamps_location_for_video(video_location)
+
+    loaded = storage.read_timestamps_from_storage(video_location)
+    assert loaded.dtype == np.int64
+    assert np.array_equal(loaded, timestamps)
+
+
+def test_read_video_chunks_from_storage_seeks_exactly(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    frames = np.stack([np.full((16, 16, 3), i * 20, dtype=np.uint8) for i in range(7)])
+    saved_path = storage.write_video_to_storage(frames=frames, fps=15, file_name="chunked")
+
+    assert storage.get_video_frame_count(saved_path) == 7
+    chunks = list(storage.read_video_chunks_from_storage(saved_path, chunk_size=3, start_frame=2))
+    assert [(first_frame, len(chunk)) for first_frame, chunk in chunks] == [(2, 3), (5, 2)]
+    assert np.array_equal(np.concatenate([chunk for _, chunk in chunks]), frames[2:])
+
+
+def test_dataframe_parts_and_manifest_read_back_as_one_dataset(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path))
+    storage.write_dataframe_part_to_storage(data=pd.DataFrame({"frame": [0, 1]}), dataset_name="ds", part_index=0)
+    storage.write_dataframe_part_to_storage(data=pd.DataFrame({"frame": [2]}), dataset_name="ds", part_index=1)
+    storage.write_manifest_to_storage(manifest={"complete": True}, dataset_name="ds")
+
+    assert storage.read_manifest_from_storage("ds") == {"complete": True}
+    assert storage.read_dataframe_from_storage(storage.get_dataset_location("ds"))["frame"].tolist() == [0, 1, 2]
+    assert not [name for name in os.listdir(storage.get_dataset_location("ds")) if name.endswith(".tmp")]
+    storage.remove_dataset_from_storage("ds")
+    assert storage.read_manifest_from_storage("ds") is None
+
+
+def make_gradient_frames(num_frames: int = 10) -> np.ndarray:
+    ramp = np.tile(np.linspace(0, 200, 32, dtype=np.uint8), (24, 1))
+    return np.stack([np.dstack([ramp + i, ramp, 255 - ramp]) for i in range(num_frames)]).astype(np.uint8)
+
+
+@pytest.mark.parametrize("codec, max_error", [("ffv1", 0), ("mjpeg", 8), ("npy", 0)])
+def test_video_codecs_round_trip(tmp_path, codec, max_error):
+    storage = LocalStorageManager(location=str(tmp_path), encoding=VideoEncoding(codec=codec))
+    frames = make_gradient_frames()
+
+    saved_path = storage.write_video_to_storage(frames=frames, fps=30, file_name="codec")
+
+    assert storage.get_video_frame_count(saved_path) == 10
+    read_frames = storage.read_video_from_storage(saved_path)
+    assert read_frames.shape == frames.shape
+    assert np.abs(read_frames.astype(int) - frames.astype(int)).mean() <= max_error
+
+
+def test_segmented_video_reads_back_and_seeks_into_segments(tmp_path):
+    storage = LocalStorageManager(location=str(tmp_path), encoding=VideoEncoding(segment_frames=4, threads=2))
+    frames = make_gradient_frames(num_frames=10)
+
+    manifest_path = storage.write_video_to_storage(frames=frames, fps=30, file_name="segmented")
+    storage.write_timestamps_to_storage(timestamps_ns=np.arange(10, dtype=np.int64), video_location=manifest_path)
+
+    assert manifest_path.endswith(".segments.json")
+    assert len(os.listdir(manifest_path.removesuffix(".json"))) == 3
+    assert storage.get_video_frame_count(manifest_path) == 10
+    assert np.array_equal(storage.read_video_from_storage(manifest_path), frames)
+    chunks = list(storage.read_video_chunks_from_storage(manifest_path, chunk_size=3, start_frame=5))
+    assert [first_frame for first_frame, _ in chunks] == [5, 8]
+    assert np.array_equal(np.concatenate([chunk for _, chunk in chunks]), frames[5:])
+    assert storage.get_size(manifest_path) > os.path.getsize(manifest_path)
+
+    storage.remove_video_from_storage(manifest_path)
+    assert os.listdir(os.path.dirname(manifest_path)) == []